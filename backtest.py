@@ -0,0 +1,318 @@
+"""
+Backtest for Albion Cost Calculator
+Replays the stored daily market history of every item and venue and measures
+how stable each margin has been over rolling windows
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+import warnings
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    material_price_city, crafting_chain_enabled,
+    backtest_windows, backtest_days, backtest_hit_threshold_pct, backtest_summary_path
+)
+from calculator import material_api_id, current_material_prices
+from catalog import select_target_items
+from cost_engine import CostEngine
+from crafting_chain import CraftingChain
+from profit_analyzer import (
+    MarketTarget, market_targets, open_history_store, create_scheduler, create_session, get_latest_timeseries_data
+)
+
+
+def load_history(store, items, targets, since=None):
+    """
+    Read the stored history of the items for every target.
+
+    Args:
+        store (HistoryStore): Open history store
+        items (list): Item IDs
+        targets (list): MarketTargets to read
+        since (str): Optional ISO timestamp of the first day
+
+    Returns:
+        pd.DataFrame: One row per stored point (server, item_id, quality, location, day, avg_price, item_count)
+    """
+    frames = []
+    for target in targets:
+        rows = store.history(target.base_url, items, target.locations, since)
+        if rows:
+            frame = pd.DataFrame.from_records(
+                rows, columns=['item_id', 'quality', 'location', 'timestamp', 'avg_price', 'item_count'])
+            frames.append(frame.assign(server=target.server))
+    if not frames:
+        return None
+    history = pd.concat(frames, ignore_index=True)
+    history['day'] = pd.to_datetime(history['timestamp'].str[:10])
+    return history.drop(columns='timestamp')
+
+
+def daily_panel(history, keys, days):
+    """
+    Pivot points into dense series × day arrays of trade value and trade count.
+
+    Qualities of the same series are combined, matching the ranking's
+    trade-count weighted average over qualities.
+
+    Args:
+        history (pd.DataFrame): Points from load_history
+        keys (list): Columns identifying a series (e.g. ['server', 'item_id', 'location'])
+        days (np.ndarray): Consecutive datetime64[D] days of the panel
+
+    Returns:
+        tuple: (series DataFrame of keys, trade value array, trade count array)
+    """
+    day_index = (history['day'].to_numpy().astype('datetime64[D]') - days[0]).astype(np.int64)
+    inside = (day_index >= 0) & (day_index < len(days))
+    history, day_index = history[inside], day_index[inside]
+    codes, series = pd.MultiIndex.from_frame(history[keys]).factorize()
+    flat = codes * len(days) + day_index
+    size = len(series) * len(days)
+    count = history['item_count'].to_numpy(dtype=np.float64)
+    value = np.bincount(flat, weights=history['avg_price'].to_numpy(dtype=np.float64) * count, minlength=size)
+    count = np.bincount(flat, weights=count, minlength=size)
+    shape = (len(series), len(days))
+    return series.to_frame(index=False, name=keys), value.reshape(shape), count.reshape(shape)
+
+
+def rolling_sum(array, window):
+    """
+    Trailing sum over the last `window` days of every row.
+
+    Args:
+        array (np.ndarray): Series × day values
+        window (int): Window length in days
+
+    Returns:
+        np.ndarray: Same shape; day t holds the sum of days t-window+1 .. t
+    """
+    cumulative = np.concatenate([np.zeros((array.shape[0], 1)), np.cumsum(array, axis=1)], axis=1)
+    ends = np.arange(1, array.shape[1] + 1)
+    starts = np.maximum(ends - window, 0)
+    return cumulative[:, ends] - cumulative[:, starts]
+
+
+def forward_fill(array):
+    """
+    Replace NaN with the last valid value to its left in each row.
+
+    Args:
+        array (np.ndarray): Rows of values with gaps
+
+    Returns:
+        np.ndarray: Filled copy (leading NaN stay NaN)
+    """
+    valid = ~np.isnan(array)
+    index = np.where(valid, np.arange(array.shape[1]), 0)
+    np.maximum.accumulate(index, axis=1, out=index)
+    filled = np.take_along_axis(array, index, axis=1)
+    filled[~np.maximum.accumulate(valid, axis=1)] = np.nan
+    return filled
+
+
+def material_price_panel(store, cost_engine, days, target):
+    """
+    Daily material prices from the stored material history, current prices elsewhere.
+
+    Each material's daily trade-count weighted price is carried forward over
+    days without trades; days before its first stored point, and materials
+    without history, use the cost engine's current price (build the engine
+    from calculator.current_material_prices for the latest live prices).
+
+    Args:
+        store (HistoryStore): Open history store
+        cost_engine (CostEngine): Current material prices and recipe matrix
+        days (np.ndarray): Days of the panel
+        target (MarketTarget): Server whose material history is used
+
+    Returns:
+        tuple: (materials × days price array, number of materials with history)
+    """
+    current = np.broadcast_to(cost_engine.prices[:, None], (len(cost_engine.material_ids), len(days)))
+    api_ids = {material_api_id(mat): col for col, mat in enumerate(cost_engine.material_ids)}
+    rows = store.history(target.base_url, list(api_ids), [material_price_city], str(days[0]))
+    if not rows:
+        return current.copy(), 0
+
+    history = pd.DataFrame.from_records(
+        rows, columns=['item_id', 'quality', 'location', 'timestamp', 'avg_price', 'item_count'])
+    history['day'] = pd.to_datetime(history['timestamp'].str[:10])
+    history['material'] = history['item_id'].map(api_ids)
+    series, value, count = daily_panel(history, ['material'], days)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        observed = forward_fill(np.where(count > 0, value / count, np.nan))
+
+    prices = current.copy()
+    columns = series['material'].to_numpy(dtype=np.intp)
+    prices[columns] = np.where(np.isnan(observed), current[columns], observed)
+    return prices, len(columns)
+
+
+def cost_panel(cost_engine, material_prices):
+    """
+    Daily crafting cost of every engine item.
+
+    Args:
+        cost_engine (CostEngine): Recipe matrix
+        material_prices (np.ndarray): Materials × days prices
+
+    Returns:
+        np.ndarray: Items × days cost after the return rate (NaN where a material has no price)
+    """
+    costs = np.zeros((len(cost_engine.item_ids), material_prices.shape[1]))
+    np.add.at(costs, cost_engine.rows, cost_engine.quantities[:, None] * material_prices[cost_engine.cols])
+    costs[~cost_engine.has_recipe] = np.nan
+    return costs * (1 - cost_engine.return_rate)
+
+
+def margin_statistics(value, count, costs, window, threshold_pct=backtest_hit_threshold_pct):
+    """
+    Rolling weighted price and realized margin statistics of every series.
+
+    Args:
+        value (np.ndarray): Series × days trade value
+        count (np.ndarray): Series × days trade count
+        costs (np.ndarray): Series × days crafting cost
+        window (int): Rolling window in days
+        threshold_pct (float): Margin a day must exceed to count as a hit
+
+    Returns:
+        dict: One array per statistic, each of length (number of series)
+    """
+    rolling_count = rolling_sum(count, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        price = rolling_sum(value, window) / rolling_count
+        margin = np.where(costs > 0, (price - costs) / costs * 100, np.nan)
+    # A day counts once its window holds trades and the cost is known
+    margin[rolling_count <= 0] = np.nan
+    observed = ~np.isnan(margin)
+    days = observed.sum(axis=1)
+
+    # Last valid margin of each series
+    last_index = np.where(observed, np.arange(margin.shape[1]), -1).max(axis=1)
+    last = np.where(last_index >= 0, margin[np.arange(len(margin)), np.maximum(last_index, 0)], np.nan)
+
+    # Series without a single valid day produce all-NaN slices (dropped by run_backtest)
+    with np.errstate(invalid='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return {
+            'days': days,
+            'mean_price': np.nanmean(np.where(observed, price, np.nan), axis=1),
+            'mean_cost': np.nanmean(np.where(observed, costs, np.nan), axis=1),
+            'mean_margin_pct': np.nanmean(margin, axis=1),
+            'margin_volatility': np.nanstd(margin, axis=1),
+            'min_margin_pct': np.nanmin(margin, axis=1),
+            'last_margin_pct': last,
+            'hit_rate': np.where(days > 0, (margin > threshold_pct).sum(axis=1) / np.maximum(days, 1), np.nan),
+            'daily_volume': count.sum(axis=1) / count.shape[1],
+        }
+
+
+def run_backtest(items, windows=backtest_windows, days=backtest_days):
+    """
+    Backtest every item and venue against the stored history.
+
+    Args:
+        items (list): Item IDs
+        windows (list): Rolling windows in days
+        days (int): Days of history to replay (None for everything stored)
+
+    Returns:
+        pd.DataFrame: One row per item, venue and window with its margin statistics
+                      (None if the store holds no history)
+    """
+    store = open_history_store()
+    if not store:
+        return None
+    since = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d") if days else None
+    try:
+        targets = market_targets()
+        history = load_history(store, items, targets, since)
+        if history is None:
+            return None
+        first, last = (np.datetime64(day, 'D') for day in (history['day'].min(), history['day'].max()))
+        panel_days = np.arange(first, last + np.timedelta64(1, 'D'))
+        series, value, count = daily_panel(history, ['server', 'item_id', 'location'], panel_days)
+
+        # Materials without stored history are priced at the latest run's live prices
+        current = current_material_prices()
+        cost_engine = CostEngine(items, prices=current,
+                                 chain=CraftingChain(current) if crafting_chain_enabled else None)
+        prices, with_history = material_price_panel(store, cost_engine, panel_days, targets[0])
+    finally:
+        store.close()
+
+    rows = series['item_id'].map(cost_engine.item_index).to_numpy()
+    item_costs = cost_panel(cost_engine, prices)
+    costs = np.full(value.shape, np.nan)
+    known = ~pd.isna(rows)
+    costs[known] = item_costs[rows[known].astype(np.intp)]
+
+    print(f"🗂️ {len(series)}系列 × {len(panel_days)}日（{panel_days[0]}～{panel_days[-1]}）/ "
+          f"素材価格履歴 {with_history}/{len(cost_engine.material_ids)}件", flush=True)
+
+    frames = []
+    for window in windows:
+        stats = margin_statistics(value, count, costs, window)
+        frames.append(series.assign(window=window, **stats))
+    summary = pd.concat(frames, ignore_index=True)
+    summary = summary[summary['days'] > 0]
+    return summary.sort_values(['window', 'mean_margin_pct'], ascending=[True, False], ignore_index=True)
+
+
+async def fetch_material_history():
+    """
+    Download the recipe materials' history at material_price_city into the history store.
+    """
+    items = select_target_items()
+    cost_engine = CostEngine(items, chain=CraftingChain() if crafting_chain_enabled else None)
+    api_ids = [material_api_id(mat) for mat in cost_engine.material_ids]
+    primary = market_targets()[0]
+    target = MarketTarget(primary.server, primary.base_url, (material_price_city,))
+    async with create_session() as session:
+        await get_latest_timeseries_data(api_ids, scheduler=create_scheduler(), session=session, target=target,
+                                         cache=False)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest margins over the stored market history")
+    parser.add_argument('--windows', default=",".join(str(window) for window in backtest_windows),
+                        help="Rolling windows in days (comma-separated)")
+    parser.add_argument('--days', type=int, default=backtest_days, help="Days of history to replay")
+    parser.add_argument('--fetch-materials', action='store_true',
+                        help=f"Download material history ({material_price_city}) before the backtest")
+    parser.add_argument('--summary', default=backtest_summary_path, help="Per item, venue and window CSV")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.fetch_materials:
+        asyncio.run(fetch_material_history())
+
+    started = time.perf_counter()
+    summary = run_backtest(select_target_items(), [int(window) for window in args.windows.split(",")], args.days)
+    if summary is None or len(summary) == 0:
+        print("❌ 保存済みの履歴がありません。先に profit_analyzer.py を実行してください", flush=True)
+        return 1
+    print(f"🧮 バックテスト完了: {time.perf_counter() - started:.2f}秒", flush=True)
+
+    summary.to_csv(args.summary, index=False)
+    for window, rows in summary.groupby('window', sort=True):
+        print(f"\n📈 {window}日ウィンドウ 平均利益率上位10件:", flush=True)
+        columns = ['item_id', 'server', 'location', 'days', 'mean_margin_pct', 'margin_volatility', 'hit_rate',
+                   'last_margin_pct']
+        print(rows[columns].head(10).to_string(index=False), flush=True)
+    print(f"\n✅ 結果を {args.summary} に出力しました", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
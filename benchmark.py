@@ -0,0 +1,258 @@
+"""
+Benchmark suite for Albion Cost Calculator
+Runs the fetch, aggregation and cost paths against a local mock API (mock_api.py)
+for synthetic catalogs and compares the results with a saved baseline
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import aiohttp
+import pandas as pd
+
+import profit_analyzer
+from config import BLACK_MARKET, retry_pass_rate
+from calculator import calculate_cost
+from catalog import load_catalog
+from cost_engine import CostEngine
+from profit_analyzer import MarketTarget, create_scheduler, get_latest_timeseries_data, process_and_display_items
+from rate_limiter import RequestScheduler
+
+BASELINE_FILE = "benchmark_baseline.json"
+
+# Metrics checked against the baseline (lower is better)
+REGRESSION_METRICS = ['wall_seconds', 'aggregate_seconds', 'cost_engine_seconds']
+
+
+def synthetic_catalog(size):
+    """
+    Build a catalog of item IDs: real recipe items first, then synthetic ones.
+
+    Args:
+        size (int): Number of item IDs
+
+    Returns:
+        list: Item IDs (synthetic IDs have no recipe, so their cost is None)
+    """
+    items = [entry.item_id for entry in load_catalog().entries]
+    n = 0
+    while len(items) < size:
+        items.append(f"T{4 + n % 5}_BENCH_ITEM{n}")
+        n += 1
+    return items[:size]
+
+
+async def start_mock_server(port, args):
+    """
+    Start mock_api.py in a subprocess so it does not share the client's event loop.
+
+    Returns:
+        asyncio.subprocess.Process: The server process
+    """
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock_api.py")
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, script, "--port", str(port),
+        "--latency", str(args.latency), "--throttle-rate", str(args.throttle_rate),
+        "--error-rate", str(args.error_rate), "--history-length", str(args.history_length),
+        stdout=asyncio.subprocess.DEVNULL
+    )
+    async with aiohttp.ClientSession() as session:
+        for _ in range(100):
+            try:
+                async with session.get(f"http://127.0.0.1:{port}/_stats") as resp:
+                    if resp.status == 200:
+                        return process
+            except aiohttp.ClientError:
+                await asyncio.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("mock API did not start")
+
+
+async def mock_stats(base_url, reset=False):
+    async with aiohttp.ClientSession() as session:
+        if reset:
+            async with session.post(f"{base_url}/_reset") as resp:
+                return await resp.json()
+        async with session.get(f"{base_url}/_stats") as resp:
+            return await resp.json()
+
+
+async def run_size(base_url, size, args):
+    """
+    Benchmark one catalog size.
+
+    Args:
+        base_url (str): Mock API URL
+        size (int): Number of items
+        args (argparse.Namespace): Benchmark settings
+
+    Returns:
+        dict: Measured metrics
+    """
+    items = synthetic_catalog(size)
+    target = MarketTarget("bench", base_url, (BLACK_MARKET,))
+    scheduler = create_scheduler(rate=args.rate, burst=max(1, int(args.rate)))
+    await mock_stats(base_url, reset=True)
+
+    # Fetch (cache and store bypassed so every run hits the mock)
+    # The deferred retry pass is measured on its own so its delay and slow rate do not swamp the fetch time
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        records = await get_latest_timeseries_data(items, scheduler=scheduler, target=target,
+                                                   cache=False, store=False, retry_pass=False)
+    wall_seconds = time.perf_counter() - started
+    server = await mock_stats(base_url)
+
+    fetched = set(records.categories['item_id'].labels)
+    failed = [item for item in items if item not in fetched]
+    retry_pass_seconds = 0.0
+    recovered = 0
+    if failed and not args.skip_retry_pass:
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            retried = await get_latest_timeseries_data(failed, scheduler=RequestScheduler(args.retry_rate, 1, 1),
+                                                       target=target, cache=False, store=False, retry_pass=False)
+        retry_pass_seconds = time.perf_counter() - started
+        recovered = len(set(retried.categories['item_id'].labels))
+
+    # Aggregation
+    started = time.perf_counter()
+    cost_engine = CostEngine(items)
+    cost_engine_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    cutoff_date = datetime.now() - pd.Timedelta(days=7)
+    item_averages = None
+    if len(records):
+        market_df = records.frame()
+        market_df = market_df[market_df['latest_timestamp'] >= cutoff_date]
+        item_averages = process_and_display_items(None, market_df, cutoff_date, cost_engine)
+    aggregate_seconds = time.perf_counter() - started
+
+    # Per-item cost calculation for comparison
+    started = time.perf_counter()
+    for item in items:
+        calculate_cost(item)
+    calculate_cost_seconds = time.perf_counter() - started
+
+    stats = scheduler.summary()
+    return {
+        'items': size,
+        'wall_seconds': round(wall_seconds, 4),
+        'requests': server['requests'],
+        'requests_per_second': round(server['requests'] / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+        'retries': server['throttled'] + server['errors'],
+        'throttled': server['throttled'],
+        'failed_items': len(failed),
+        'retry_pass_seconds': round(retry_pass_seconds, 4),
+        'recovered_items': recovered,
+        'rows': len(records),
+        'analyzed_items': 0 if item_averages is None else len(item_averages),
+        'aggregate_seconds': round(aggregate_seconds, 4),
+        'cost_engine_seconds': round(cost_engine_seconds, 4),
+        'calculate_cost_seconds': round(calculate_cost_seconds, 4),
+        'final_concurrency': stats['concurrency'],
+    }
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """
+    Args:
+        results (list): Metrics from this run
+        baseline (dict): Saved baseline
+        tolerance (float): Allowed relative slowdown (0.2 = 20%)
+
+    Returns:
+        list: Regression descriptions (empty if none)
+    """
+    regressions = []
+    saved = {str(row['items']): row for row in baseline.get('results', [])}
+    for row in results:
+        old = saved.get(str(row['items']))
+        if not old:
+            continue
+        for metric in REGRESSION_METRICS:
+            if old.get(metric) and row[metric] > old[metric] * (1 + tolerance):
+                regressions.append(f"{row['items']}件 {metric}: {old[metric]} → {row[metric]}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark against a local mock API")
+    parser.add_argument('--sizes', default="10,100,1000,10000", help="Comma-separated catalog sizes")
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--history-length', type=int, default=30)
+    parser.add_argument('--rate', type=float, default=50.0, help="Starting requests per second")
+    parser.add_argument('--throttle-wait', type=float, default=2.0,
+                        help="Longest shared backoff after a 429, in seconds (config: throttle_wait_max)")
+    parser.add_argument('--min-rate', type=float, default=10.0,
+                        help="AIMD floor for the request rate (config: min_request_rate)")
+    parser.add_argument('--min-concurrency', type=int, default=4,
+                        help="AIMD floor for in-flight requests (config: min_concurrency)")
+    parser.add_argument('--retry-rate', type=float, default=retry_pass_rate,
+                        help="Requests per second of the separately timed retry pass")
+    parser.add_argument('--skip-retry-pass', action='store_true', help="Do not run the retry pass")
+    parser.add_argument('--no-batch', action='store_true', help="Disable multi-item batching")
+    parser.add_argument('--save-baseline', action='store_true', help=f"Save results to {BASELINE_FILE}")
+    parser.add_argument('--compare', action='store_true', help=f"Compare results with {BASELINE_FILE}")
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    return parser.parse_args(argv)
+
+
+async def main(argv=None):
+    args = parse_args(argv)
+    sizes = [int(size) for size in args.sizes.split(",")]
+    profit_analyzer.batch_requests = not args.no_batch
+    # Short 429 backoff so throttling tests finish quickly
+    profit_analyzer.throttle_wait_base = min(profit_analyzer.throttle_wait_base, args.throttle_wait / 2)
+    profit_analyzer.throttle_wait_max = min(profit_analyzer.throttle_wait_max, args.throttle_wait)
+    # AIMD floor of the benchmark (the production floor would crawl under heavy 429 injection)
+    profit_analyzer.min_request_rate = min(args.min_rate, args.rate)
+    profit_analyzer.min_concurrency = args.min_concurrency
+
+    process = await start_mock_server(args.port, args)
+    base_url = f"http://127.0.0.1:{args.port}"
+    results = []
+    try:
+        for size in sizes:
+            print(f"⏱️ {size}件を計測中...", flush=True)
+            results.append(await run_size(base_url, size, args))
+    finally:
+        process.terminate()
+        await process.wait()
+
+    print(pd.DataFrame(results).to_string(index=False), flush=True)
+
+    settings = {key: value for key, value in vars(args).items() if key not in ('save_baseline', 'compare')}
+    if args.compare:
+        if not os.path.exists(BASELINE_FILE):
+            print(f"⚠️ ベースライン {BASELINE_FILE} がありません", flush=True)
+        else:
+            with open(BASELINE_FILE, encoding='utf-8') as f:
+                regressions = compare_with_baseline(results, json.load(f), args.tolerance)
+            if regressions:
+                print("❌ 性能劣化を検出:", flush=True)
+                for regression in regressions:
+                    print(f"   {regression}", flush=True)
+                return 1
+            print("✅ ベースラインからの劣化なし", flush=True)
+
+    if args.save_baseline:
+        with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+            json.dump({'settings': settings, 'results': results}, f, indent=2)
+        print(f"💾 ベースラインを {BASELINE_FILE} に保存しました", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
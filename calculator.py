@@ -3,7 +3,14 @@ Calculator module for Albion Cost Calculator
 Contains functions for recipe generation, cost calculation, and item list generation
 """
 
-from config import material_prices, base_recipes, return_rate
+import os
+
+from config import (
+    SERVERS, TARGET_SERVERS, material_prices, raw_material_prices, base_recipes, return_rate, material_api_names,
+    live_material_prices, material_price_city,
+    response_cache_enabled, response_cache_path, response_cache_ttl, response_cache_max_bytes
+)
+from catalog import load_catalog, parse_item_id
 
 
 def get_recipe_for_item(item_id):
@@ -19,19 +26,15 @@ def get_recipe_for_item(item_id):
               Example: {"T5_BAR@1": 16, "T5_LEATHER@1": 8}
         None: If recipe cannot be generated
     """
-    parts = item_id.split("_", 1)
-    if len(parts) != 2:
-        return None
-
-    tier, item_part = parts
+    # Catalog items carry their precomputed recipe
+    entry = load_catalog().get(item_id)
+    if entry is not None:
+        return dict(entry.recipe)
 
-    # Extract enchantment level
-    if "@" in item_part:
-        base_item, enchant_str = item_part.split("@", 1)
-        enchant = f"@{enchant_str}"
-    else:
-        base_item = item_part
-        enchant = ""
+    parsed = parse_item_id(item_id)
+    if parsed is None:
+        return None
+    tier, base_item, enchant = parsed
 
     # Check if base recipe exists
     if base_item not in base_recipes:
@@ -44,6 +47,50 @@ def get_recipe_for_item(item_id):
     return recipe
 
 
+def material_api_id(material_id):
+    """
+    Convert a recipe material ID to the item ID used by the market API.
+
+    Args:
+        material_id (str): Material ID as used in recipes (e.g. "T5_PLANK@1")
+
+    Returns:
+        str: API item ID (e.g. "T5_PLANKS_LEVEL1@1", "T6_METALBAR")
+    """
+    base, _, level = material_id.partition("@")
+    tier, _, kind = base.partition("_")
+    api_base = f"{tier}_{material_api_names.get(kind, kind)}" if kind else base
+    if not level:
+        return api_base
+    return f"{api_base}_LEVEL{level}@{level}"
+
+
+def current_material_prices():
+    """
+    Material prices as of the latest analyzer run.
+
+    The live prices the run cached (profit_analyzer.fetch_material_prices)
+    override config.material_prices and raw_material_prices, even past their
+    TTL, so costs computed outside a run match the published ranking.
+
+    Returns:
+        dict: Market prices of recipe and raw materials
+    """
+    prices = {**material_prices, **raw_material_prices}
+    if not (live_material_prices and response_cache_enabled and os.path.exists(response_cache_path)):
+        return prices
+
+    from response_cache import ResponseCache, MATERIAL_PRICES_KEY
+    cache = ResponseCache(response_cache_path, response_cache_ttl, response_cache_max_bytes)
+    try:
+        entry = cache.get(SERVERS[TARGET_SERVERS[0]], MATERIAL_PRICES_KEY, material_price_city, 0)
+    finally:
+        cache.close()
+    if entry is not None:
+        prices.update(entry.payload['prices'])
+    return prices
+
+
 def calculate_cost(item_id):
     """
     Calculate the crafting cost of an item after accounting for resource return rate.
@@ -0,0 +1,259 @@
+"""
+Catalog module for Albion Cost Calculator
+Index of every craftable item (base_recipes × tiers × enchantments) with its
+parsed fields, cached on disk and used for lookups and filtering
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+from collections import namedtuple
+
+from config import base_recipes, catalog_tiers, catalog_enchants, catalog_cache_dir
+
+CATALOG_VERSION = 1
+
+# A relative catalog_cache_dir is resolved against this module, not the working directory
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), catalog_cache_dir)
+
+# id is the entry's position in the catalog; tier and enchant are integers (T5@1 -> 5, 1)
+CatalogEntry = namedtuple('CatalogEntry', [
+    'id', 'item_id', 'base_item', 'tier', 'enchant', 'slot', 'category', 'materials', 'recipe'
+])
+
+
+def parse_item_id(item_id):
+    """
+    Split an item ID into tier, base item and enchantment.
+
+    Args:
+        item_id (str): Item ID in format "T{tier}_{item_name}[@{enchant}]"
+
+    Returns:
+        tuple: (tier label, base item, enchant label), e.g. ("T5", "MAIN_SWORD", "@1")
+        None: If the ID has no tier prefix
+    """
+    parts = item_id.split("_", 1)
+    if len(parts) != 2:
+        return None
+    tier, item_part = parts
+    base_item, _, enchant = item_part.partition("@")
+    return tier, base_item, f"@{enchant}" if enchant else ""
+
+
+def base_item_fields(base_item):
+    """
+    Args:
+        base_item (str): Base item name (e.g. "HEAD_PLATE_SET1", "2H_BOW", "CAPE")
+
+    Returns:
+        tuple: (slot, category), e.g. ("HEAD", "PLATE"), ("2H", "BOW"), ("CAPE", "CAPE")
+    """
+    parts = base_item.split("_")
+    if len(parts) == 1:
+        return parts[0], parts[0]
+    return parts[0], parts[1]
+
+
+def build_entries(tiers=catalog_tiers, enchants=catalog_enchants):
+    """
+    Build catalog entries from base_recipes.
+
+    Args:
+        tiers (list): Tier labels (e.g. ["T4", "T5"])
+        enchants (list): Enchant labels (e.g. ["", "@1"])
+
+    Returns:
+        list: CatalogEntry per item, ordered by base item, tier and enchantment
+    """
+    entries = []
+    for base_item, base_recipe in base_recipes.items():
+        slot, category = base_item_fields(base_item)
+        for tier in tiers:
+            for enchant in enchants:
+                entries.append(CatalogEntry(
+                    len(entries), f"{tier}_{base_item}{enchant}", base_item,
+                    int(tier[1:]), int(enchant[1:]) if enchant else 0, slot, category,
+                    tuple(base_recipe),
+                    {f"{tier}_{mat}{enchant}": qty for mat, qty in base_recipe.items()}
+                ))
+    return entries
+
+
+def config_hash(tiers=catalog_tiers, enchants=catalog_enchants):
+    """
+    Returns:
+        str: Hash of everything the catalog is built from
+    """
+    source = json.dumps({'version': CATALOG_VERSION, 'recipes': base_recipes, 'tiers': tiers, 'enchants': enchants},
+                        sort_keys=True)
+    return hashlib.sha1(source.encode()).hexdigest()[:16]
+
+
+class Catalog:
+    """
+    Item index with lookups by item ID and filters on the parsed fields.
+    """
+
+    def __init__(self, entries):
+        """
+        Args:
+            entries (list): CatalogEntry objects (ids must match their positions)
+        """
+        self.entries = entries
+        self.index = {entry.item_id: entry.id for entry in entries}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, item_id):
+        """
+        Args:
+            item_id (str): Item ID
+
+        Returns:
+            CatalogEntry: The entry, or None if the item is not in the catalog
+        """
+        entry_id = self.index.get(item_id)
+        return None if entry_id is None else self.entries[entry_id]
+
+    def filter(self, names=None, tiers=None, min_tier=None, max_tier=None, enchants=None,
+               slots=None, categories=None, materials=None):
+        """
+        Select entries; every given condition must match.
+
+        Example: filter(categories=["PLATE"], min_tier=6, enchants=[1, 2]) or filter(materials=["LEATHER"])
+
+        Args:
+            names (list): Base item names
+            tiers (list): Tiers (integers or labels such as "T6")
+            min_tier (int): Lowest tier
+            max_tier (int): Highest tier
+            enchants (list): Enchantment levels (integers or labels such as "@1"; "" or 0 for none)
+            slots (list): Slots (e.g. "HEAD", "MAIN", "2H", "OFF")
+            categories (list): Categories (e.g. "PLATE", "SWORD", "SHIELD")
+            materials (list): Material types that must all be used (e.g. "LEATHER")
+
+        Returns:
+            list: Matching entries in catalog order
+        """
+        names = set(names) if names is not None else None
+        tiers = {_tier_number(tier) for tier in tiers} if tiers is not None else None
+        enchants = {_enchant_number(enchant) for enchant in enchants} if enchants is not None else None
+        slots = set(slots) if slots is not None else None
+        categories = set(categories) if categories is not None else None
+        materials = set(materials) if materials is not None else None
+
+        return [
+            entry for entry in self.entries
+            if (names is None or entry.base_item in names)
+            and (tiers is None or entry.tier in tiers)
+            and (min_tier is None or entry.tier >= min_tier)
+            and (max_tier is None or entry.tier <= max_tier)
+            and (enchants is None or entry.enchant in enchants)
+            and (slots is None or entry.slot in slots)
+            and (categories is None or entry.category in categories)
+            and (materials is None or materials.issubset(entry.materials))
+        ]
+
+    def item_ids(self, **conditions):
+        """
+        Args:
+            **conditions: Filter conditions (see filter)
+
+        Returns:
+            list: Item IDs of the matching entries
+        """
+        return [entry.item_id for entry in self.filter(**conditions)]
+
+    def labels(self, item_id):
+        """
+        Args:
+            item_id (str): Item ID (items outside the catalog are parsed from the ID)
+
+        Returns:
+            tuple: (tier label, enchant label), e.g. ("T5", "@1"); ("", "") if not parseable
+        """
+        entry = self.get(item_id)
+        if entry is not None:
+            return f"T{entry.tier}", f"@{entry.enchant}" if entry.enchant else ""
+        parsed = parse_item_id(item_id)
+        return (parsed[0], parsed[2]) if parsed else ("", "")
+
+
+def _tier_number(tier):
+    return int(tier[1:]) if isinstance(tier, str) else tier
+
+
+def _enchant_number(enchant):
+    if isinstance(enchant, str):
+        return int(enchant[1:]) if enchant else 0
+    return enchant
+
+
+_catalog = None
+
+
+def load_catalog():
+    """
+    Get the catalog for the current config, from the on-disk cache when possible.
+
+    The cache file name includes a hash of base_recipes and the catalog tiers
+    and enchantments, so any change to them builds a new index. When the
+    cache directory cannot be written, the index is built in memory only.
+
+    Returns:
+        Catalog: The shared catalog
+    """
+    global _catalog
+    if _catalog is not None:
+        return _catalog
+
+    path = os.path.join(CACHE_DIR, f"catalog-{config_hash()}.json")
+    entries = None
+    if os.path.exists(path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                entries = [CatalogEntry(*row[:7], tuple(row[7]), row[8]) for row in json.load(f)]
+        except (OSError, ValueError, TypeError):
+            entries = None
+    if entries is None:
+        entries = build_entries()
+        _write_cache(path, entries)
+
+    _catalog = Catalog(entries)
+    return _catalog
+
+
+def _write_cache(path, entries):
+    # Per-process temporary name, so concurrent builders never share a partial file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump([list(entry) for entry in entries], f)
+        os.replace(tmp_path, path)
+    except OSError:
+        # Read-only install: the catalog is simply rebuilt next time
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+
+
+def select_target_items():
+    """
+    Get the item IDs to analyze, as configured in item_lists.py.
+
+    ITEM_FILTER selects by catalog fields when set; otherwise ALL_ITEM_NAMES,
+    DEFAULT_TIERS and DEFAULT_ENCHANTS are used.
+
+    Returns:
+        list: Item IDs
+    """
+    from item_lists import ALL_ITEM_NAMES, DEFAULT_TIERS, DEFAULT_ENCHANTS, ITEM_FILTER
+    catalog = load_catalog()
+    if ITEM_FILTER:
+        return catalog.item_ids(**ITEM_FILTER)
+    # Keep the name → tier → enchant order of generate_all_items
+    return [f"{tier}_{name}{enchant}" for name in ALL_ITEM_NAMES for tier in DEFAULT_TIERS
+            for enchant in DEFAULT_ENCHANTS]
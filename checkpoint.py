@@ -0,0 +1,86 @@
+"""
+Checkpoint module for Albion Cost Calculator
+Journals each completed item's latest records so an interrupted run can resume
+"""
+
+import json
+import os
+
+
+class CheckpointJournal:
+    """
+    Append-only NDJSON journal of completed items.
+
+    Each line holds one item's parsed latest records for one server. Lines are
+    flushed as units complete, so a crash loses at most the unit in flight; a
+    truncated last line is ignored on load.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Journal file
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = None
+
+    def load(self):
+        """
+        Read the journal.
+
+        Returns:
+            dict: Mapping of server name to {item ID: list of latest records}
+        """
+        completed = {}
+        if not os.path.exists(self.path):
+            return completed
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                completed.setdefault(entry['server'], {})[entry['item_id']] = entry['records']
+        return completed
+
+    def open(self, resume=False):
+        """
+        Open the journal for appending.
+
+        Args:
+            resume (bool): Keep existing entries (otherwise the journal is truncated)
+        """
+        self.file = open(self.path, 'a' if resume else 'w', encoding='utf-8')
+
+    def record(self, server, item_ids, records):
+        """
+        Journal completed items.
+
+        Args:
+            server (str): Server name
+            item_ids (list): Items that finished (including ones the API had no data for)
+            records (list): Latest records of those items
+        """
+        by_item = {item: [] for item in item_ids}
+        for record in records:
+            by_item.setdefault(record['item_id'], []).append(record)
+        for item, item_records in by_item.items():
+            self.file.write(json.dumps({'server': server, 'item_id': item, 'records': item_records},
+                                       ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def close(self, finished=False):
+        """
+        Close the journal.
+
+        Args:
+            finished (bool): The run completed, so the journal is deleted
+        """
+        if self.file:
+            self.file.close()
+            self.file = None
+        if finished and os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,326 @@
+"""
+Command line entry point for Albion Cost Calculator
+Subcommands import only what they need; `query` answers single items from the
+local history store or response cache without loading pandas or aiohttp
+"""
+
+import argparse
+import sys
+from datetime import datetime, timedelta
+
+from config import (
+    SERVERS, TARGET_SERVERS, SELL_LOCATIONS,
+    response_cache_enabled, response_cache_path, response_cache_ttl, response_cache_max_bytes,
+    history_store_enabled, history_store_path, latest_window_days, crafting_chain_enabled
+)
+from calculator import current_material_prices
+
+TIME_SCALE = 6
+
+
+def targets():
+    """
+    Returns:
+        list: (server name, base URL, locations) for every configured server
+              (profit_analyzer.market_targets without importing profit_analyzer)
+    """
+    return [(server, SERVERS[server], tuple(SELL_LOCATIONS)) for server in TARGET_SERVERS]
+
+
+def cost_engine(items):
+    """
+    Build the item costs the way a run does.
+
+    Args:
+        items (list): Item IDs
+
+    Returns:
+        CostEngine: Recipe matrix over the latest run's material prices (config prices where none
+                    were cached), solved over the refining chain if enabled
+    """
+    from cost_engine import CostEngine
+    prices = current_material_prices()
+    chain = None
+    if crafting_chain_enabled:
+        from crafting_chain import CraftingChain
+        chain = CraftingChain(prices)
+    return CostEngine(items, prices=prices, chain=chain)
+
+
+def window_start():
+    if not latest_window_days:
+        return None
+    return (datetime.now() - timedelta(days=latest_window_days)).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def stored_records(items):
+    """
+    Read the latest records of the items from the history store.
+
+    Returns:
+        list: Records in the format of history_parser.extract_latest_records
+    """
+    if not history_store_enabled:
+        return []
+    from history_store import HistoryStore
+    store = HistoryStore(history_store_path)
+    try:
+        return [record for server, base_url, locations in targets()
+                for record in store.latest_records(base_url, items, locations, server, window_start())]
+    finally:
+        store.close()
+
+
+def cached_records(items, include_stale=False):
+    """
+    Read the latest records of the items from the response cache.
+
+    Only full-history entries are used; delta responses (history from a
+    start date on) are cached under their own key and never match here.
+
+    Args:
+        items (list): Item IDs
+        include_stale (bool): Also use entries past their TTL
+
+    Returns:
+        list: Records in the format of history_parser.extract_latest_records
+    """
+    if not response_cache_enabled:
+        return []
+    from response_cache import ResponseCache
+    from history_parser import latest_point, window_summary
+
+    since = window_start()
+    cache = ResponseCache(response_cache_path, response_cache_ttl, response_cache_max_bytes)
+    records = []
+    try:
+        for server, base_url, locations in targets():
+            for item in items:
+                entry = cache.get(base_url, item, ",".join(locations), TIME_SCALE)
+                if entry is None or not (entry.fresh or include_stale):
+                    continue
+                for record in entry.payload:
+                    time_series = record.get('data', [])
+                    point = window_summary(time_series, since) if since else latest_point(time_series)
+                    if point:
+                        records.append({
+                            'item_id': item, 'quality': record.get('quality'),
+                            'latest_timestamp': point.get('timestamp'), 'avg_price': point.get('avg_price', 0),
+                            'item_count': point.get('item_count', 0),
+                            'location': record.get('location') or locations[0], 'server': server
+                        })
+    finally:
+        cache.close()
+    return records
+
+
+def fetched_records(items):
+    """
+    Fetch the items from the API (loads the full analyzer).
+
+    Returns:
+        list: Latest records of the fetched items
+    """
+    import asyncio
+    import contextlib
+    import io
+    from profit_analyzer import market_targets, create_scheduler, create_session, get_latest_timeseries_data
+    from record_buffer import RecordBuffer
+
+    async def fetch():
+        buffer = RecordBuffer()
+        async with create_session() as session:
+            for target in market_targets():
+                await get_latest_timeseries_data(items, scheduler=create_scheduler(), session=session,
+                                                 target=target, buffer=buffer)
+        return buffer
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        buffer = asyncio.run(fetch())
+    return [dict(record, latest_timestamp=str(record['latest_timestamp'])) for record in buffer.records()]
+
+
+def best_venues(records, cutoff):
+    """
+    Reduce records to each item's best venue (same rules as build_ranking).
+
+    Args:
+        records (list): Latest records
+        cutoff (str): ISO timestamp; older records are ignored
+
+    Returns:
+        dict: Mapping of item ID to its best venue summary
+    """
+    venues = {}
+    for record in records:
+        timestamp = str(record['latest_timestamp']).replace(" ", "T")[:19]
+        if timestamp < cutoff:
+            continue
+        venue = venues.setdefault((record['item_id'], record['server'], record['location']), [0.0, 0, ""])
+        venue[0] += record['avg_price'] * record['item_count']
+        venue[1] += record['item_count']
+        venue[2] = max(venue[2], timestamp)
+
+    best = {}
+    for (item, server, location), (value, count, latest) in venues.items():
+        if count <= 0:
+            continue
+        price = value / count
+        if item not in best or price > best[item]['avg_price']:
+            best[item] = {'server': server, 'location': location, 'avg_price': price,
+                          'trade_count': count, 'latest_update': latest}
+    return best
+
+
+def query(items, offline=False):
+    """
+    Print cost, price and profit for a few items, preferring local data.
+
+    Args:
+        items (list): Item IDs
+        offline (bool): Never call the API (stale cache entries are used instead)
+
+    Returns:
+        int: Exit code
+    """
+    cutoff = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%dT%H:%M:%S")
+    sources = {}
+
+    records = stored_records(items)
+    best = best_venues(records, cutoff)
+    sources.update((item, "store") for item in best)
+
+    missing = [item for item in items if item not in best]
+    if missing:
+        cache_best = best_venues(cached_records(missing, include_stale=offline), cutoff)
+        best.update(cache_best)
+        sources.update((item, "cache") for item in cache_best)
+
+    missing = [item for item in items if item not in best]
+    if missing and not offline:
+        print(f"🌐 APIから取得中: {len(missing)}件", file=sys.stderr, flush=True)
+        api_best = best_venues(fetched_records(missing), cutoff)
+        best.update(api_best)
+        sources.update((item, "api") for item in api_best)
+
+    costs = cost_engine(items)
+
+    print(f"{'item_id':<24} {'server':<8} {'location':<14} {'cost':>10} {'avg_price':>10} {'profit':>10} "
+          f"{'profit_pct':>10} {'trades':>7} {'latest_update':<19} source")
+    for item in items:
+        cost = costs.cost(item)
+        venue = best.get(item)
+        cost_text = f"{cost:>10.0f}" if cost is not None else f"{'-':>10}"
+        if venue is None:
+            print(f"{item:<24} {'-':<8} {'-':<14} {cost_text} {'-':>10} {'-':>10} {'-':>10} {'-':>7} {'-':<19} -")
+            continue
+        profit = venue['avg_price'] - cost if cost is not None else None
+        profit_text = f"{profit:>10.0f}" if profit is not None else f"{'-':>10}"
+        pct_text = f"{profit / cost * 100:>9.1f}%" if profit is not None and cost > 0 else f"{'-':>10}"
+        print(f"{item:<24} {venue['server']:<8} {venue['location']:<14} {cost_text} {venue['avg_price']:>10.0f} "
+              f"{profit_text} {pct_text} {venue['trade_count']:>7} {venue['latest_update']:<19} {sources[item]}")
+    return 0 if len(best) == len(items) else 1
+
+
+def list_items(args):
+    """
+    Print the catalog items matching the filter options.
+
+    Args:
+        args (argparse.Namespace): Parsed `items` options
+
+    Returns:
+        int: Exit code
+    """
+    from catalog import load_catalog
+
+    def values(text, convert=str):
+        return [convert(value) for value in text.split(",")] if text else None
+
+    entries = load_catalog().filter(
+        names=values(args.names), tiers=values(args.tiers, int), min_tier=args.min_tier, max_tier=args.max_tier,
+        enchants=values(args.enchants, int), slots=values(args.slots), categories=values(args.categories),
+        materials=values(args.materials)
+    )
+    costs = cost_engine([entry.item_id for entry in entries]) if args.costs else None
+    for entry in entries:
+        if costs is not None:
+            cost = costs.cost(entry.item_id)
+            print(f"{entry.item_id:<28} {cost:>10.0f}" if cost is not None else f"{entry.item_id:<28} {'-':>10}")
+        else:
+            print(entry.item_id)
+    print(f"{len(entries)}件", file=sys.stderr, flush=True)
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Albion Online crafting profit tools")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    query_parser = commands.add_parser('query', help="Show cost and profit for a few items")
+    query_parser.add_argument('items', nargs='+', help="Item IDs (e.g. T6_2H_CLAYMORE@1)")
+    query_parser.add_argument('--offline', action='store_true', help="Only use the local store and cache")
+
+    items_parser = commands.add_parser('items', help="List catalog items matching a filter")
+    items_parser.add_argument('--names', help="Base item names (e.g. OFF_SHIELD,CAPE)")
+    items_parser.add_argument('--tiers', help="Tiers (e.g. 5,6)")
+    items_parser.add_argument('--min-tier', type=int)
+    items_parser.add_argument('--max-tier', type=int)
+    items_parser.add_argument('--enchants', help="Enchantment levels (e.g. 1,2; 0 for none)")
+    items_parser.add_argument('--slots', help="Slots (e.g. HEAD,ARMOR,SHOES,MAIN,2H,OFF)")
+    items_parser.add_argument('--categories', help="Categories (e.g. PLATE,LEATHER,CLOTH,SWORD)")
+    items_parser.add_argument('--materials', help="Materials every item must use (e.g. LEATHER)")
+    items_parser.add_argument('--costs', action='store_true', help="Also print crafting costs")
+
+    # The remaining commands pass their arguments through to the module's own parser
+    for name, help_text in (('run', "Full catalog analysis (profit_analyzer.py)"),
+                            ('daemon', "Resident refresh mode (daemon.py)"),
+                            ('sweep', "Scenario sweep (scenario_sweep.py)"),
+                            ('backtest', "Margin backtest over stored history (backtest.py)"),
+                            ('profiles', "Several analysis profiles from one fetch (profiles.py)"),
+                            ('benchmark', "Offline benchmark (benchmark.py)"),
+                            ('serve', "HTTP/JSON query service (query_service.py)")):
+        commands.add_parser(name, help=help_text, add_help=False)
+
+    args, extra = parser.parse_known_args(argv)
+    if args.command in ('query', 'items') and extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    args.args = extra
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == 'query':
+        return query(args.items, args.offline)
+    if args.command == 'items':
+        return list_items(args)
+
+    if args.command == 'sweep':
+        import scenario_sweep
+        return scenario_sweep.main(args.args)
+    if args.command == 'backtest':
+        import backtest
+        return backtest.main(args.args)
+    if args.command == 'serve':
+        import query_service
+        return query_service.main(args.args)
+
+    import asyncio
+    if args.command == 'run':
+        import profit_analyzer
+        asyncio.run(profit_analyzer.main(args.args))
+        return 0
+    if args.command == 'profiles':
+        import profiles
+        return asyncio.run(profiles.main(args.args))
+    if args.command == 'daemon':
+        import daemon
+        asyncio.run(daemon.main())
+        return 0
+    import benchmark
+    return asyncio.run(benchmark.main(args.args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
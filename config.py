@@ -3,24 +3,218 @@ Configuration module for Albion Cost Calculator
 Contains material prices, recipes, and API settings
 """
 
+import os
+
 # ===== API Settings =====
-BASE_URL = "https://east.albion-online-data.com"
+SERVERS = {
+    "east": "https://east.albion-online-data.com",
+    "west": "https://west.albion-online-data.com",
+    "europe": "https://europe.albion-online-data.com",
+}
+# ALBION_API_URL points every server at another API, e.g. a local mock_api.py
+if os.environ.get("ALBION_API_URL"):
+    SERVERS = {name: os.environ["ALBION_API_URL"].rstrip("/") for name in SERVERS}
+BASE_URL = SERVERS["east"]
 BLACK_MARKET = "Black Market"
 
+# Servers and sell locations fetched in one run; profit is computed against
+# the best venue per item. Royal cities: "Bridgewatch", "Fort Sterling",
+# "Lymhurst", "Martlock", "Thetford" (plus "Caerleon").
+TARGET_SERVERS = ["east"]
+SELL_LOCATIONS = [BLACK_MARKET]
+
+# Shared connection pool (keep-alive connections per API host)
+connection_pool_size = 16
+keepalive_timeout = 30
+
 # Return rate for crafting
 return_rate = 0.152
 
 # API request settings
 retries = 5
-chunk_size = 7
 timeout = 10
 concurrent_requests = 7
 
+# Token bucket request scheduler
+# The public API allows roughly 180 requests per minute / 300 per 5 minutes
+request_rate = 1.0  # Sustained requests per second
+request_burst = 5   # Requests that may be sent back-to-back after idle
+
+# Adaptive (AIMD) concurrency control
+# concurrent_requests and request_rate are the starting points; fast 200s grow
+# them additively, 429s and timeouts cut them multiplicatively.
+adaptive_concurrency = True
+min_concurrency = 1
+max_concurrency = 16
+min_request_rate = 0.2
+max_request_rate = 3.0
+aimd_increase = 1.0         # In-flight limit added per window of fast responses
+aimd_rate_increase = 0.1    # Requests/second added per window of fast responses
+aimd_decrease = 0.5         # Multiplier applied on 429 or timeout
+aimd_cooldown = 2.0         # Minimum seconds between two decreases
+slow_response_seconds = 2.0 # Slower successes do not grow the limits
+
 # Wait time settings
-normal_wait_min = 0.4
+normal_wait_min = 0.4    # Retry wait after a non-429 error
 normal_wait_max = 0.8
-throttle_wait_base = 30  # Base wait time when 429 occurs
-throttle_wait_max = 60   # Max wait time when 429 occurs
+throttle_wait_base = 30  # Base shared backoff when 429 occurs
+throttle_wait_max = 60   # Max shared backoff when 429 occurs
+
+# Batched history requests
+# The history endpoint accepts comma-separated item IDs, so many items can
+# share one request as long as the URL stays within max_url_length.
+batch_requests = True
+max_url_length = 4096
+# A multi-item batch is split in half after batch_retries HTTP errors; 429s and
+# timeouts retry the whole batch (up to retries) and never split it.
+batch_retries = 2
+
+# On-disk response cache
+# time-scale=6 history only changes a few times a day, so repeat runs within
+# the TTL are served locally; expired entries are revalidated with ETag /
+# Last-Modified when the server provides them.
+response_cache_enabled = True
+response_cache_path = "cache/responses.sqlite3"
+response_cache_ttl = 2 * 60 * 60                # Seconds
+response_cache_max_bytes = 200 * 1024 * 1024    # LRU eviction above this size
+
+# Local history store
+# Every downloaded history point is kept; later runs only request the window
+# after each item's last stored day.
+history_store_enabled = True
+history_store_path = "cache/history.sqlite3"
+
+# Live material prices
+# Current sell orders for recipe materials are fetched from this city at the
+# start of a run; material_prices below is the fallback for anything missing.
+live_material_prices = True
+material_price_city = "Caerleon"
+
+# Market API names of the recipe material types where they differ
+# (T5_PLANK@1 -> T5_PLANKS_LEVEL1@1, T6_BAR -> T6_METALBAR); LEATHER, CLOTH
+# and the raw WOOD, ORE, HIDE and FIBER keep their names.
+material_api_names = {"PLANK": "PLANKS", "BAR": "METALBAR"}
+
+# Daemon mode (daemon.py)
+# Items are refreshed when their age exceeds daemon_refresh_interval,
+# shortened for items whose price has been moving.
+daemon_tick_seconds = 30
+daemon_refresh_interval = 15 * 60
+daemon_volatility_weight = 10.0   # 10% average price change -> refreshed twice as often
+daemon_volatility_alpha = 0.3     # EWMA smoothing of price changes
+daemon_max_items_per_tick = 200
+daemon_material_interval = 30 * 60
+daemon_snapshot_path = "item_profit_analysis_live.csv"
+daemon_changes_path = "item_profit_changes.ndjson"
+
+# Scenario sweep (scenario_sweep.py)
+# Every combination of these grids is evaluated against the stored market data.
+sweep_return_rates = [0.152, 0.248, 0.435, 0.479]  # No focus / city bonus / focus / focus + bonus
+sweep_tax_rates = [0.065, 0.105]                   # Premium / non-premium tax plus 2.5% setup fee
+sweep_station_fees = [0]                           # Silver per crafted item
+sweep_price_multipliers = [0.8, 0.9, 1.0, 1.1, 1.2]
+sweep_summary_path = "scenario_sweep_summary.csv"
+sweep_results_path = "scenario_sweep_results.npz"
+
+# Run metrics
+# Every request attempt (latency, status, retries, waits) and stage timings
+# are recorded; set a path to None to skip that export.
+metrics_enabled = True
+metrics_jsonl_path = "run_metrics.jsonl"
+metrics_prometheus_path = "run_metrics.prom"
+
+# Checkpoints and deferred retries
+# Completed items are journaled as they arrive so `--resume` can skip them
+# after a crash; items that fail every retry get one more slow pass at the end.
+checkpoint_path = "cache/checkpoint.ndjson"
+retry_pass_enabled = True
+retry_pass_rate = 0.25     # Requests per second during the retry pass
+retry_pass_delay = 10      # Seconds to wait before the retry pass
+
+# History parsing
+# Response bodies of at least parse_offload_bytes are decoded in a process
+# pool (orjson is used when installed), which also reduces them to latest
+# records, store rows and cache blobs so only those return. latest_window_days = None keeps only
+# each series' latest point; a number of days combines the points in that
+# window into a trade-count weighted average price and total trade count.
+parse_workers = 2
+parse_offload_bytes = 1024 * 1024
+latest_window_days = None
+
+# Item catalog
+# Every base_recipes item at these tiers and enchantments is indexed once with
+# its parsed tier, enchantment, slot, category and materials; the index is
+# cached in catalog_cache_dir and rebuilt whenever recipes or these lists change.
+catalog_tiers = ["T4", "T5", "T6", "T7", "T8"]
+catalog_enchants = ["", "@1", "@2", "@3"]
+catalog_cache_dir = "cache"   # Relative paths are resolved against the project directory
+
+# Priority-ordered fetching
+# Items are requested in order of expected value: the profit_pct of the
+# previous ranking (adjusted by how related items moved in this run), trade
+# volume and data age. Once the top priority_top_n candidates are fresh, a
+# provisional ranking is printed and written to priority_partial_path.
+priority_fetch_enabled = True
+priority_history_path = "item_profit_analysis_7days.csv"  # Ranking of the previous run
+priority_top_n = 20
+priority_staleness_days = 7       # Data this old doubles an item's priority
+priority_partial_path = "item_profit_analysis_top.csv"
+
+# Query service (query_service.py, also started by daemon.py when service_enabled)
+# Serves the ranking over HTTP/JSON from memory; the table is swapped on every
+# refresh (daemon) or whenever service_csv_path changes (standalone).
+service_enabled = True
+service_host = "127.0.0.1"
+service_port = 8080
+service_csv_path = "item_profit_analysis_7days.csv"
+service_poll_seconds = 5
+service_max_limit = 1000
+
+# Crafting portfolio (portfolio.py)
+# After each ranking, craft quantities are chosen to maximize expected profit
+# within the silver budget and material stock; each item is capped at a share
+# of its venue's trade count. The MILP solver is used when scipy is installed,
+# otherwise (and as a safety net) a greedy plan.
+portfolio_enabled = True
+portfolio_budget = 5_000_000          # Silver
+portfolio_material_stock = {          # Max units per material; unlisted materials are unlimited
+    # "T6_BAR": 400,
+    # "T6_LEATHER@1": 120,
+}
+portfolio_volume_share = 0.5          # Share of the trade count the market can absorb
+portfolio_tax_rate = 0.065            # Premium tax plus setup fee
+portfolio_time_limit = 0.8            # Seconds for the MILP solver
+portfolio_single_item_trials = 20     # Greedy restarts from each of the most profitable items
+portfolio_path = "crafting_portfolio.csv"
+
+# Backtest (backtest.py)
+# Replays the stored daily history: rolling trade-count weighted prices per
+# window, costs from the stored material history at material_price_city
+# (current material prices where none is stored) and margin statistics.
+backtest_windows = [1, 7, 28]      # Rolling windows in days
+backtest_days = 90                 # Days of history to replay (None for all)
+backtest_hit_threshold_pct = 0.0   # A day is a hit when its margin exceeds this
+backtest_summary_path = "backtest_summary.csv"
+
+# Analysis profiles (profiles.py)
+# Market data for the union of every profile's items is fetched once; each
+# profile's costs and ranking are then computed in its own worker process.
+profiles_path = "profiles.json"
+profile_workers = 0                     # Worker processes (0 = one per CPU core)
+profile_output_dir = "profile_results"  # Default location of each profile's ranking CSV
+
+# Quality pricing and streaming output
+# Each quality gets its own weighted price and margin (masterpieces sell very
+# differently from normal items); the per-quality ranking is written to
+# quality_ranking_path next to the merged one. Results are also appended to a
+# stream as every request unit completes: "ndjson" (one JSON object per line),
+# "parquet" (a dataset directory of part files, needs pyarrow) or None.
+quality_pricing_enabled = True
+quality_ranking_path = "item_profit_by_quality.csv"
+stream_output_format = "ndjson"
+stream_ndjson_path = "item_profit_stream.ndjson"
+stream_parquet_dir = "item_profit_stream"
+stream_parquet_rows = 1000   # Rows buffered per Parquet part file
 
 # ===== Material Prices =====
 material_prices = {
@@ -81,6 +275,25 @@ material_prices = {
     "T7_CLOTH@2": 72775,
 }
 
+# ===== Refining =====
+# Refined materials can be bought or refined from the raw resource of the
+# same tier and enchantment plus one unenchanted refined material of the tier
+# below (T4 bar = 2 ore + T3 bar, T5 = 3 ore + T4 bar, ...). The cheaper
+# option is used for each material when crafting_chain_enabled is set.
+crafting_chain_enabled = True
+refining_return_rate = 0.367  # Refining in a city with a refining bonus, without focus
+
+refining_inputs = {"BAR": "ORE", "PLANK": "WOOD", "LEATHER": "HIDE", "CLOTH": "FIBER"}
+
+# Raw resources per refine, by tier
+refining_raw_quantities = {2: 1, 3: 2, 4: 2, 5: 3, 6: 4, 7: 5, 8: 5}
+
+# Fallback raw resource prices (live prices are fetched when live_material_prices is set)
+raw_material_prices = {
+    # "T4_ORE": 120,
+    # "T4_ORE@1": 250,
+}
+
 # ===== Recipes =====
 base_recipes = {
     "OFF_SHIELD": {"PLANK": 4, "BAR": 4},
@@ -0,0 +1,196 @@
+"""
+Cost engine module for Albion Cost Calculator
+Computes crafting costs for many items at once from a sparse recipe matrix
+"""
+
+import numpy as np
+
+from config import material_prices, return_rate
+from calculator import get_recipe_for_item, generate_all_items
+
+
+class CostEngine:
+    """
+    Items × materials quantity matrix built once from the recipes.
+
+    The matrix is stored in coordinate form (row, column, quantity), so the
+    cost of every item is a single sparse matrix-vector product against a
+    material price vector. Items with a missing material price, or without
+    a recipe, get NaN internally and None from cost() / costs(), matching
+    calculate_cost.
+
+    Costs are memoized per material price version: update_prices() only
+    recomputes the items that use a material whose price actually changed.
+
+    With a CraftingChain, prices are market prices of raw and refined
+    materials, and each recipe material costs the cheaper of buying and
+    refining it.
+    """
+
+    def __init__(self, item_ids, prices=None, rate=None, chain=None):
+        """
+        Args:
+            item_ids (list): Item IDs to include
+            prices (dict): Material prices (defaults to config.material_prices)
+            rate (float): Return rate (defaults to config.return_rate)
+            chain (CraftingChain): Optional refining chain solver
+        """
+        self.chain = chain
+        self.item_ids = list(item_ids)
+        self.item_index = {item: i for i, item in enumerate(self.item_ids)}
+        self.return_rate = return_rate if rate is None else rate
+
+        self.material_ids = []
+        self.material_index = {}
+        rows, cols, quantities = [], [], []
+        self.has_recipe = np.zeros(len(self.item_ids), dtype=bool)
+
+        for row, item in enumerate(self.item_ids):
+            recipe = get_recipe_for_item(item)
+            if not recipe:
+                continue
+            self.has_recipe[row] = True
+            for mat, qty in recipe.items():
+                col = self.material_index.get(mat)
+                if col is None:
+                    col = self.material_index[mat] = len(self.material_ids)
+                    self.material_ids.append(mat)
+                rows.append(row)
+                cols.append(col)
+                quantities.append(qty)
+
+        self.rows = np.asarray(rows, dtype=np.intp)
+        self.cols = np.asarray(cols, dtype=np.intp)
+        self.quantities = np.asarray(quantities, dtype=np.float64)
+
+        # Rows using each material, for incremental recomputation
+        order = np.argsort(self.cols, kind='stable')
+        bounds = np.searchsorted(self.cols[order], np.arange(len(self.material_ids) + 1))
+        self.material_rows = [np.unique(self.rows[order[bounds[c]:bounds[c + 1]]])
+                              for c in range(len(self.material_ids))]
+
+        self.price_version = 0
+        if prices is None:
+            prices = dict(chain.prices) if chain is not None else material_prices
+        self.set_prices(prices)
+
+    @classmethod
+    def from_catalog(cls, item_names, tiers, enchants, **kwargs):
+        """
+        Build an engine for every combination of base item, tier and enchantment.
+
+        Args:
+            item_names (list): Base item names
+            tiers (list): Tier strings
+            enchants (list): Enchantment strings
+
+        Returns:
+            CostEngine: Engine covering all generated item IDs
+        """
+        return cls(generate_all_items(item_names, tiers, enchants), **kwargs)
+
+    def price_vector(self, prices):
+        """
+        Build the material price vector (NaN for materials without a price).
+
+        Args:
+            prices (dict): Material prices
+
+        Returns:
+            np.ndarray: Price per material column
+        """
+        return np.array([prices.get(mat, np.nan) for mat in self.material_ids], dtype=np.float64)
+
+    def compute(self, price_vector):
+        """
+        Compute the cost of every item for a material price vector.
+
+        Args:
+            price_vector (np.ndarray): Price per material column
+
+        Returns:
+            np.ndarray: Cost per item after return rate (NaN if not computable)
+        """
+        raw = np.bincount(self.rows, weights=self.quantities * price_vector[self.cols],
+                          minlength=len(self.item_ids))
+        raw[~self.has_recipe] = np.nan
+        return raw * (1 - self.return_rate)
+
+    def market_ids(self):
+        """
+        Returns:
+            list: Material IDs whose market price affects the costs (including refining inputs)
+        """
+        if self.chain is not None:
+            return self.chain.upstream(self.material_ids)
+        return list(self.material_ids)
+
+    def set_prices(self, prices):
+        """
+        Replace the material prices and recompute all costs.
+
+        Args:
+            prices (dict): Material prices
+        """
+        if self.chain is not None:
+            self.chain.set_prices(prices)
+            prices = self.chain.costs(self.material_ids)
+        self.prices = self.price_vector(prices)
+        self.item_costs = self.compute(self.prices)
+        self.price_version += 1
+
+    def update_prices(self, prices):
+        """
+        Apply new material prices, recomputing only the items they affect.
+
+        Args:
+            prices (dict): Material prices (materials not listed keep their current price)
+
+        Returns:
+            list: Item IDs whose cost was recomputed
+        """
+        if self.chain is not None:
+            prices = self.chain.costs(self.chain.update_prices(prices) & set(self.material_index))
+        new_prices = self.prices.copy()
+        for mat, price in prices.items():
+            col = self.material_index.get(mat)
+            if col is not None:
+                new_prices[col] = price
+
+        # NaN != NaN, so compare missing prices explicitly
+        changed = ~((new_prices == self.prices) | (np.isnan(new_prices) & np.isnan(self.prices)))
+        changed_cols = np.flatnonzero(changed)
+        if len(changed_cols) == 0:
+            return []
+
+        affected = np.unique(np.concatenate([self.material_rows[c] for c in changed_cols]))
+        mask = np.isin(self.rows, affected)
+        raw = np.bincount(self.rows[mask], weights=self.quantities[mask] * new_prices[self.cols[mask]],
+                          minlength=len(self.item_ids))
+        self.item_costs[affected] = raw[affected] * (1 - self.return_rate)
+        self.prices = new_prices
+        self.price_version += 1
+        return [self.item_ids[row] for row in affected]
+
+    def cost(self, item_id):
+        """
+        Args:
+            item_id (str): Item ID
+
+        Returns:
+            float: Total cost after return rate adjustment
+            None: If the item is unknown or its cost cannot be calculated
+        """
+        row = self.item_index.get(item_id)
+        if row is None:
+            return None
+        value = self.item_costs[row]
+        return None if np.isnan(value) else float(value)
+
+    def costs(self):
+        """
+        Returns:
+            dict: Mapping of item ID to cost (None if not computable)
+        """
+        return {item: (None if np.isnan(value) else float(value))
+                for item, value in zip(self.item_ids, self.item_costs)}
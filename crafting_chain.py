@@ -0,0 +1,189 @@
+"""
+Crafting chain module for Albion Cost Calculator
+Solves the cheapest way to obtain each material: buy it, or refine it from raw
+resources plus the lower-tier refined material
+"""
+
+import math
+import re
+from collections import defaultdict
+
+from config import material_prices, raw_material_prices, refining_inputs, refining_raw_quantities, refining_return_rate
+
+MATERIAL_PATTERN = re.compile(r'^T(\d+)_([A-Z]+)(@\d+)?$')
+
+
+def refining_recipe(material_id):
+    """
+    Get the refining recipe of a refined material.
+
+    The raw resource has the same tier and enchantment; the lower-tier
+    refined input is always unenchanted.
+
+    Args:
+        material_id (str): Refined material ID (e.g. "T6_BAR@1")
+
+    Returns:
+        dict: Input material IDs and quantities (e.g. {"T6_ORE@1": 4, "T5_BAR": 1})
+        None: If the material is not refined (raw resources, unknown tiers)
+    """
+    match = MATERIAL_PATTERN.match(material_id)
+    if not match:
+        return None
+    tier, kind, enchant = int(match.group(1)), match.group(2), match.group(3) or ""
+    raw = refining_inputs.get(kind)
+    quantity = refining_raw_quantities.get(tier)
+    if raw is None or quantity is None:
+        return None
+
+    recipe = {f"T{tier}_{raw}{enchant}": quantity}
+    if tier - 1 in refining_raw_quantities:
+        recipe[f"T{tier - 1}_{kind}"] = 1
+    return recipe
+
+
+class CraftingChain:
+    """
+    Memoized cost solver over the raw → refined → item DAG.
+
+    Each node's cost is the lower of its market price and its refining cost
+    (inputs after the refining return rate). Solved nodes are memoized and
+    shared by every item that uses them; when a market price changes, only
+    that node and the nodes downstream of it are invalidated and re-solved.
+    """
+
+    def __init__(self, prices=None, rate=None):
+        """
+        Args:
+            prices (dict): Market prices of raw and refined materials
+                           (defaults to config.material_prices and config.raw_material_prices)
+            rate (float): Refining return rate (defaults to config.refining_return_rate)
+        """
+        self.prices = dict({**material_prices, **raw_material_prices} if prices is None else prices)
+        self.return_rate = refining_return_rate if rate is None else rate
+        self.memo = {}                       # node -> (cost, method)
+        self.dependents = defaultdict(set)   # node -> solved nodes that use it as an input
+
+    def _solve(self, node):
+        solved = self.memo.get(node)
+        if solved is not None:
+            return solved
+
+        buy = self.prices.get(node, math.nan)
+        refine = math.nan
+        recipe = refining_recipe(node)
+        if recipe:
+            total = 0.0
+            for material, quantity in recipe.items():
+                self.dependents[material].add(node)
+                total += self._solve(material)[0] * quantity
+            refine = total * (1 - self.return_rate)
+
+        if math.isnan(refine) or buy <= refine:
+            solved = (buy, None if math.isnan(buy) else "buy")
+        else:
+            solved = (refine, "refine")
+        self.memo[node] = solved
+        return solved
+
+    def cost(self, node):
+        """
+        Args:
+            node (str): Material ID
+
+        Returns:
+            float: Cheapest acquisition cost (NaN if neither buying nor refining is priced)
+        """
+        return self._solve(node)[0]
+
+    def method(self, node):
+        """
+        Args:
+            node (str): Material ID
+
+        Returns:
+            str: "buy" or "refine" (None if the node has no cost)
+        """
+        return self._solve(node)[1]
+
+    def costs(self, nodes):
+        """
+        Args:
+            nodes (list): Material IDs
+
+        Returns:
+            dict: Mapping of material ID to its cheapest cost
+        """
+        return {node: self.cost(node) for node in nodes}
+
+    def upstream(self, nodes):
+        """
+        List the nodes together with every input of their refining chains.
+
+        Args:
+            nodes (list): Material IDs
+
+        Returns:
+            list: Material IDs whose market price can affect the given nodes
+        """
+        seen = {}
+        stack = list(nodes)
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen[node] = True
+            stack.extend(refining_recipe(node) or ())
+        return list(seen)
+
+    def _invalidate(self, nodes):
+        # Drop the memo of the nodes and everything solved on top of them
+        stale = set()
+        stack = list(nodes)
+        while stack:
+            node = stack.pop()
+            if node in stale:
+                continue
+            stale.add(node)
+            stack.extend(self.dependents.get(node, ()))
+        return stale
+
+    def update_prices(self, prices):
+        """
+        Apply new market prices, re-solving only the nodes they affect.
+
+        Args:
+            prices (dict): Market prices (nodes not listed keep their current price)
+
+        Returns:
+            set: Nodes whose cheapest cost changed
+        """
+        changed = [node for node, price in prices.items() if not _same_price(self.prices.get(node), price)]
+        self.prices.update(prices)
+        return self._resolve(changed)
+
+    def set_prices(self, prices):
+        """
+        Replace all market prices.
+
+        Args:
+            prices (dict): Market prices (nodes not listed have no market price)
+
+        Returns:
+            set: Nodes whose cheapest cost changed
+        """
+        changed = [node for node in set(self.prices) | set(prices)
+                   if not _same_price(self.prices.get(node), prices.get(node))]
+        self.prices = dict(prices)
+        return self._resolve(changed)
+
+    def _resolve(self, changed):
+        stale = self._invalidate(changed)
+        previous = {node: self.memo.pop(node)[0] for node in stale if node in self.memo}
+        return {node for node, cost in previous.items() if not _same_price(cost, self.cost(node))}
+
+
+def _same_price(a, b):
+    a = math.nan if a is None else a
+    b = math.nan if b is None else b
+    return a == b or (math.isnan(a) and math.isnan(b))
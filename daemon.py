@@ -0,0 +1,321 @@
+"""
+Albion Online Profit Daemon
+Keeps the session, caches and result table in memory and refreshes items
+continuously, publishing the ranking and a feed of changed rows
+"""
+
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    live_material_prices, crafting_chain_enabled,
+    daemon_tick_seconds, daemon_refresh_interval, daemon_volatility_weight, daemon_volatility_alpha,
+    daemon_max_items_per_tick, daemon_material_interval, daemon_snapshot_path, daemon_changes_path,
+    service_enabled, portfolio_enabled, portfolio_path
+)
+from catalog import select_target_items
+from cost_engine import CostEngine
+from crafting_chain import CraftingChain
+from record_buffer import RecordBuffer
+from query_service import ProfitTable, QueryService
+from portfolio import optimize_portfolio
+from profit_analyzer import (
+    market_targets, create_scheduler, create_session, open_history_store,
+    get_latest_timeseries_data, refresh_material_prices, process_and_display_items, build_ranking
+)
+
+
+def write_atomic(path, write):
+    """
+    Write a file through a temporary file and rename it into place.
+
+    Readers always see either the previous or the new complete file.
+
+    Args:
+        path (str): Destination file
+        write (callable): Function writing the content to the path it is given
+    """
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+class ProfitDaemon:
+    """
+    Resident profit analyzer.
+
+    Each tick refreshes the items that are most overdue, weighting staleness
+    by recent price volatility, recomputes only their rows (plus rows whose
+    material cost changed) and publishes the ranking snapshot atomically (and to
+    the query service when service_enabled is set).
+    """
+
+    def __init__(self, items):
+        """
+        Args:
+            items (list): Item IDs to track
+        """
+        self.items = list(items)
+        self.cost_engine = CostEngine(self.items, chain=CraftingChain() if crafting_chain_enabled else None)
+        self.targets = market_targets()
+        self.schedulers = {target.server: create_scheduler() for target in self.targets}
+        self.store = open_history_store()
+        self.service = QueryService() if service_enabled else None
+
+        self.market = {}         # item_id -> latest records for every venue
+        self.rows = None         # per-venue results of process_and_display_items
+        self.ranking = None      # published ranking (one row per item)
+        self.last_fetched = {}
+        self.last_price = {}
+        self.volatility = {}
+        self.material_refreshed = float("-inf")
+
+    def refresh_scores(self, now):
+        """
+        Score every item by how overdue it is.
+
+        Args:
+            now (float): Current monotonic time
+
+        Returns:
+            dict: Mapping of item ID to score (>= 1 means due; never fetched is infinite)
+        """
+        scores = {}
+        for item in self.items:
+            last = self.last_fetched.get(item)
+            if last is None:
+                scores[item] = float("inf")
+            else:
+                weight = 1 + daemon_volatility_weight * self.volatility.get(item, 0.0)
+                scores[item] = (now - last) / daemon_refresh_interval * weight
+        return scores
+
+    def due_items(self, now):
+        """
+        Args:
+            now (float): Current monotonic time
+
+        Returns:
+            list: Items to refresh this tick, most overdue first
+        """
+        scores = self.refresh_scores(now)
+        due = [item for item, score in scores.items() if score >= 1]
+        due.sort(key=lambda item: scores[item], reverse=True)
+        return due[:daemon_max_items_per_tick]
+
+    async def tick(self, session):
+        """
+        Run one refresh round.
+
+        Args:
+            session (aiohttp.ClientSession): Shared HTTP session
+        """
+        now = time.monotonic()
+        changed_items = set()
+
+        if live_material_prices and now - self.material_refreshed >= daemon_material_interval:
+            primary = self.targets[0]
+            # The daemon paces material refreshes itself, so the response cache is bypassed
+            changed_items.update(await refresh_material_prices(
+                session, self.cost_engine, self.schedulers[primary.server], primary, cache=False))
+            self.material_refreshed = now
+
+        due = self.due_items(now)
+        if due:
+            print(f"\n🔄 更新対象: {len(due)}件", flush=True)
+            # Responses are always fetched fresh; the store keeps each refresh a small delta.
+            # Failed items are fetched again when they next become due, not in a slow retry pass
+            buffer = RecordBuffer()
+            await asyncio.gather(*(
+                get_latest_timeseries_data(due, time_scale=6, scheduler=self.schedulers[target.server],
+                                           session=session, target=target, cache=False, store=self.store,
+                                           retry_pass=False, buffer=buffer)
+                for target in self.targets
+            ))
+            fetched = {}
+            for row in buffer.records():
+                fetched.setdefault(row['item_id'], []).append(row)
+            for item in due:
+                self.last_fetched[item] = now
+                if item in fetched:
+                    self.market[item] = fetched[item]
+            changed_items.update(due)
+
+        if changed_items:
+            await self.recompute(changed_items)
+
+    async def recompute(self, items):
+        """
+        Recompute rows for the given items and publish the updated ranking.
+
+        Args:
+            items (set): Item IDs whose market data or cost changed
+        """
+        cutoff_date = datetime.now() - pd.Timedelta(days=7)
+        records = [record for item in items for record in self.market.get(item, [])]
+
+        new_rows = None
+        if records:
+            market_df = pd.DataFrame(records)
+            market_df['latest_timestamp'] = pd.to_datetime(market_df['latest_timestamp'])
+            market_df = market_df[market_df['latest_timestamp'] >= cutoff_date]
+            if len(market_df) > 0:
+                new_rows = process_and_display_items(None, market_df, cutoff_date, self.cost_engine)
+
+        frames = []
+        if self.rows is not None:
+            frames.append(self.rows[~self.rows['item_id'].isin(items)])
+        if new_rows is not None:
+            frames.append(new_rows)
+        if not frames:
+            return
+        self.rows = pd.concat(frames, ignore_index=True)
+
+        ranking = build_ranking(self.rows) if len(self.rows) > 0 else None
+        changes = self.diff(items, ranking)
+        self.ranking = ranking
+        await self.publish(changes)
+
+    def diff(self, items, ranking):
+        """
+        Compare the new ranking with the published one for the given items.
+
+        Also updates each item's price volatility estimate.
+
+        Args:
+            items (set): Item IDs that were recomputed
+            ranking (pd.DataFrame): New ranking (None if empty)
+
+        Returns:
+            list: Change records for the changes feed
+        """
+        old = self.ranking.set_index('item_id') if self.ranking is not None else pd.DataFrame()
+        new = ranking.set_index('item_id') if ranking is not None else pd.DataFrame()
+        timestamp = datetime.now().isoformat(timespec='seconds')
+        changes = []
+
+        for item in sorted(items):
+            in_old = item in old.index
+            in_new = item in new.index
+            if not in_old and not in_new:
+                continue
+            if not in_new:
+                changes.append({'ts': timestamp, 'change': 'removed', 'item_id': item})
+                continue
+
+            row = new.loc[item]
+            price = row['avg_price']
+            previous = self.last_price.get(item)
+            if previous:
+                move = abs(price - previous) / previous
+                self.volatility[item] = ((1 - daemon_volatility_alpha) * self.volatility.get(item, move)
+                                         + daemon_volatility_alpha * move)
+            self.last_price[item] = price
+
+            fields = ['server', 'location', 'cost', 'avg_price', 'profit', 'profit_pct', 'trade_count']
+            if in_old and all(_same(old.loc[item][field], row[field]) for field in fields):
+                continue
+            record = {'ts': timestamp, 'change': 'updated' if in_old else 'added', 'item_id': item}
+            record.update({field: _json_value(row[field]) for field in fields})
+            record['latest_update'] = str(row['latest_update'])
+            changes.append(record)
+        return changes
+
+    async def publish(self, changes):
+        """
+        Write the ranking snapshot atomically and append changes to the feed.
+
+        The files, the query table and the portfolio are built in a worker
+        thread, so the embedded query service keeps answering meanwhile.
+
+        Args:
+            changes (list): Change records for the changes feed
+        """
+        if self.ranking is not None:
+            table = await asyncio.to_thread(self.write_snapshot, self.ranking)
+            if table is not None:
+                self.service.swap(table)
+        if changes:
+            await asyncio.to_thread(append_changes, changes)
+        print(f"📤 スナップショット更新: {len(self.ranking) if self.ranking is not None else 0}件 / 変更 {len(changes)}件",
+              flush=True)
+
+    def write_snapshot(self, ranking):
+        """
+        Write the ranking (and the portfolio, if enabled) and build the query table.
+
+        Args:
+            ranking (pd.DataFrame): Ranking to publish
+
+        Returns:
+            ProfitTable: Table for the query service (None without the service)
+        """
+        write_atomic(daemon_snapshot_path, lambda path: ranking.to_csv(path, index=False))
+        if portfolio_enabled:
+            plan, _ = optimize_portfolio(ranking, self.cost_engine)
+            write_atomic(portfolio_path, lambda path: plan.to_csv(path, index=False))
+        return ProfitTable.from_frame(ranking) if self.service else None
+
+    async def run(self):
+        """
+        Refresh forever, one tick every daemon_tick_seconds.
+        """
+        if self.service:
+            await self.service.start()
+        try:
+            async with create_session() as session:
+                while True:
+                    await self.tick(session)
+                    await asyncio.sleep(daemon_tick_seconds)
+        finally:
+            if self.service:
+                await self.service.stop()
+            if self.store:
+                self.store.close()
+
+
+def append_changes(changes):
+    """
+    Append change records to the changes feed.
+
+    Args:
+        changes (list): Change records
+    """
+    with open(daemon_changes_path, 'a', encoding='utf-8') as f:
+        for change in changes:
+            f.write(json.dumps(change, ensure_ascii=False) + "\n")
+
+
+def _same(a, b):
+    if pd.isna(a) and pd.isna(b):
+        return True
+    if isinstance(a, (float, np.floating)) or isinstance(b, (float, np.floating)):
+        return bool(np.isclose(a, b))
+    return a == b
+
+
+def _json_value(value):
+    if pd.isna(value):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+async def main():
+    """
+    Start the daemon for the configured item list.
+    """
+    target_items = select_target_items()
+    print(f"🛰️ デーモン起動: {len(target_items)}件を監視", flush=True)
+    await ProfitDaemon(target_items).run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,312 @@
+"""
+Fetch priority module for Albion Cost Calculator
+Orders item fetches by expected value (last known profit, trade volume and
+data age) and signals when the best candidates of the run are fresh
+"""
+
+import asyncio
+import csv
+import heapq
+import math
+import os
+import statistics
+from collections import defaultdict, namedtuple
+from datetime import datetime
+
+from config import priority_top_n, priority_staleness_days
+from catalog import load_catalog, parse_item_id
+
+# Result of an earlier run for one item (its best venue)
+ItemPrior = namedtuple('ItemPrior', ['profit_pct', 'trade_count', 'latest_update'])
+
+# Weight of the crafting cost tie-breaker among items without any profit information
+COST_TIE_BREAK = 1e-12
+
+
+def load_priors(path):
+    """
+    Read the ranking CSV of an earlier run.
+
+    Args:
+        path (str): Ranking CSV (item_profit_analysis_7days.csv format)
+
+    Returns:
+        dict: Mapping of item ID to ItemPrior (empty if the file does not exist)
+    """
+    priors = {}
+    if not path or not os.path.exists(path):
+        return priors
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            try:
+                profit_pct = float(row.get('profit_pct') or 'nan')
+                trade_count = float(row.get('trade_count') or 0)
+            except ValueError:
+                continue
+            if math.isnan(profit_pct):
+                continue
+            priors[row['item_id']] = ItemPrior(profit_pct, trade_count, row.get('latest_update') or None)
+    return priors
+
+
+def _base_item(item_id):
+    entry = load_catalog().get(item_id)
+    if entry is not None:
+        return entry.base_item
+    parsed = parse_item_id(item_id)
+    return parsed[1] if parsed else item_id
+
+
+class FetchPriority:
+    """
+    Expected value of fetching each item, updated as results arrive.
+
+    An item's estimated profit_pct is its fresh result once fetched, otherwise
+    its previous result shifted by how much its siblings (same base item at
+    other tiers and enchantments) have moved in this run. Items without an
+    earlier result use their siblings' fresh results, or the median of all
+    earlier results. The fetch score weights the estimate by trade volume and
+    data age, so profitable, liquid, stale items are requested first.
+
+    Items without any profit information (no earlier result and no fetched
+    sibling) all score zero; among them, the ones with the higher crafting
+    cost, which carry the larger absolute margins, are fetched first.
+
+    `ready` is set once the top_n items by current estimate have been fetched
+    from every server, i.e. the head of the ranking no longer depends on data
+    that is still pending. Without earlier results (first run, new server)
+    the estimates say nothing about the ranking, so `ready` is never set.
+    """
+
+    def __init__(self, items, priors=None, servers=(), top_n=priority_top_n, staleness_days=priority_staleness_days,
+                 now=None, costs=None):
+        """
+        Args:
+            items (list): Item IDs of the run
+            priors (dict): Results of an earlier run (see load_priors)
+            servers (list): Servers an item must be fetched from to count as fresh
+            top_n (int): Number of candidates for the ready event
+            staleness_days (float): Data age that doubles an item's score
+            now (datetime): Reference time for data age (defaults to now)
+            costs (dict): Optional crafting cost per item, the fallback order without priors
+        """
+        self.items = list(items)
+        self.priors = priors or {}
+        self.servers = set(servers)
+        self.top_n = min(top_n, len(self.items))
+        self.staleness_days = staleness_days
+        self.now = now or datetime.now()
+        self.costs = {}
+
+        self.groups = {item: _base_item(item) for item in self.items}
+        self.members = defaultdict(list)
+        for item, group in self.groups.items():
+            self.members[group].append(item)
+        self.cache = {}                      # item -> (estimate, score), dropped when inputs change
+        self.changed = set()                 # items whose score may have changed since take_changed()
+        self.set_costs(costs or {})
+        self.observed = {}                   # item -> best fresh profit_pct over fetched venues
+        self.group_observed = defaultdict(dict)
+        self.fetched = defaultdict(set)      # item -> servers it has been fetched from
+        self.fresh = set()
+        self.ready = asyncio.Event()
+        self.ready_items = None
+
+        known = [prior.profit_pct for prior in self.priors.values()]
+        volumes = [prior.trade_count for prior in self.priors.values()]
+        self.default_pct = statistics.median(known) if known else 0.0
+        self.default_volume = statistics.median(volumes) if volumes else 0.0
+
+    def estimate(self, item):
+        """
+        Args:
+            item (str): Item ID
+
+        Returns:
+            float: Estimated profit_pct (-inf for fetched items without recent trades)
+        """
+        return self._evaluate(item)[0]
+
+    def score(self, item):
+        """
+        Args:
+            item (str): Item ID
+
+        Returns:
+            float: Expected value of fetching the item (higher is fetched first)
+        """
+        return self._evaluate(item)[1]
+
+    def _evaluate(self, item):
+        cached = self.cache.get(item)
+        if cached is None:
+            estimate = self._estimate(item)
+            cached = self.cache[item] = (estimate, self._score(item, estimate))
+        return cached
+
+    def _estimate(self, item):
+        if item in self.observed:
+            return self.observed[item]
+        if item in self.fresh:
+            return -math.inf
+
+        siblings = self.group_observed.get(self.groups.get(item), {})
+        prior = self.priors.get(item)
+        if prior is None:
+            return statistics.fmean(siblings.values()) if siblings else self.default_pct
+        shifts = [pct - self.priors[sibling].profit_pct for sibling, pct in siblings.items() if sibling in self.priors]
+        return prior.profit_pct + (statistics.fmean(shifts) if shifts else 0.0)
+
+    def _score(self, item, estimate):
+        prior = self.priors.get(item)
+        volume = prior.trade_count if prior else self.default_volume
+        age_days = self.staleness_days
+        if prior and prior.latest_update:
+            try:
+                age_days = max((self.now - datetime.fromisoformat(prior.latest_update)).total_seconds() / 86400, 0)
+            except ValueError:
+                pass
+        score = max(estimate, 0.0) * math.log1p(volume) * (1 + age_days / self.staleness_days)
+        return score + COST_TIE_BREAK * self.costs.get(item, 0.0)
+
+    def set_costs(self, costs):
+        """
+        Replace the crafting costs used to order items without profit information.
+
+        Args:
+            costs (dict): Crafting cost per item (None for items without one)
+        """
+        self.costs = {item: cost for item, cost in costs.items() if cost is not None and cost == cost}
+        self.changed.update(self.cache)
+        self.cache.clear()
+
+    def informed(self):
+        """
+        Returns:
+            bool: Whether earlier results exist, i.e. estimates can rank the items before they are fetched
+        """
+        return bool(self.priors)
+
+    def take_changed(self):
+        """
+        Returns:
+            set: Items whose score may have changed since the previous call
+        """
+        changed, self.changed = self.changed, set()
+        return changed
+
+    def order(self, items):
+        """
+        Args:
+            items (list): Item IDs
+
+        Returns:
+            list: The items, highest score first (ties keep their order)
+        """
+        return sorted(items, key=self.score, reverse=True)
+
+    def unit_score(self, unit):
+        """
+        Args:
+            unit (list): Item IDs of one request
+
+        Returns:
+            float: Score of the request (its best item)
+        """
+        return max((self.score(item) for item in unit), default=0.0)
+
+    def observe(self, item_averages):
+        """
+        Record fresh per-venue results.
+
+        Args:
+            item_averages (pd.DataFrame): Per-venue rows from process_and_display_items
+        """
+        for item, profit_pct in zip(item_averages['item_id'].astype(str), item_averages['profit_pct']):
+            if profit_pct != profit_pct:  # NaN: cost unknown
+                continue
+            if item not in self.observed or profit_pct > self.observed[item]:
+                group = self.groups.get(item) or _base_item(item)
+                self.observed[item] = float(profit_pct)
+                self.group_observed[group][item] = float(profit_pct)
+                # Sibling estimates depend on this result
+                for member in self.members.get(group, ()):
+                    self.cache.pop(member, None)
+                    self.changed.add(member)
+                self.cache.pop(item, None)
+                self.changed.add(item)
+
+    def complete(self, server, items):
+        """
+        Mark items as fetched from a server and check whether the top candidates are fresh.
+
+        Args:
+            server (str): Server name
+            items (list): Item IDs fetched (or served locally) for that server
+        """
+        for item in items:
+            self.fetched[item].add(server)
+            if self.fetched[item] >= self.servers:
+                self.fresh.add(item)
+                self.cache.pop(item, None)
+                self.changed.add(item)
+        if not self.ready.is_set() and self.top_n and self.informed():
+            top = heapq.nlargest(self.top_n, self.items, key=self.estimate)
+            if all(item in self.fresh for item in top):
+                self.ready_items = top
+                self.ready.set()
+
+
+class UnitQueue:
+    """
+    Pending request units, the one with the highest current score first.
+
+    Units sit in a heap keyed by their score when pushed. Before each pop,
+    the units holding an item whose score changed (reported by
+    FetchPriority.take_changed) are pushed again with their new score, and
+    superseded heap entries are skipped, so a pop costs O(log units) instead
+    of rescanning every pending unit. Without a priority, units come out in
+    their original order.
+    """
+
+    def __init__(self, units, priority=None):
+        """
+        Args:
+            units (list): (item list, start date) request units
+            priority (FetchPriority): Optional scores (FIFO order if omitted)
+        """
+        self.units = list(units)
+        self.priority = priority
+        self.pending = set(range(len(self.units)))
+        self.versions = [0] * len(self.units)
+        self.heap = []
+        self.by_item = defaultdict(list)
+        for index, (unit, _) in enumerate(self.units):
+            for item in unit:
+                self.by_item[item].append(index)
+            self._push(index)
+        if priority:
+            priority.take_changed()
+
+    def __len__(self):
+        return len(self.pending)
+
+    def _push(self, index):
+        self.versions[index] += 1
+        score = self.priority.unit_score(self.units[index][0]) if self.priority else 0.0
+        heapq.heappush(self.heap, (-score, index, self.versions[index]))
+
+    def pop(self):
+        """
+        Returns:
+            tuple: The best pending (item list, start date) unit
+        """
+        if self.priority:
+            stale = {index for item in self.priority.take_changed() for index in self.by_item.get(item, ())}
+            for index in stale & self.pending:
+                self._push(index)
+        while True:
+            _, index, version = heapq.heappop(self.heap)
+            if index in self.pending and version == self.versions[index]:
+                self.pending.remove(index)
+                return self.units[index]
@@ -0,0 +1,248 @@
+"""
+History parser module for Albion Cost Calculator
+Decodes API payloads (with orjson when installed, large ones in a worker pool)
+and reduces time series to their latest point or a recent window in one pass
+"""
+
+import json
+from collections import namedtuple
+
+from history_store import history_rows
+from response_cache import encode_payload
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def decode_json(body):
+    """
+    Args:
+        body (bytes): Raw response body
+
+    Returns:
+        object: Decoded JSON
+    """
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def latest_point(time_series):
+    """
+    Find the newest point of a time series in one pass.
+
+    Args:
+        time_series (list): Points with ISO 'timestamp' strings (in any order)
+
+    Returns:
+        dict: The point with the greatest timestamp, or None if the series is empty
+    """
+    latest = None
+    latest_timestamp = ''
+    for point in time_series:
+        timestamp = point.get('timestamp', '')
+        if latest is None or timestamp > latest_timestamp:
+            latest = point
+            latest_timestamp = timestamp
+    return latest
+
+
+def window_summary(time_series, since):
+    """
+    Summarize the points at or after a timestamp in one pass.
+
+    Args:
+        time_series (list): Points with ISO 'timestamp' strings (in any order)
+        since (str): ISO timestamp where the window starts
+
+    Returns:
+        dict: Latest timestamp, trade-count weighted average price (plain mean when
+              no trades were recorded) and total trade count; None if no point is in the window
+    """
+    latest_timestamp = None
+    count = 0
+    total_count = 0
+    price_sum = 0.0
+    weighted_sum = 0.0
+    for point in time_series:
+        timestamp = point.get('timestamp', '')
+        if timestamp < since:
+            continue
+        if latest_timestamp is None or timestamp > latest_timestamp:
+            latest_timestamp = timestamp
+        price = point.get('avg_price', 0)
+        item_count = point.get('item_count', 0)
+        count += 1
+        price_sum += price
+        total_count += item_count
+        weighted_sum += price * item_count
+    if latest_timestamp is None:
+        return None
+    return {
+        'timestamp': latest_timestamp,
+        'avg_price': weighted_sum / total_count if total_count else price_sum / count,
+        'item_count': total_count
+    }
+
+
+def split_history_by_item(item_ids, data):
+    """
+    Split a multi-item history response into per-item record lists.
+
+    Args:
+        item_ids (list): Item IDs that were requested
+        data (list): Quality records returned by the history endpoint
+
+    Returns:
+        dict: Mapping of item ID to its list of quality records
+              (empty list if the API returned no data for the item)
+    """
+    by_item = {item: [] for item in item_ids}
+    for record in data:
+        item = record.get('item_id')
+        if item in by_item:
+            by_item[item].append(record)
+    return by_item
+
+
+def extract_latest_records(item, data, server, location, since=None):
+    """
+    Extract the latest data point of each quality and location from an item's history records.
+
+    Args:
+        item (str): Item ID
+        data (list): Quality records returned by the history endpoint
+        server (str): Server name for the 'server' field
+        location (str): Location used when a record does not name one
+        since (str): Optional ISO timestamp; when given, the points from then on are
+                     combined (weighted average price, summed trade count) instead
+
+    Returns:
+        list: One dictionary per quality and location with the latest price and trade count
+    """
+    records = []
+    # Process data by quality level
+    for quality_record in data:
+        quality = quality_record.get('quality', 'unknown')
+        time_series = quality_record.get('data', [])
+
+        if time_series:
+            # Latest entry (or the summary of the recent window), found in one pass
+            latest_data = window_summary(time_series, since) if since else latest_point(time_series)
+
+            if latest_data:
+                records.append({
+                    'item_id': item,
+                    'quality': quality,
+                    'latest_timestamp': latest_data.get('timestamp'),
+                    'avg_price': latest_data.get('avg_price', 0),
+                    'item_count': latest_data.get('item_count', 0),
+                    'location': quality_record.get('location') or location,
+                    'server': server
+                })
+    return records
+
+
+# What a run keeps of an item's history: its latest records (None when the store
+# is used), its store rows (None without the store) and its cache blob (None without a cache)
+ItemHistory = namedtuple('ItemHistory', ['latest', 'rows', 'blob'])
+
+
+class HistoryReduction(namedtuple('HistoryReduction', ['server', 'location', 'since', 'store'])):
+    """
+    Reduces history responses to the ItemHistory of each requested item.
+
+    Picklable, so the reduction runs in the worker that decoded the body and
+    only the small result travels back to the event loop.
+    """
+
+    def item(self, item_id, records, encode=False):
+        """
+        Args:
+            item_id (str): Item ID
+            records (list): The item's quality records
+            encode (bool): Also encode the records for the response cache
+
+        Returns:
+            ItemHistory: What the run keeps of the item's history
+        """
+        return ItemHistory(
+            None if self.store else extract_latest_records(item_id, records, self.server, self.location, self.since),
+            history_rows(records, self.location) if self.store else None,
+            encode_payload(records) if encode else None
+        )
+
+    def __call__(self, item_ids, data, encode=False):
+        """
+        Args:
+            item_ids (list): Item IDs that were requested
+            data (list): Quality records returned by the history endpoint
+            encode (bool): Also encode each item's records for the response cache
+
+        Returns:
+            dict: Mapping of item ID to its ItemHistory
+        """
+        return {item: self.item(item, records, encode)
+                for item, records in split_history_by_item(item_ids, data).items()}
+
+
+def decode_and_reduce(body, reduce=None):
+    """
+    Args:
+        body (bytes): Raw response body
+        reduce (callable): Optional function applied to the decoded JSON
+
+    Returns:
+        object: Decoded JSON, or what reduce made of it
+    """
+    data = decode_json(body)
+    return data if reduce is None else reduce(data)
+
+
+class PayloadParser:
+    """
+    Decodes response bodies, moving large ones off the event loop.
+
+    Bodies of at least offload_bytes are decoded in a process pool, so other
+    requests keep being sent and handled while a long history is parsed. With
+    a reduce function the worker also reduces the payload and returns only the
+    result, since unpickling a full JSON tree costs about as much as decoding it.
+    """
+
+    def __init__(self, workers, offload_bytes):
+        """
+        Args:
+            workers (int): Worker processes (0 decodes everything on the event loop)
+            offload_bytes (int): Minimum body size sent to the pool
+        """
+        self.workers = workers
+        self.offload_bytes = offload_bytes
+        self.executor = None
+
+    async def parse(self, body, reduce=None):
+        """
+        Args:
+            body (bytes): Raw response body
+            reduce (callable): Optional picklable function applied to the decoded JSON
+
+        Returns:
+            object: Decoded JSON, or what reduce made of it
+        """
+        if not self.workers or len(body) < self.offload_bytes:
+            return decode_and_reduce(body, reduce)
+        # Imported here so quick queries that only use latest_point stay light
+        import asyncio
+        from concurrent.futures import ProcessPoolExecutor
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(self.workers)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, decode_and_reduce, body, reduce)
+
+    def close(self):
+        """
+        Shut down the worker pool.
+        """
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
@@ -0,0 +1,208 @@
+"""
+History store module for Albion Cost Calculator
+Keeps every downloaded market history point in an indexed SQLite table
+"""
+
+import os
+import sqlite3
+
+
+class HistoryStore:
+    """
+    Embedded time-series store of market history.
+
+    Rows are keyed by (server, item_id, quality, location, timestamp), so
+    re-ingesting an overlapping window simply replaces the same points.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): SQLite database file
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS history (
+                server TEXT NOT NULL,
+                item_id TEXT NOT NULL,
+                quality INTEGER NOT NULL,
+                location TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                avg_price REAL NOT NULL,
+                item_count INTEGER NOT NULL,
+                PRIMARY KEY (server, item_id, quality, location, timestamp)
+            ) WITHOUT ROWID
+        """)
+
+    def ingest(self, server, item_id, records, location):
+        """
+        Store all data points of an item's history response.
+
+        Args:
+            server (str): API base URL
+            item_id (str): Item ID
+            records (list): Quality records returned by the history endpoint
+            location (str): Location used when a record does not name one
+
+        Returns:
+            int: Number of data points written
+        """
+        return self.ingest_rows(server, item_id, history_rows(records, location))
+
+    def ingest_rows(self, server, item_id, rows):
+        """
+        Store data points already flattened by history_rows.
+
+        Args:
+            server (str): API base URL
+            item_id (str): Item ID
+            rows (list): (quality, location, timestamp, avg_price, item_count) tuples
+
+        Returns:
+            int: Number of data points written
+        """
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO history VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                  [(server, item_id, *row) for row in rows])
+        return len(rows)
+
+    def last_timestamps(self, server, item_ids, locations):
+        """
+        Get the newest stored timestamp of each item.
+
+        With several locations, the oldest of the per-location newest
+        timestamps is returned, so a delta fetch covers every location. An
+        item missing from any of the locations has no watermark and needs a
+        full fetch.
+
+        Args:
+            server (str): API base URL
+            item_ids (list): Item IDs to look up
+            locations (list): Market locations
+
+        Returns:
+            dict: Mapping of item ID to its newest timestamp (items without data
+                  in every location are omitted)
+        """
+        result = {}
+        location_placeholders = ",".join("?" * len(locations))
+        for chunk in _chunks(item_ids):
+            placeholders = ",".join("?" * len(chunk))
+            result.update(self.conn.execute(
+                f"SELECT item_id, MIN(last) FROM ("
+                f"SELECT item_id, MAX(timestamp) AS last FROM history "
+                f"WHERE server = ? AND location IN ({location_placeholders}) AND item_id IN ({placeholders}) "
+                f"GROUP BY item_id, location) GROUP BY item_id HAVING COUNT(*) = ?",
+                [server, *locations, *chunk, len(set(locations))]
+            ).fetchall())
+        return result
+
+    def latest_records(self, server, item_ids, locations, server_name=None, since=None):
+        """
+        Get the latest data point of each item, quality and location.
+
+        Args:
+            server (str): API base URL
+            item_ids (list): Item IDs to look up
+            locations (list): Market locations
+            server_name (str): Server name for the 'server' field (defaults to the URL)
+            since (str): Optional ISO timestamp; when given, the points from then on are
+                         combined (weighted average price, summed trade count) instead
+
+        Returns:
+            list: One dictionary per item, quality and location, in the same
+                  format as history_parser.extract_latest_records
+        """
+        records = []
+        location_placeholders = ",".join("?" * len(locations))
+        for chunk in _chunks(item_ids):
+            placeholders = ",".join("?" * len(chunk))
+            if since:
+                rows = self.conn.execute(
+                    f"SELECT item_id, quality, location, MAX(timestamp), "
+                    f"CASE WHEN SUM(item_count) > 0 THEN SUM(avg_price * item_count) / SUM(item_count) "
+                    f"ELSE AVG(avg_price) END, SUM(item_count) FROM history "
+                    f"WHERE server = ? AND location IN ({location_placeholders}) AND item_id IN ({placeholders}) "
+                    f"AND timestamp >= ? GROUP BY item_id, quality, location",
+                    [server, *locations, *chunk, since]
+                ).fetchall()
+            else:
+                # SQLite returns the other columns from the row holding MAX(timestamp)
+                rows = self.conn.execute(
+                    f"SELECT item_id, quality, location, MAX(timestamp), avg_price, item_count FROM history "
+                    f"WHERE server = ? AND location IN ({location_placeholders}) AND item_id IN ({placeholders}) "
+                    f"GROUP BY item_id, quality, location",
+                    [server, *locations, *chunk]
+                ).fetchall()
+            records.extend({
+                'item_id': item_id,
+                'quality': quality,
+                'latest_timestamp': timestamp,
+                'avg_price': avg_price,
+                'item_count': item_count,
+                'location': location,
+                'server': server_name or server
+            } for item_id, quality, location, timestamp, avg_price, item_count in rows)
+        return records
+
+    def history(self, server, item_ids, locations, since=None):
+        """
+        Get every stored data point of the items.
+
+        Args:
+            server (str): API base URL
+            item_ids (list): Item IDs to look up
+            locations (list): Market locations
+            since (str): Optional ISO timestamp of the first point to return
+
+        Returns:
+            list: (item_id, quality, location, timestamp, avg_price, item_count) tuples
+        """
+        rows = []
+        location_placeholders = ",".join("?" * len(locations))
+        for chunk in _chunks(item_ids):
+            placeholders = ",".join("?" * len(chunk))
+            rows.extend(self.conn.execute(
+                f"SELECT item_id, quality, location, timestamp, avg_price, item_count FROM history "
+                f"WHERE server = ? AND location IN ({location_placeholders}) AND item_id IN ({placeholders}) "
+                f"AND timestamp >= ?",
+                [server, *locations, *chunk, since or ""]
+            ).fetchall())
+        return rows
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        self.conn.close()
+
+
+def history_rows(records, location):
+    """
+    Flatten an item's history records into store rows.
+
+    Args:
+        records (list): Quality records returned by the history endpoint
+        location (str): Location used when a record does not name one
+
+    Returns:
+        list: (quality, location, timestamp, avg_price, item_count) tuples
+    """
+    return [
+        (record.get('quality', 0), record.get('location') or location,
+         point['timestamp'], point.get('avg_price', 0), point.get('item_count', 0))
+        for record in records
+        for point in record.get('data', [])
+        if point.get('timestamp')
+    ]
+
+
+def _chunks(items, size=500):
+    # Stay well below SQLite's bound-parameter limit
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
@@ -9,6 +9,12 @@ DEFAULT_TIERS = ["T5", "T6", "T7"]
 # Default enchantment levels
 DEFAULT_ENCHANTS = ["", "@1", "@2"]
 
+# Catalog filter (see catalog.Catalog.filter)
+# When set, it replaces ALL_ITEM_NAMES / DEFAULT_TIERS / DEFAULT_ENCHANTS, e.g.
+#   {"categories": ["PLATE"], "min_tier": 6, "enchants": [1, 2]}   # all plate T6+ @1-@2
+#   {"materials": ["LEATHER"], "tiers": [5, 6]}                    # T5-T6 items using LEATHER
+ITEM_FILTER = {}
+
 # All available item names
 # Uncomment items you want to include in the analysis
 ALL_ITEM_NAMES = [
@@ -0,0 +1,204 @@
+"""
+Metrics module for Albion Cost Calculator
+Records per-request events and stage timings, and exports them as JSON lines,
+Prometheus text format or a summary table
+"""
+
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+class RunMetrics:
+    """
+    Collector for one run.
+
+    Request events hold latency, status, attempt number, time spent waiting
+    on the scheduler and retry sleep. Stage timings are cumulative: stages
+    that run concurrently (e.g. parse inside fetch) can add up to more than
+    the wall time.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.requests = []
+        self.stages = defaultdict(float)
+        self.stage_counts = defaultdict(int)
+        self.sleeps = defaultdict(float)
+        self.listeners = []
+
+    def add_listener(self, listener):
+        """
+        Register a callable that receives every event dictionary as it is recorded.
+
+        Args:
+            listener (callable): Function taking one event dictionary
+        """
+        self.listeners.append(listener)
+
+    def _emit(self, event):
+        for listener in self.listeners:
+            listener(event)
+
+    def record_request(self, server, label, status, latency, attempt, queue_wait=0.0, retry_sleep=0.0):
+        """
+        Args:
+            server (str): API host
+            label (str): Short description of the request
+            status (int or str): HTTP status, "timeout" or "error"
+            latency (float): Seconds from sending the request to the response (or failure)
+            attempt (int): 1 for the first try, 2 for the first retry, ...
+            queue_wait (float): Seconds spent waiting for the scheduler (rate limit / backoff)
+            retry_sleep (float): Seconds slept after this attempt before retrying
+        """
+        event = {
+            'event': 'request', 'ts': time.time(), 'server': server, 'label': label, 'status': status,
+            'latency': latency, 'attempt': attempt, 'queue_wait': queue_wait, 'retry_sleep': retry_sleep
+        }
+        self.requests.append(event)
+        self.sleeps['scheduler_wait'] += queue_wait
+        self.sleeps['retry'] += retry_sleep
+        self._emit(event)
+
+    def record_sleep(self, kind, seconds):
+        """
+        Args:
+            kind (str): Sleep category (e.g. "throttle_backoff")
+            seconds (float): Sleep duration
+        """
+        self.sleeps[kind] += seconds
+        self._emit({'event': 'sleep', 'ts': time.time(), 'kind': kind, 'seconds': seconds})
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Time a block of work and add it to the stage total.
+
+        Args:
+            name (str): Stage name (fetch, parse, aggregate, export, ...)
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.stages[name] += elapsed
+            self.stage_counts[name] += 1
+            self._emit({'event': 'stage', 'ts': time.time(), 'stage': name, 'seconds': elapsed})
+
+    def request_summary(self):
+        """
+        Returns:
+            dict: Mapping of (server, status) to [count, total latency, max latency]
+        """
+        summary = {}
+        for event in self.requests:
+            key = (event['server'], str(event['status']))
+            entry = summary.setdefault(key, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += event['latency']
+            entry[2] = max(entry[2], event['latency'])
+        return summary
+
+    def export_jsonl(self, path):
+        """
+        Write every request event, then stage and sleep totals, as JSON lines.
+
+        Args:
+            path (str): Output file
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            for event in self.requests:
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+            for name, seconds in self.stages.items():
+                f.write(json.dumps({'event': 'stage_total', 'stage': name, 'seconds': seconds,
+                                    'count': self.stage_counts[name]}) + "\n")
+            for kind, seconds in self.sleeps.items():
+                f.write(json.dumps({'event': 'sleep_total', 'kind': kind, 'seconds': seconds}) + "\n")
+
+    def export_prometheus(self, path):
+        """
+        Write totals in the Prometheus text exposition format.
+
+        Args:
+            path (str): Output file (e.g. for the node_exporter textfile collector)
+        """
+        lines = [
+            "# HELP albion_requests_total API requests by server and status.",
+            "# TYPE albion_requests_total counter",
+        ]
+        summary = self.request_summary()
+        for (server, status), (count, _, _) in sorted(summary.items()):
+            lines.append(f'albion_requests_total{{server="{server}",status="{status}"}} {count}')
+        lines += [
+            "# HELP albion_request_latency_seconds Request latency by server and status.",
+            "# TYPE albion_request_latency_seconds summary",
+        ]
+        for (server, status), (count, total, _) in sorted(summary.items()):
+            labels = f'server="{server}",status="{status}"'
+            lines.append(f"albion_request_latency_seconds_sum{{{labels}}} {total:.6f}")
+            lines.append(f"albion_request_latency_seconds_count{{{labels}}} {count}")
+        lines += [
+            "# HELP albion_sleep_seconds_total Time spent sleeping or waiting, by kind.",
+            "# TYPE albion_sleep_seconds_total counter",
+        ]
+        for kind, seconds in sorted(self.sleeps.items()):
+            lines.append(f'albion_sleep_seconds_total{{kind="{kind}"}} {seconds:.6f}')
+        lines += [
+            "# HELP albion_stage_seconds Cumulative time per pipeline stage.",
+            "# TYPE albion_stage_seconds gauge",
+        ]
+        for name, seconds in sorted(self.stages.items()):
+            lines.append(f'albion_stage_seconds{{stage="{name}"}} {seconds:.6f}')
+        lines.append(f"albion_run_seconds {time.time() - self.started:.6f}")
+
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+
+    def summary_table(self):
+        """
+        Returns:
+            str: Human-readable summary of requests, sleeps and stages
+        """
+        lines = [f"{'server':<36} {'status':>8} {'count':>7} {'avg_s':>8} {'max_s':>8}"]
+        for (server, status), (count, total, longest) in sorted(self.request_summary().items()):
+            lines.append(f"{server:<36} {status:>8} {count:>7} {total / count:>8.3f} {longest:>8.3f}")
+        lines.append("")
+        lines.append(f"{'sleep / wait':<36} {'seconds':>8}")
+        for kind, seconds in sorted(self.sleeps.items()):
+            lines.append(f"{kind:<36} {seconds:>8.2f}")
+        lines.append("")
+        lines.append(f"{'stage':<36} {'seconds':>8} {'count':>7}")
+        for name, seconds in self.stages.items():
+            lines.append(f"{name:<36} {seconds:>8.3f} {self.stage_counts[name]:>7}")
+        lines.append(f"{'total run':<36} {time.time() - self.started:>8.3f}")
+        return "\n".join(lines)
+
+
+# Collector used by the analyzer's instrumentation hooks
+collector = RunMetrics()
+
+
+def reset():
+    """
+    Start a new collector for the next run.
+
+    Returns:
+        RunMetrics: The new collector
+    """
+    global collector
+    collector = RunMetrics()
+    return collector
+
+
+def record_request(*args, **kwargs):
+    collector.record_request(*args, **kwargs)
+
+
+def record_sleep(kind, seconds):
+    collector.record_sleep(kind, seconds)
+
+
+def stage(name):
+    return collector.stage(name)
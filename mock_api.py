@@ -0,0 +1,159 @@
+"""
+Mock Albion Online Data API
+Local stand-in for the history and prices endpoints, used by benchmark.py
+"""
+
+import argparse
+import asyncio
+import random
+import zlib
+from datetime import datetime, timedelta
+
+from aiohttp import web
+
+
+class MockApi:
+    """
+    Synthetic market data server with configurable latency and failures.
+
+    Each item's history is generated once from a seed derived from its ID, so
+    repeated requests return the same data.
+    """
+
+    def __init__(self, latency=0.05, jitter=0.5, throttle_rate=0.0, error_rate=0.0,
+                 history_length=30, qualities=5):
+        """
+        Args:
+            latency (float): Mean response delay in seconds
+            jitter (float): Relative spread of the delay (0.5 = ±50%)
+            throttle_rate (float): Fraction of requests answered with 429
+            error_rate (float): Fraction of requests answered with 500
+            history_length (int): Daily data points per item, location and quality
+            qualities (int): Number of quality levels per item
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.history_length = history_length
+        self.qualities = qualities
+        self.today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.histories = {}
+        self.reset()
+
+    def reset(self):
+        """
+        Clear the request counters.
+        """
+        self.stats = {'requests': 0, 'ok': 0, 'throttled': 0, 'errors': 0, 'items_served': 0}
+
+    def series(self, item_id, location, quality):
+        key = (item_id, location, quality)
+        series = self.histories.get(key)
+        if series is None:
+            rng = random.Random(zlib.crc32("|".join(map(str, key)).encode()))
+            base_price = rng.randint(2000, 80000)
+            series = [{
+                'item_count': rng.randint(0, 40),
+                'avg_price': int(base_price * rng.uniform(0.8, 1.2)),
+                'timestamp': (self.today - timedelta(days=day)).strftime("%Y-%m-%dT%H:%M:%S")
+            } for day in range(self.history_length)]
+            self.histories[key] = series
+        return series
+
+    async def respond(self):
+        """
+        Apply latency and failure injection.
+
+        Returns:
+            web.Response: A 429 or 500 response, or None to continue normally
+        """
+        self.stats['requests'] += 1
+        delay = self.latency * random.uniform(1 - self.jitter, 1 + self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        roll = random.random()
+        if roll < self.throttle_rate:
+            self.stats['throttled'] += 1
+            return web.Response(status=429)
+        if roll < self.throttle_rate + self.error_rate:
+            self.stats['errors'] += 1
+            return web.Response(status=500)
+        self.stats['ok'] += 1
+        return None
+
+    async def history(self, request):
+        failure = await self.respond()
+        if failure is not None:
+            return failure
+
+        items = request.match_info['items'].split(",")
+        locations = request.query.get('locations', "Black Market").split(",")
+        start = request.query.get('date')
+        records = []
+        for item in items:
+            for location in locations:
+                for quality in range(1, self.qualities + 1):
+                    data = self.series(item, location, quality)
+                    if start:
+                        data = [point for point in data if point['timestamp'][:10] >= start]
+                    records.append({'location': location, 'item_id': item, 'quality': quality, 'data': data})
+        self.stats['items_served'] += len(items)
+        return web.json_response(records)
+
+    async def prices(self, request):
+        failure = await self.respond()
+        if failure is not None:
+            return failure
+
+        items = request.match_info['items'].split(",")
+        locations = request.query.get('locations', "Caerleon").split(",")
+        now = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S")
+        return web.json_response([{
+            'item_id': item,
+            'city': location,
+            'quality': 1,
+            'sell_price_min': random.Random(zlib.crc32(item.encode())).randint(300, 90000),
+            'sell_price_min_date': now
+        } for item in items for location in locations])
+
+    async def get_stats(self, request):
+        return web.json_response(self.stats)
+
+    async def post_reset(self, request):
+        self.reset()
+        return web.json_response(self.stats)
+
+    def app(self):
+        """
+        Returns:
+            web.Application: Application serving the mock endpoints
+        """
+        app = web.Application()
+        app.router.add_get('/api/v2/stats/history/{items}', self.history)
+        app.router.add_get('/api/v2/stats/prices/{items}', self.prices)
+        app.router.add_get('/_stats', self.get_stats)
+        app.router.add_post('/_reset', self.post_reset)
+        return app
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Mock Albion Online Data API")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.05, help="Mean response delay in seconds")
+    parser.add_argument('--jitter', type=float, default=0.5, help="Relative delay spread")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="Fraction of 429 responses")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of 500 responses")
+    parser.add_argument('--history-length', type=int, default=30, help="Daily points per series")
+    parser.add_argument('--qualities', type=int, default=5)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    mock = MockApi(args.latency, args.jitter, args.throttle_rate, args.error_rate,
+                   args.history_length, args.qualities)
+    print(f"🧪 モックAPI起動: http://{args.host}:{args.port}", flush=True)
+    web.run_app(mock.app(), host=args.host, port=args.port, print=None)
@@ -0,0 +1,264 @@
+"""
+Portfolio module for Albion Cost Calculator
+Chooses how many of each item to craft to maximize expected profit within a
+silver budget, material stock and the volume each market can absorb
+"""
+
+import itertools
+import math
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scipy.optimize import milp, LinearConstraint, Bounds
+    from scipy.sparse import coo_matrix
+except ImportError:  # optional dependency
+    milp = None
+
+from config import (
+    return_rate, portfolio_budget, portfolio_material_stock, portfolio_volume_share, portfolio_tax_rate,
+    portfolio_time_limit, portfolio_single_item_trials
+)
+from calculator import get_recipe_for_item
+
+
+class PortfolioProblem:
+    """
+    Integer program over the candidate items of a ranking.
+
+    maximize    sum(unit_profit[i] * x[i])
+    subject to  sum(unit_cost[i] * x[i])        <= budget
+                sum(usage[m, i] * x[i])         <= stock[m]   for every stocked material m
+                0 <= x[i] <= cap[i], x[i] integer
+
+    usage is the recipe quantity after the return rate (the expected net
+    consumption per craft) and cap is the share of the venue's trade count
+    the plan may sell.
+    """
+
+    def __init__(self, ranking, cost_engine=None, budget=portfolio_budget, stock=None,
+                 volume_share=portfolio_volume_share, tax_rate=portfolio_tax_rate):
+        """
+        Args:
+            ranking (pd.DataFrame): Best venue per item (build_ranking / select_best_venue output)
+            cost_engine (CostEngine): Recipe matrix to reuse (recipes are read per item if omitted)
+            budget (float): Silver available for materials
+            stock (dict): Maximum units of each material (materials not listed are unlimited)
+            volume_share (float): Share of each venue's trade count the plan may sell
+            tax_rate (float): Market tax and setup fee, as a fraction of the sale price
+        """
+        self.budget = budget
+        self.stock = dict(portfolio_material_stock if stock is None else stock)
+
+        prices = ranking['avg_price'].to_numpy(dtype=np.float64)
+        costs = ranking['cost'].to_numpy(dtype=np.float64)
+        volume = ranking['trade_count'].to_numpy(dtype=np.float64)
+        unit_profit = prices * (1 - tax_rate) - costs
+        caps = np.floor(np.nan_to_num(volume) * volume_share)
+        keep = np.isfinite(unit_profit) & (unit_profit > 0) & (costs > 0) & (caps >= 1)
+
+        candidates = ranking[keep]
+        self.item_ids = [str(item) for item in candidates['item_id']]
+        self.venues = candidates[['server', 'location']].astype(str).to_numpy() if len(candidates) else None
+        self.unit_price = prices[keep]
+        self.unit_cost = costs[keep]
+        self.unit_profit = unit_profit[keep]
+        self.caps = caps[keep]
+
+        # Net material use per craft, only for the materials with a stock limit
+        self.materials = list(self.stock)
+        material_index = {material: row for row, material in enumerate(self.materials)}
+        rows, cols, quantities = [], [], []
+        if self.materials:
+            for col, item in enumerate(self.item_ids):
+                rate = return_rate
+                if cost_engine is not None and item in cost_engine.item_index:
+                    mask = cost_engine.rows == cost_engine.item_index[item]
+                    recipe = zip((cost_engine.material_ids[c] for c in cost_engine.cols[mask]),
+                                 cost_engine.quantities[mask])
+                    rate = cost_engine.return_rate
+                else:
+                    recipe = (get_recipe_for_item(item) or {}).items()
+                for material, quantity in recipe:
+                    row = material_index.get(material)
+                    if row is not None:
+                        rows.append(row)
+                        cols.append(col)
+                        quantities.append(quantity * (1 - rate))
+        self.usage_rows = np.asarray(rows, dtype=np.intp)
+        self.usage_cols = np.asarray(cols, dtype=np.intp)
+        self.usage = np.asarray(quantities, dtype=np.float64)
+        self.limits = np.array([self.stock[material] for material in self.materials], dtype=np.float64)
+
+    def __len__(self):
+        return len(self.item_ids)
+
+    def used(self, quantities):
+        """
+        Args:
+            quantities (np.ndarray): Crafts per item
+
+        Returns:
+            tuple: (silver spent, net use of each stocked material)
+        """
+        materials = np.bincount(self.usage_rows, weights=self.usage * quantities[self.usage_cols],
+                                minlength=len(self.materials))
+        return float(self.unit_cost @ quantities), materials
+
+    def feasible(self, quantities):
+        """
+        Args:
+            quantities (np.ndarray): Crafts per item
+
+        Returns:
+            bool: Whether the plan respects the budget, stock and volume caps
+        """
+        spent, materials = self.used(quantities)
+        tolerance = 1e-6
+        return (spent <= self.budget + tolerance and bool(np.all(materials <= self.limits + tolerance))
+                and bool(np.all(quantities <= self.caps)) and bool(np.all(quantities >= 0)))
+
+
+def solve_greedy(problem):
+    """
+    Fill the plan greedily, trying a few item orders and keeping the best plan.
+
+    The main order is profit per unit of scarce resource: each item's resource
+    use is its cost as a share of the budget plus its material use as a share
+    of each stock. Unit profit order and each single item alone are tried too,
+    which covers the cases where a few large items beat many dense small ones.
+    Every pass also spends the leftover on the best items that still fit.
+
+    Args:
+        problem (PortfolioProblem): Problem to solve
+
+    Returns:
+        np.ndarray: Crafts per item
+    """
+    n = len(problem)
+    if n == 0:
+        return np.zeros(0)
+
+    weight = problem.unit_cost / problem.budget if problem.budget > 0 else np.full(n, np.inf)
+    share = np.zeros(n)
+    if len(problem.usage):
+        with np.errstate(divide='ignore'):
+            share_per_use = np.where(problem.limits[problem.usage_rows] > 0,
+                                     problem.usage / problem.limits[problem.usage_rows], np.inf)
+        np.add.at(share, problem.usage_cols, share_per_use)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        density = problem.unit_profit / (weight + share)
+    by_density = np.argsort(-np.nan_to_num(density, nan=0.0), kind='stable')
+    by_profit = np.argsort(-problem.unit_profit, kind='stable')
+
+    # Usage entries of each item (column), for per-item material checks
+    by_item = [[] for _ in range(n)]
+    for row, col, used in zip(problem.usage_rows, problem.usage_cols, problem.usage):
+        by_item[col].append((row, used))
+
+    def fill(order):
+        quantities = np.zeros(n)
+        budget_left = problem.budget
+        stock_left = problem.limits.copy()
+        for i in itertools.chain(order, by_profit):
+            count = min(problem.caps[i] - quantities[i], math.floor(budget_left / problem.unit_cost[i] + 1e-9))
+            for row, used in by_item[i]:
+                count = min(count, math.floor(stock_left[row] / used + 1e-9))
+            if count <= 0:
+                continue
+            quantities[i] += count
+            budget_left -= count * problem.unit_cost[i]
+            for row, used in by_item[i]:
+                stock_left[row] -= count * used
+        return quantities
+
+    plans = [fill(by_density), fill(by_profit)]
+    # Each item alone (as many as fit), then topped up: only the few most profitable are worth trying
+    plans.extend(fill([i]) for i in by_profit[:portfolio_single_item_trials])
+    return max(plans, key=lambda quantities: problem.unit_profit @ quantities)
+
+
+def solve_milp(problem, time_limit=portfolio_time_limit):
+    """
+    Solve the integer program with scipy's HiGHS MILP solver.
+
+    Args:
+        problem (PortfolioProblem): Problem to solve
+        time_limit (float): Solver time limit in seconds (the best plan found so far is kept)
+
+    Returns:
+        np.ndarray: Crafts per item, or None if scipy is unavailable or no plan was found
+    """
+    if milp is None or len(problem) == 0:
+        return None
+    n = len(problem)
+    rows = np.concatenate([np.zeros(n, dtype=np.intp), problem.usage_rows + 1])
+    cols = np.concatenate([np.arange(n, dtype=np.intp), problem.usage_cols])
+    values = np.concatenate([problem.unit_cost, problem.usage])
+    matrix = coo_matrix((values, (rows, cols)), shape=(len(problem.materials) + 1, n)).tocsr()
+    upper = np.concatenate([[problem.budget], problem.limits])
+
+    result = milp(-problem.unit_profit, integrality=np.ones(n), bounds=Bounds(0, problem.caps),
+                  constraints=LinearConstraint(matrix, -np.inf, upper),
+                  options={'time_limit': time_limit})
+    if result.x is None:
+        return None
+    # Clean up solver round-off before checking the plan
+    quantities = np.round(result.x)
+    return quantities if problem.feasible(quantities) else None
+
+
+def optimize_portfolio(ranking, cost_engine=None, **kwargs):
+    """
+    Pick craft quantities for the ranked items.
+
+    The MILP is used when scipy is installed; the greedy plan is always
+    computed as well and kept if it is better (or the only one available).
+
+    Args:
+        ranking (pd.DataFrame): Best venue per item (build_ranking / select_best_venue output)
+        cost_engine (CostEngine): Recipe matrix to reuse
+        **kwargs: PortfolioProblem limits (budget, stock, volume_share, tax_rate)
+
+    Returns:
+        tuple: (plan DataFrame with one row per crafted item, summary dict)
+    """
+    started = time.perf_counter()
+    problem = PortfolioProblem(ranking, cost_engine, **kwargs)
+
+    quantities = solve_greedy(problem)
+    solver = "greedy"
+    exact = solve_milp(problem)
+    if exact is not None and problem.unit_profit @ exact >= problem.unit_profit @ quantities:
+        quantities = exact
+        solver = "milp"
+
+    chosen = np.flatnonzero(quantities > 0)
+    chosen = chosen[np.argsort(-(problem.unit_profit[chosen] * quantities[chosen]), kind='stable')]
+    plan = pd.DataFrame({
+        'item_id': [problem.item_ids[i] for i in chosen],
+        'server': problem.venues[chosen, 0] if len(chosen) else [],
+        'location': problem.venues[chosen, 1] if len(chosen) else [],
+        'quantity': quantities[chosen].astype(np.int64),
+        'unit_cost': problem.unit_cost[chosen],
+        'unit_price': problem.unit_price[chosen],
+        'unit_profit': problem.unit_profit[chosen],
+        'total_cost': problem.unit_cost[chosen] * quantities[chosen],
+        'total_profit': problem.unit_profit[chosen] * quantities[chosen],
+    })
+
+    spent, materials = problem.used(quantities)
+    summary = {
+        'solver': solver,
+        'candidates': len(problem),
+        'items': len(plan),
+        'crafts': int(quantities.sum()),
+        'total_cost': spent,
+        'total_profit': float(problem.unit_profit @ quantities),
+        'budget': problem.budget,
+        'materials_used': {material: float(used) for material, used in zip(problem.materials, materials)},
+        'seconds': time.perf_counter() - started,
+    }
+    return plan, summary
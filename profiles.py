@@ -0,0 +1,255 @@
+"""
+Profiles module for Albion Cost Calculator
+Runs several analysis configurations (item sets, tiers, enchantments, return
+rates) from a single market data fetch, one worker process per profile
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    return_rate, live_material_prices, crafting_chain_enabled,
+    profiles_path, profile_workers, profile_output_dir
+)
+from catalog import load_catalog
+from cost_engine import CostEngine
+from crafting_chain import CraftingChain
+from record_buffer import RecordBuffer
+
+PROFILE_KEYS = {'name', 'names', 'tiers', 'enchants', 'filter', 'return_rate', 'output'}
+
+
+def load_profiles(path=profiles_path):
+    """
+    Read the profile file.
+
+    Each profile is an object with a unique "name" and optionally:
+        names, tiers, enchants  item names / tier labels / enchant labels
+                                (item_lists defaults for the ones omitted)
+        filter                  catalog filter instead of the three above (see Catalog.filter)
+        return_rate             crafting return rate (config.return_rate if omitted)
+        output                  ranking CSV (profile_output_dir/<name>.csv if omitted)
+
+    Args:
+        path (str): JSON file holding a list of profiles
+
+    Returns:
+        list: Profile dictionaries
+
+    Raises:
+        ValueError: If a profile is malformed
+    """
+    with open(path, encoding="utf-8") as f:
+        profiles = json.load(f)
+    if not isinstance(profiles, list) or not profiles:
+        raise ValueError(f"{path}: expected a non-empty list of profiles")
+
+    seen = set()
+    for profile in profiles:
+        name = profile.get('name')
+        if not name or name in seen:
+            raise ValueError(f"{path}: every profile needs a unique name ({name!r})")
+        seen.add(name)
+        unknown = set(profile) - PROFILE_KEYS
+        if unknown:
+            raise ValueError(f"{path}: unknown keys in profile {name!r}: {', '.join(sorted(unknown))}")
+        if 'filter' in profile and {'names', 'tiers', 'enchants'} & set(profile):
+            raise ValueError(f"{path}: profile {name!r} sets both filter and names/tiers/enchants")
+    return profiles
+
+
+def profile_items(profile):
+    """
+    Args:
+        profile (dict): Profile from load_profiles
+
+    Returns:
+        list: Item IDs the profile analyzes
+    """
+    from item_lists import ALL_ITEM_NAMES, DEFAULT_TIERS, DEFAULT_ENCHANTS
+    if profile.get('filter'):
+        return load_catalog().item_ids(**profile['filter'])
+    names = profile.get('names', ALL_ITEM_NAMES)
+    tiers = profile.get('tiers', DEFAULT_TIERS)
+    enchants = profile.get('enchants', DEFAULT_ENCHANTS)
+    # Same name → tier → enchant order as select_target_items
+    return [f"{tier}_{name}{enchant}" for name in names for tier in tiers for enchant in enchants]
+
+
+def union_items(item_lists):
+    """
+    Args:
+        item_lists (list): Item ID lists
+
+    Returns:
+        list: Every item once, in first-seen order
+    """
+    return list(dict.fromkeys(item for items in item_lists for item in items))
+
+
+def price_snapshot(cost_engine):
+    """
+    Material prices to rebuild the same costs in another process.
+
+    Args:
+        cost_engine (CostEngine): Engine holding the fetched prices
+
+    Returns:
+        dict: Market prices of raw and refined materials with a chain,
+              otherwise the recipe material prices
+    """
+    if cost_engine.chain is not None:
+        return dict(cost_engine.chain.prices)
+    return {mat: float(price) for mat, price in zip(cost_engine.material_ids, cost_engine.prices)
+            if not np.isnan(price)}
+
+
+def evaluate_profile(profile, items, records_dir, prices, cutoff_date):
+    """
+    Compute costs, profits and the ranking of one profile (runs in a worker process).
+
+    Args:
+        profile (dict): Profile from load_profiles
+        items (list): The profile's item IDs
+        records_dir (str): Market records written by RecordBuffer.save
+        prices (dict): Material prices from price_snapshot
+        cutoff_date (datetime): Oldest latest_timestamp still used
+
+    Returns:
+        dict: Summary (name, items, ranked, best item and profit_pct, output, seconds)
+    """
+    from profit_analyzer import process_and_display_items, build_ranking
+
+    started = time.perf_counter()
+    rate = profile.get('return_rate', return_rate)
+    cost_engine = CostEngine(items, prices=prices, rate=rate,
+                             chain=CraftingChain() if crafting_chain_enabled else None)
+
+    # The columns are memory maps shared with the other workers; only the filtered rows are copied
+    market_df = RecordBuffer.open_mapped(records_dir).frame()
+    market_df = market_df[market_df['latest_timestamp'] >= cutoff_date]
+    item_averages = process_and_display_items(items, market_df, cutoff_date, cost_engine)
+    ranking = build_ranking(item_averages)
+
+    output = profile.get('output') or os.path.join(profile_output_dir, f"{profile['name']}.csv")
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    ranking.to_csv(output, index=False)
+
+    best = ranking.iloc[0] if len(ranking) else None
+    return {
+        'name': profile['name'],
+        'items': len(items),
+        'ranked': len(ranking),
+        'return_rate': rate,
+        'best_item': None if best is None else best['item_id'],
+        'best_profit_pct': None if best is None else float(best['profit_pct']),
+        'output': output,
+        'seconds': time.perf_counter() - started,
+    }
+
+
+async def fetch_market(items, cost_engine):
+    """
+    Fetch the latest market records of the items from every configured server once.
+
+    Args:
+        items (list): Item IDs (the union of all profiles)
+        cost_engine (CostEngine): Engine whose material prices are refreshed
+
+    Returns:
+        RecordBuffer: Latest records of every server
+    """
+    from profit_analyzer import (
+        market_targets, create_scheduler, create_session, refresh_material_prices, get_latest_timeseries_data,
+        payload_parser
+    )
+
+    targets = market_targets()
+    schedulers = {target.server: create_scheduler() for target in targets}
+    buffer = RecordBuffer()
+    async with create_session() as session:
+        if live_material_prices:
+            await refresh_material_prices(session, cost_engine, schedulers[targets[0].server], targets[0])
+        await asyncio.gather(*(
+            get_latest_timeseries_data(items, time_scale=6, scheduler=schedulers[target.server], session=session,
+                                       target=target, buffer=buffer)
+            for target in targets
+        ))
+    payload_parser.close()
+    return buffer
+
+
+def run_profiles(profiles, buffer, prices, workers=profile_workers, cutoff_date=None):
+    """
+    Evaluate every profile in a process pool over the shared market records.
+
+    Args:
+        profiles (list): Profiles from load_profiles
+        buffer (RecordBuffer): Market records of the union of the profiles' items
+        prices (dict): Material prices from price_snapshot
+        workers (int): Worker processes (0 for one per CPU core)
+        cutoff_date (datetime): Oldest latest_timestamp still used (7 days ago by default)
+
+    Returns:
+        pd.DataFrame: One summary row per profile, in profile file order
+    """
+    if cutoff_date is None:
+        cutoff_date = datetime.now() - pd.Timedelta(days=7)
+    workers = min(workers or os.cpu_count() or 1, len(profiles))
+
+    with tempfile.TemporaryDirectory(prefix="albion-records-") as records_dir:
+        buffer.save(records_dir)
+        with ProcessPoolExecutor(workers) as executor:
+            futures = [executor.submit(evaluate_profile, profile, profile_items(profile), records_dir, prices,
+                                       cutoff_date)
+                       for profile in profiles]
+            results = []
+            for future in futures:
+                result = future.result()
+                results.append(result)
+                print(f"📁 [{result['name']}] {result['ranked']}/{result['items']}件 "
+                      f"({result['seconds']:.2f}秒) → {result['output']}", flush=True)
+    return pd.DataFrame(results)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate several analysis profiles from one market data fetch")
+    parser.add_argument('--profiles', default=profiles_path, help="Profile file (JSON list of profiles)")
+    parser.add_argument('--workers', type=int, default=profile_workers,
+                        help="Worker processes (0 for one per CPU core)")
+    return parser.parse_args(argv)
+
+
+async def main(argv=None):
+    args = parse_args(argv)
+    profiles = load_profiles(args.profiles)
+    items = union_items(profile_items(profile) for profile in profiles)
+    print(f"🗂️ {len(profiles)}プロファイル / 取得対象 {len(items)}件（重複除外後）", flush=True)
+
+    cost_engine = CostEngine(items, chain=CraftingChain() if crafting_chain_enabled else None)
+    buffer = await fetch_market(items, cost_engine)
+    if not len(buffer):
+        print("❌ データが取得できませんでした", flush=True)
+        return 1
+
+    started = time.perf_counter()
+    summary = run_profiles(profiles, buffer, price_snapshot(cost_engine), args.workers)
+    print(f"\n🧮 {len(profiles)}プロファイルを {time.perf_counter() - started:.2f}秒 で計算しました", flush=True)
+    print(summary.drop(columns='output').to_string(index=False), flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -4,22 +4,62 @@ Fetches historical market data from Albion Online Data Project API
 and calculates profit margins for crafted items
 """
 
+import argparse
 import asyncio
+import contextlib
 import aiohttp
+import numpy as np
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
 import random
+import time
 import sys
 import io
+from collections import namedtuple
+from functools import partial
+from urllib.parse import urlencode, urlsplit
 
 # Import configuration and utilities
 from config import (
-    BASE_URL, BLACK_MARKET, return_rate,
-    retries, chunk_size, timeout, concurrent_requests,
-    normal_wait_min, normal_wait_max, throttle_wait_base, throttle_wait_max
+    SERVERS, TARGET_SERVERS, SELL_LOCATIONS, return_rate,
+    connection_pool_size, keepalive_timeout,
+    retries, timeout, concurrent_requests, request_rate, request_burst,
+    normal_wait_min, normal_wait_max, throttle_wait_base, throttle_wait_max,
+    batch_requests, max_url_length, batch_retries,
+    adaptive_concurrency, min_concurrency, max_concurrency, min_request_rate, max_request_rate,
+    aimd_increase, aimd_rate_increase, aimd_decrease, aimd_cooldown, slow_response_seconds,
+    response_cache_enabled, response_cache_path, response_cache_ttl, response_cache_max_bytes,
+    history_store_enabled, history_store_path,
+    live_material_prices, material_price_city, material_prices, raw_material_prices, crafting_chain_enabled,
+    metrics_enabled, metrics_jsonl_path, metrics_prometheus_path,
+    checkpoint_path, retry_pass_enabled, retry_pass_rate, retry_pass_delay,
+    parse_workers, parse_offload_bytes, latest_window_days,
+    priority_fetch_enabled, priority_history_path, priority_top_n, priority_partial_path,
+    portfolio_enabled, portfolio_path, quality_pricing_enabled, quality_ranking_path
 )
-from calculator import get_recipe_for_item, calculate_cost, generate_all_items
-from item_lists import ALL_ITEM_NAMES, DEFAULT_TIERS, DEFAULT_ENCHANTS
+import metrics
+from rate_limiter import RequestScheduler, AimdController
+from response_cache import ResponseCache, MATERIAL_PRICES_KEY
+from history_store import HistoryStore
+from checkpoint import CheckpointJournal
+from history_parser import PayloadParser, HistoryReduction, split_history_by_item
+from record_buffer import RecordBuffer
+from calculator import get_recipe_for_item, calculate_cost, material_api_id
+from catalog import load_catalog, select_target_items
+from cost_engine import CostEngine
+from crafting_chain import CraftingChain
+from fetch_priority import FetchPriority, UnitQueue, load_priors
+from portfolio import optimize_portfolio
+from result_stream import open_result_stream
+
+HistoryResponse = namedtuple('HistoryResponse', ['data', 'etag', 'last_modified', 'not_modified'])
+
+# One API server and the market locations requested from it
+MarketTarget = namedtuple('MarketTarget', ['server', 'base_url', 'locations'])
+DEFAULT_TARGET = MarketTarget(TARGET_SERVERS[0], SERVERS[TARGET_SERVERS[0]], tuple(SELL_LOCATIONS))
+
+# Response body decoder shared by every request (large bodies go to a worker pool)
+payload_parser = PayloadParser(parse_workers, parse_offload_bytes)
 
 # Windows compatibility
 if sys.platform.startswith("win"):
@@ -28,254 +68,1006 @@ if sys.platform.startswith("win"):
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
 
 
-async def fetch_item_history_data(session, item_id, sem):
+def create_scheduler(rate=None, burst=None):
     """
-    Fetch historical market data for a single item with 429 throttling protection.
+    Create the request scheduler from config, with AIMD control if enabled.
 
     Args:
-        session (aiohttp.ClientSession): HTTP session for making requests
-        item_id (str): Item ID to fetch data for
-        sem (asyncio.Semaphore): Semaphore to limit concurrent requests
+        rate (float): Optional starting requests per second (defaults to request_rate)
+        burst (int): Optional burst size (defaults to request_burst)
 
     Returns:
-        dict: JSON response containing historical price data
-        None: If fetch fails after all retries
+        RequestScheduler: Scheduler shared by all requests of a run
+    """
+    rate = request_rate if rate is None else rate
+    burst = request_burst if burst is None else burst
+    controller = None
+    if adaptive_concurrency:
+        controller = AimdController(
+            concurrent_requests, rate,
+            min_concurrency, max_concurrency, min_request_rate, max(max_request_rate, rate),
+            aimd_increase, aimd_rate_increase, aimd_decrease,
+            slow_response_seconds, aimd_cooldown
+        )
+    return RequestScheduler(rate, burst, concurrent_requests, controller)
+
+
+def market_targets():
+    """
+    Build the list of servers and locations to fetch from config.
+
+    Returns:
+        list: One MarketTarget per server in TARGET_SERVERS
+    """
+    return [MarketTarget(server, SERVERS[server], tuple(SELL_LOCATIONS)) for server in TARGET_SERVERS]
+
+
+def create_session():
+    """
+    Open an HTTP session whose connector keeps a keep-alive pool per API host.
+
+    Returns:
+        aiohttp.ClientSession: Session shared by every server of a run
+    """
+    connector = aiohttp.TCPConnector(limit_per_host=connection_pool_size, keepalive_timeout=keepalive_timeout)
+    return aiohttp.ClientSession(connector=connector)
+
+
+def history_params(time_scale=6, start_date=None, target=DEFAULT_TARGET):
+    """
+    Build the query parameters for a history request.
+
+    Args:
+        time_scale (int): Time scale parameter for API (6 = daily)
+        start_date (str): Optional first day to fetch ("YYYY-MM-DD")
+        target (MarketTarget): Server and locations to request
+
+    Returns:
+        dict: Query parameters
     """
-    url = f"{BASE_URL}/api/v2/stats/history/{item_id}"
     params = {
-        "locations": BLACK_MARKET,
-        "time-scale": 6
+        "locations": ",".join(target.locations),
+        "time-scale": time_scale
     }
+    if start_date:
+        params["date"] = start_date
+    return params
+
+
+def build_item_batches(items, time_scale=6, max_length=max_url_length, start_date=None, target=DEFAULT_TARGET):
+    """
+    Pack item IDs into comma-separated batches that fit within a URL length budget.
+
+    Args:
+        items (list): List of item IDs
+        time_scale (int): Time scale parameter for API (6 = daily)
+        max_length (int): Maximum length of the full request URL
+        start_date (str): Optional first day to fetch ("YYYY-MM-DD")
+        target (MarketTarget): Server and locations to request
 
+    Returns:
+        list: List of item ID lists, one per request
+    """
+    params = urlencode(history_params(time_scale, start_date, target))
+    base_length = len(f"{target.base_url}/api/v2/stats/history/?{params}")
+    batches = []
+    current = []
+    current_length = base_length
+
+    for item in items:
+        added_length = len(item) + (1 if current else 0)
+        if current and current_length + added_length > max_length:
+            batches.append(current)
+            current = []
+            current_length = base_length
+            added_length = len(item)
+        current.append(item)
+        current_length += added_length
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+class RequestThrottled(Exception):
+    """
+    The retries of a request ran out on 429s and timeouts rather than on errors.
+    """
+
+
+async def request_json(session, url, params, scheduler, label, max_retries=retries, headers=None, max_errors=None,
+                       reduce=None):
+    """
+    Send a GET request with 429 throttling protection and retries.
+
+    Requests are paced by the shared scheduler; a 429 pauses every request
+    through the scheduler's backoff rather than sleeping only this one.
+    Latency, 429s and timeouts are reported back for adaptive control.
+
+    With max_errors, HTTP errors and unreadable bodies have their own, lower
+    retry budget, while 429s and timeouts keep retrying up to max_retries;
+    the caller can tell the two failures apart (None vs RequestThrottled).
+
+    Args:
+        session (aiohttp.ClientSession): HTTP session for making requests
+        url (str): Request URL
+        params (dict): Query parameters
+        scheduler (RequestScheduler): Shared rate limiter for all requests
+        label (str): Short description for log lines
+        max_retries (int): Number of retries before giving up
+        headers (dict): Optional extra headers (e.g. conditional request validators)
+        max_errors (int): Optional retries for HTTP errors and unreadable bodies
+        reduce (callable): Optional picklable function applied to the decoded JSON where it
+                           is decoded (see PayloadParser.parse); data is then its result
+
+    Returns:
+        HistoryResponse: JSON data plus ETag / Last-Modified validators
+                         (not_modified is True and data None on a 304)
+        None: If fetch fails after all retries (with max_errors: after max_errors errors)
+
+    Raises:
+        RequestThrottled: With max_errors, if max_retries ran out first
+    """
+    host = urlsplit(url).netloc
     attempt = 0
-    async with sem:
-        while attempt <= retries:
-            try:
-                async with session.get(url, params=params, timeout=timeout) as resp:
+    errors = 0
+    while attempt <= max_retries:
+        wait_time = 0
+        status = "error"
+        queued = started = time.monotonic()
+        try:
+            async with scheduler:
+                started = time.monotonic()
+                async with session.get(url, params=params, headers=headers, timeout=timeout) as resp:
+                    status = resp.status
                     if resp.status == 200:
-                        print(f"✅ 履歴取得成功: {item_id}", flush=True)
-                        # Normal wait after success
-                        await asyncio.sleep(random.uniform(normal_wait_min, normal_wait_max))
-                        return await resp.json()
+                        body = await resp.read()
+                        with metrics.stage('parse'):
+                            data = await payload_parser.parse(body, reduce)
+                        latency = time.monotonic() - started
+                        scheduler.record_success(latency)
+                        metrics.record_request(host, label, status, latency, attempt + 1, started - queued)
+                        print(f"✅ 取得成功: {label}", flush=True)
+                        return HistoryResponse(data, resp.headers.get('ETag'), resp.headers.get('Last-Modified'), False)
+                    elif resp.status == 304:
+                        latency = time.monotonic() - started
+                        scheduler.record_success(latency)
+                        metrics.record_request(host, label, status, latency, attempt + 1, started - queued)
+                        print(f"♻️ 更新なし(304): {label}", flush=True)
+                        return HistoryResponse(None, resp.headers.get('ETag'), resp.headers.get('Last-Modified'), True)
                     elif resp.status == 429:
                         attempt += 1
                         wait_time = min(throttle_wait_base * attempt + random.uniform(0, 2), throttle_wait_max)
-                        print(f"⚠️ 429制限: {item_id} 再試行({attempt}/{retries}) 待機 {wait_time:.1f}s", flush=True)
-                        await asyncio.sleep(wait_time)
+                        scheduler.record_throttle(wait_time)
+                        metrics.record_sleep('throttle_backoff', wait_time)
+                        print(f"⚠️ 429制限: {label} 再試行({attempt}/{max_retries}) 全体待機 {wait_time:.1f}s", flush=True)
+                        wait_time = 0
                     else:
                         attempt += 1
+                        errors += 1
                         wait_time = random.uniform(normal_wait_min, normal_wait_max)
-                        print(f"⚠️ HTTP {resp.status}: {item_id} 再試行({attempt}/{retries}) 待機 {wait_time:.1f}s", flush=True)
-                        await asyncio.sleep(wait_time)
-            except Exception as e:
-                attempt += 1
-                wait_time = random.uniform(normal_wait_min, normal_wait_max)
-                print(f"⚠️ 例外: {item_id} → {e} 再試行({attempt}/{retries}) 待機 {wait_time:.1f}s", flush=True)
-                await asyncio.sleep(wait_time)
-    print(f"❌ 履歴取得失敗: {item_id}", flush=True)
+                        print(f"⚠️ HTTP {resp.status}: {label} 再試行({attempt}/{max_retries}) 待機 {wait_time:.1f}s", flush=True)
+        except asyncio.TimeoutError:
+            attempt += 1
+            status = "timeout"
+            wait_time = random.uniform(normal_wait_min, normal_wait_max)
+            scheduler.record_timeout()
+            print(f"⚠️ タイムアウト: {label} 再試行({attempt}/{max_retries}) 待機 {wait_time:.1f}s", flush=True)
+        except Exception as e:
+            attempt += 1
+            errors += 1
+            status = "error"
+            wait_time = random.uniform(normal_wait_min, normal_wait_max)
+            print(f"⚠️ 例外: {label} → {e} 再試行({attempt}/{max_retries}) 待機 {wait_time:.1f}s", flush=True)
+        metrics.record_request(host, label, status, time.monotonic() - started, attempt, started - queued, wait_time)
+        if max_errors is not None and errors > max_errors:
+            break
+        if wait_time:
+            await asyncio.sleep(wait_time)
+    if max_errors is not None and errors <= max_errors:
+        print(f"⏳ 429/タイムアウトが続いたため中断: {label}", flush=True)
+        raise RequestThrottled(label)
+    print(f"❌ 取得失敗: {label}", flush=True)
     return None
 
 
-async def get_latest_timeseries_data(items, time_scale=6, process_chunk_callback=None):
+async def request_history(session, item_path, scheduler, time_scale=6, max_retries=retries, headers=None,
+                          start_date=None, target=DEFAULT_TARGET, max_errors=None, reduce=None):
     """
-    Fetch time series data for multiple items with chunking and throttling protection.
+    Request history data with 429 throttling protection.
 
     Args:
-        items (list): List of item IDs to fetch
+        session (aiohttp.ClientSession): HTTP session for making requests
+        item_path (str): Item ID or comma-separated item IDs
+        scheduler (RequestScheduler): Shared rate limiter for all requests
+        time_scale (int): Time scale parameter for API (6 = daily)
+        max_retries (int): Number of retries before giving up
+        headers (dict): Optional extra headers (e.g. conditional request validators)
+        start_date (str): Optional first day to fetch ("YYYY-MM-DD")
+        target (MarketTarget): Server and locations to request
+        max_errors (int): Optional retries for HTTP errors and unreadable bodies (see request_json)
+        reduce (callable): Optional reduction of the decoded JSON (see request_json)
+
+    Returns:
+        HistoryResponse: JSON data plus ETag / Last-Modified validators
+                         (not_modified is True and data None on a 304)
+        None: If fetch fails after all retries
+
+    Raises:
+        RequestThrottled: With max_errors, if the retries ran out on 429s and timeouts
+    """
+    url = f"{target.base_url}/api/v2/stats/history/{item_path}"
+    label = item_path if len(item_path) <= 60 else f"{item_path[:57]}..."
+    return await request_json(session, url, history_params(time_scale, start_date, target), scheduler,
+                              f"履歴[{target.server}] {label}", max_retries, headers, max_errors, reduce)
+
+
+async def fetch_material_prices(session, material_ids, scheduler, city=material_price_city, target=DEFAULT_TARGET,
+                                cache=None):
+    """
+    Fetch current material prices from the prices endpoint.
+
+    With a cache, a response within its TTL that covers every requested
+    material is reused without a request; a fully successful fetch is cached.
+
+    Args:
+        session (aiohttp.ClientSession): HTTP session for making requests
+        material_ids (list): Material IDs in recipe format (e.g. "T5_PLANK@1")
+        scheduler (RequestScheduler): Shared rate limiter for all requests
+        city (str): Market to read prices from
+        target (MarketTarget): Server to read prices from (its locations are ignored)
+        cache (ResponseCache): Optional on-disk response cache
+
+    Returns:
+        dict: Mapping of material ID to its lowest sell order price
+              (materials without a current order are omitted)
+    """
+    requested = set(material_ids)
+    entry = cache.get(target.base_url, MATERIAL_PRICES_KEY, city, 0) if cache else None
+    if entry and entry.fresh and requested <= set(entry.payload['materials']):
+        prices = {mat: price for mat, price in entry.payload['prices'].items() if mat in requested}
+        print(f"💾 素材価格をキャッシュから取得: {len(prices)}件 ({city})", flush=True)
+        return prices
+
+    api_ids = {material_api_id(mat): mat for mat in material_ids}
+    url_ids = list(api_ids)
+    prices = {}
+    complete = True
+
+    for i in range(0, len(url_ids), 100):
+        batch = url_ids[i:i + 100]
+        url = f"{target.base_url}/api/v2/stats/prices/{','.join(batch)}"
+        params = {"locations": city, "qualities": 1}
+        response = await request_json(session, url, params, scheduler, f"素材価格 {len(batch)}件 ({city})")
+        if response is None:
+            complete = False
+            continue
+        for record in response.data:
+            mat = api_ids.get(record.get('item_id'))
+            price = record.get('sell_price_min', 0)
+            if mat and price > 0:
+                prices[mat] = price
+
+    # A partial result would hide the missing batches until the entry expires
+    if cache and complete:
+        cache.put(target.base_url, MATERIAL_PRICES_KEY, city, 0, {'materials': sorted(material_ids), 'prices': prices})
+    return prices
+
+
+async def refresh_material_prices(session, cost_engine, scheduler, target=DEFAULT_TARGET, cache=None):
+    """
+    Fetch live material prices and apply them to the cost engine.
+
+    Args:
+        session (aiohttp.ClientSession): HTTP session for making requests
+        cost_engine (CostEngine): Engine whose material prices are updated
+        scheduler (RequestScheduler): Shared rate limiter for all requests
+        target (MarketTarget): Server to read prices from
+        cache (ResponseCache): Optional open cache (opened from config and closed here if omitted,
+                               False to always ask the API)
+
+    Returns:
+        list: Item IDs whose cost changed
+    """
+    market_ids = cost_engine.market_ids()
+    own_cache = cache is None
+    if own_cache:
+        cache = open_response_cache()
+    try:
+        live_prices = await fetch_material_prices(session, market_ids, scheduler, target=target, cache=cache)
+    finally:
+        if own_cache and cache:
+            cache.close()
+    changed_items = cost_engine.update_prices({**material_prices, **raw_material_prices, **live_prices})
+    print(f"💹 素材価格更新: {len(live_prices)}/{len(market_ids)}件 ({material_price_city}) "
+          f"→ 原価再計算 {len(changed_items)}件", flush=True)
+    if cost_engine.chain is not None:
+        refined = [mat for mat in cost_engine.material_ids if cost_engine.chain.method(mat) == "refine"]
+        print(f"🔨 購入より精錬が安い素材: {len(refined)}/{len(cost_engine.material_ids)}件", flush=True)
+    return changed_items
+
+
+async def fetch_item_history_data(session, item_id, scheduler, time_scale=6, cache=None, start_date=None,
+                                  target=DEFAULT_TARGET, reduction=None):
+    """
+    Fetch historical market data for a single item with 429 throttling protection.
+
+    With a cache, an entry covering the requested window within its TTL is
+    returned without a request, and an expired entry for the same window is
+    revalidated with If-None-Match / If-Modified-Since.
+
+    Args:
+        session (aiohttp.ClientSession): HTTP session for making requests
+        item_id (str): Item ID to fetch data for
+        scheduler (RequestScheduler): Shared rate limiter for all requests
+        time_scale (int): Time scale parameter for API (6 = daily)
+        cache (ResponseCache): Optional on-disk response cache
+        start_date (str): Optional first day to fetch ("YYYY-MM-DD")
+        target (MarketTarget): Server and locations to request
+        reduction (HistoryReduction): What to keep of the response (latest records by default)
+
+    Returns:
+        ItemHistory: The item's reduced history
+        None: If fetch fails after all retries
+    """
+    if reduction is None:
+        reduction = history_reduction(target)
+    cache_location = ",".join(target.locations)
+    entry = cache.get(target.base_url, item_id, cache_location, time_scale, start_date) if cache else None
+    if entry and entry.fresh:
+        return reduction.item(item_id, entry.payload)
+
+    # Validators describe the URL they came from, so only an entry for the same window is revalidated
+    if entry and entry.start_date != start_date:
+        entry = None
+    headers = {}
+    if entry and entry.etag:
+        headers['If-None-Match'] = entry.etag
+    if entry and entry.last_modified:
+        headers['If-Modified-Since'] = entry.last_modified
+
+    response = await request_history(session, item_id, scheduler, time_scale, headers=headers or None,
+                                     start_date=start_date, target=target,
+                                     reduce=partial(reduction, [item_id], encode=bool(cache)))
+    if response is None:
+        return None
+    if response.not_modified and entry:
+        cache.refresh(target.base_url, item_id, cache_location, time_scale, start_date)
+        return reduction.item(item_id, entry.payload)
+    if response.data is None:
+        return None
+
+    history = response.data[item_id]
+    if cache:
+        cache.put(target.base_url, item_id, cache_location, time_scale, history.blob,
+                  response.etag, response.last_modified, start_date)
+    return history
+
+
+async def fetch_items_history_batch(session, item_ids, scheduler, time_scale=6, cache=None, start_date=None,
+                                    target=DEFAULT_TARGET, reduction=None):
+    """
+    Fetch historical market data for several items in one request.
+
+    A batch that keeps failing with HTTP errors or unreadable bodies is split
+    in half and each half is retried, down to single-item requests, so one
+    bad item cannot sink the whole batch. 429s and timeouts say nothing about
+    the items, so the whole batch keeps retrying behind the shared backoff;
+    if those retries run out, every item of the batch is reported as failed
+    (splitting would only multiply the requests while the API is throttling).
+
+    The response is reduced where it is decoded (in a parse worker for large
+    bodies), so only each item's ItemHistory reaches the event loop.
+
+    Args:
+        session (aiohttp.ClientSession): HTTP session for making requests
+        item_ids (list): Item IDs to fetch data for
+        scheduler (RequestScheduler): Shared rate limiter for all requests
         time_scale (int): Time scale parameter for API (6 = daily)
-        process_chunk_callback: Optional callback function to process each chunk's results
+        cache (ResponseCache): Optional on-disk response cache
+        start_date (str): Optional first day to fetch ("YYYY-MM-DD")
+        target (MarketTarget): Server and locations to request
+        reduction (HistoryReduction): What to keep of the response (latest records by default)
+
+    Returns:
+        dict: Mapping of item ID to its ItemHistory (None if the fetch failed)
+    """
+    if reduction is None:
+        reduction = history_reduction(target)
+    if len(item_ids) == 1:
+        history = await fetch_item_history_data(session, item_ids[0], scheduler, time_scale, cache, start_date,
+                                                target, reduction)
+        return {item_ids[0]: history}
+
+    try:
+        response = await request_history(session, ",".join(item_ids), scheduler, time_scale,
+                                         max_errors=batch_retries, start_date=start_date, target=target,
+                                         reduce=partial(reduction, item_ids, encode=bool(cache)))
+    except RequestThrottled:
+        return {item: None for item in item_ids}
+    if response is not None:
+        by_item = response.data
+        if cache:
+            # Batch validators describe the whole batch, so per-item entries get none
+            for item, history in by_item.items():
+                cache.put(target.base_url, item, ",".join(target.locations), time_scale, history.blob,
+                          start_date=start_date)
+        return by_item
+
+    # Fall back to smaller batches
+    mid = len(item_ids) // 2
+    print(f"🔀 バッチ分割: {len(item_ids)}件 → {mid}件 + {len(item_ids) - mid}件", flush=True)
+    halves = await asyncio.gather(
+        fetch_items_history_batch(session, item_ids[:mid], scheduler, time_scale, cache, start_date, target,
+                                  reduction),
+        fetch_items_history_batch(session, item_ids[mid:], scheduler, time_scale, cache, start_date, target,
+                                  reduction)
+    )
+    return {**halves[0], **halves[1]}
+
+
+def history_reduction(target, since=None, store=False):
+    """
+    Args:
+        target (MarketTarget): Server and locations the responses come from
+        since (str): Optional ISO timestamp where the latest-record window starts
+        store (bool): Keep store rows instead of latest records
 
     Returns:
-        list: List of dictionaries containing item data with latest prices and trade counts
+        HistoryReduction: Reduction of the target's history responses
+    """
+    return HistoryReduction(target.server, target.locations[0], since, store)
+
+
+def open_response_cache():
     """
-    results = []
+    Open the on-disk response cache configured in config.py.
+
+    Returns:
+        ResponseCache: The cache, or None if caching is disabled
+    """
+    if not response_cache_enabled:
+        return None
+    return ResponseCache(response_cache_path, response_cache_ttl, response_cache_max_bytes)
+
+
+def open_history_store():
+    """
+    Open the local history store configured in config.py.
+
+    Returns:
+        HistoryStore: The store, or None if it is disabled
+    """
+    if not history_store_enabled:
+        return None
+    return HistoryStore(history_store_path)
+
+
+async def get_latest_timeseries_data(items, time_scale=6, process_chunk_callback=None, scheduler=None, session=None,
+                                     target=DEFAULT_TARGET, cache=None, store=None, journal=None, retry_pass=True,
+                                     buffer=None, priority=None):
+    """
+    Fetch time series data for multiple items through a continuous request scheduler.
+    When batch_requests is enabled, items are packed into multi-item requests.
+    With the history store enabled, every point is kept locally, only the
+    window from each item's last stored day is requested, and the returned
+    latest points are read back from the store.
+
+    Worker tasks pull request units from a queue as soon as they are free, so a
+    slow or throttled item never holds up the others; the overall pace is set
+    by the token bucket (request_rate / request_burst).
 
-    sem = asyncio.Semaphore(concurrent_requests)
+    Items that still fail after all retries are fetched again in a deferred
+    pass at retry_pass_rate once everything else has finished.
+
+    With a FetchPriority, items are batched in score order and each free worker
+    takes the pending request with the highest current score, so results that
+    change the estimates re-order the rest of the run.
+
+    Args:
+        items (list): List of item IDs to fetch
+        time_scale (int): Time scale parameter for API (6 = daily)
+        process_chunk_callback: Optional callback receiving each request unit's items and a
+                                DataFrame view of their rows in the buffer
+        scheduler (RequestScheduler): Optional scheduler (created from config if omitted)
+        session (aiohttp.ClientSession): Optional shared session (a new one is opened if omitted)
+        target (MarketTarget): Server and locations to request
+        cache (ResponseCache): Optional open cache (opened from config and closed here if omitted,
+                               False to bypass the cache)
+        store (HistoryStore): Optional open store (opened from config and closed here if omitted,
+                              False to bypass the store)
+        journal (CheckpointJournal): Optional journal that receives every completed item
+        retry_pass (bool): Run the deferred retry pass for failed items
+        buffer (RecordBuffer): Optional buffer to append to (e.g. shared by several servers)
+        priority (FetchPriority): Optional fetch order; completed items are reported to it
+
+    Returns:
+        RecordBuffer: Latest price and trade count per item, quality and venue
+    """
+    if buffer is None:
+        buffer = RecordBuffer()
     failed_items = []
 
-    async with aiohttp.ClientSession() as session:
-        # Process in chunks to avoid overwhelming the API
-        for i in range(0, len(items), chunk_size):
-            chunk = items[i:i + chunk_size]
-            print(f"\n📦 チャンク {i//chunk_size + 1}/{(len(items) + chunk_size - 1)//chunk_size} 処理中...", flush=True)
+    if scheduler is None:
+        scheduler = create_scheduler()
+
+    own_cache = cache is None
+    own_store = store is None
+    if own_cache:
+        cache = open_response_cache()
+    if own_store:
+        store = open_history_store()
+
+    # With latest_window_days set, each series is reduced to its recent window instead of the last point
+    since = None
+    if latest_window_days:
+        since = (datetime.now() - timedelta(days=latest_window_days)).strftime("%Y-%m-%dT%H:%M:%S")
+
+    # Responses are reduced to store rows (with the store) or latest records where they are decoded
+    reduction = history_reduction(target, since, bool(store))
+
+    def latest_records(item_histories):
+        with metrics.stage('parse'):
+            # Store every point, then read the latest ones back from the store
+            if store:
+                for item, history in item_histories.items():
+                    store.ingest_rows(target.base_url, item, history.rows)
+                return store.latest_records(target.base_url, list(item_histories), target.locations, target.server,
+                                            since)
+            return [record for history in item_histories.values() for record in history.latest]
+
+    # With the store, only the window after each item's last stored day is requested
+    # (the last day itself is fetched again because its daily bucket may still change)
+    start_dates = {}
+    if store:
+        last_timestamps = store.last_timestamps(target.base_url, items, target.locations)
+        start_dates = {item: last[:10] for item, last in last_timestamps.items()}
+
+    # Serve items whose cached response covers that window and is still within its TTL
+    cached_rows = (0, 0)
+    if cache:
+        to_fetch = []
+        cached_histories = {}
+        for item in items:
+            entry = cache.get(target.base_url, item, ",".join(target.locations), time_scale, start_dates.get(item))
+            if entry and entry.fresh:
+                cached_histories[item] = reduction.item(item, entry.payload)
+            else:
+                to_fetch.append(item)
+        print(f"💾 キャッシュから取得: {len(cached_histories)}件 / 要取得: {len(to_fetch)}件", flush=True)
+        items = to_fetch
+        cached_data = latest_records(cached_histories)
+        cached_rows = buffer.extend(cached_data)
+        if journal and cached_histories:
+            journal.record(target.server, list(cached_histories), cached_data)
 
+    windows = {None: items}
+    if store:
+        windows = {}
+        for item in (priority.order(items) if priority else items):
+            windows.setdefault(start_dates.get(item), []).append(item)
+        delta_items = sum(1 for item in items if item in start_dates)
+        print(f"🗄️ 差分取得: {delta_items}件 / 全期間取得: {len(items) - delta_items}件", flush=True)
+
+    # Group items into request units (multi-item batches or single items)
+    if priority and not store:
+        windows = {None: priority.order(items)}
+    units = []
+    for start_date, window_items in windows.items():
+        if batch_requests:
+            units.extend((batch, start_date) for batch in build_item_batches(window_items, time_scale,
+                                                                            start_date=start_date, target=target))
+        else:
+            units.extend(([item], start_date) for item in window_items)
+    if batch_requests:
+        print(f"📨 {len(items)}件を{len(units)}リクエストにまとめました", flush=True)
+
+    pending = UnitQueue(units, priority)
+    completed = 0
+
+    if process_chunk_callback and cached_rows[1] > cached_rows[0]:
+        await process_chunk_callback(sorted(cached_histories), buffer.frame(*cached_rows))
+    if priority and cache:
+        priority.complete(target.server, list(cached_histories))
+
+    async with contextlib.AsyncExitStack() as stack:
+        if session is None:
+            session = await stack.enter_async_context(create_session())
+
+        async def handle_unit(unit, start_date):
+            nonlocal completed
             # Fetch historical data (with trade counts)
-            tasks = [fetch_item_history_data(session, item, sem) for item in chunk]
-            chunk_results = await asyncio.gather(*tasks)
+            unit_results = await fetch_items_history_batch(session, unit, scheduler, time_scale, cache, start_date,
+                                                           target, reduction)
 
             # Process data
-            chunk_data = []
-            for item, data in zip(chunk, chunk_results):
-                if data:
-                    # Process data by quality level
-                    for quality_record in data:
-                        quality = quality_record.get('quality', 'unknown')
-                        time_series = quality_record.get('data', [])
-
-                        if time_series:
-                            # Get latest entry (sorted by timestamp descending)
-                            sorted_data = sorted(time_series,
-                                               key=lambda x: x.get('timestamp', ''),
-                                               reverse=True)
-                            latest_data = sorted_data[0] if sorted_data else None
-
-                            if latest_data:
-                                item_result = {
-                                    'item_id': item,
-                                    'quality': quality,
-                                    'latest_timestamp': latest_data.get('timestamp'),
-                                    'avg_price': latest_data.get('avg_price', 0),
-                                    'item_count': latest_data.get('item_count', 0),
-                                    'location': BLACK_MARKET
-                                }
-                                results.append(item_result)
-                                chunk_data.append(item_result)
+            fetched = {}
+            for item in unit:
+                data = unit_results.get(item)
+                if data is not None:
+                    fetched[item] = data
                 else:
                     failed_items.append(item)
+            unit_data = latest_records(fetched)
+            unit_rows = buffer.extend(unit_data)
+            if journal and fetched:
+                journal.record(target.server, list(fetched), unit_data)
+
+            completed += 1
+            print(f"📦 [{target.server}] {completed}/{len(units)} リクエスト単位完了", flush=True)
+
+            # Call callback with unit data if provided
+            if process_chunk_callback and unit_data:
+                await process_chunk_callback(unit, buffer.frame(*unit_rows))
+            if priority:
+                priority.complete(target.server, list(fetched))
 
-            # Call callback with chunk data if provided
-            if process_chunk_callback and chunk_data:
-                await process_chunk_callback(chunk, chunk_data)
+        async def worker():
+            # Scores change as results arrive, so each free worker takes the best pending request
+            while pending:
+                unit, start_date = pending.pop()
+                await handle_unit(unit, start_date)
 
-            # Wait between chunks
-            await asyncio.sleep(random.uniform(2, 5))
+        # Enough workers for the largest in-flight limit the scheduler may reach
+        worker_count = max_concurrency if adaptive_concurrency else concurrent_requests
+        workers = [asyncio.create_task(worker()) for _ in range(min(worker_count, len(units)))]
+        await asyncio.gather(*workers)
 
-        if failed_items:
+        if failed_items and retry_pass and retry_pass_enabled:
+            # One request at a time at a reduced rate, after the rest of the run has finished
+            print(f"\n🔁 [{target.server}] 失敗した{len(failed_items)}件を{retry_pass_delay}秒後に低速で再取得します",
+                  flush=True)
+            await asyncio.sleep(retry_pass_delay)
+            retry_scheduler = RequestScheduler(retry_pass_rate, 1, 1)
+            await get_latest_timeseries_data(
+                failed_items, time_scale, process_chunk_callback, retry_scheduler, session, target,
+                cache or False, store or False, journal, retry_pass=False, buffer=buffer, priority=priority)
+        elif failed_items:
             print(f"\n⚠️ 再取得が必要なアイテム: {len(failed_items)}件", flush=True)
             print(failed_items, flush=True)
 
-    return results
+    if own_cache and cache:
+        cache.close()
+    if own_store and store:
+        store.close()
 
+    return buffer
 
-def process_and_display_items(chunk_items, chunk_data_df, cutoff_date):
+
+def lookup_costs(item_ids, cost_engine=None):
     """
-    Process and display profit analysis for a chunk of items.
+    Look up crafting costs for a sequence of item IDs.
 
     Args:
-        chunk_items (list): List of item IDs in this chunk
-        chunk_data_df (pd.DataFrame): DataFrame with market data for this chunk
-        cutoff_date (datetime): Cutoff date for filtering old data
+        item_ids (iterable): Item IDs
+        cost_engine (CostEngine): Optional precomputed costs (falls back to calculate_cost)
 
     Returns:
-        list: List of item analysis results
+        np.ndarray: Cost per item (NaN if it cannot be calculated)
     """
-    item_averages = []
+    costs = []
+    for item in item_ids:
+        if cost_engine is not None and item in cost_engine.item_index:
+            costs.append(cost_engine.item_costs[cost_engine.item_index[item]])
+        else:
+            cost = calculate_cost(item)
+            costs.append(np.nan if cost is None else cost)
+    return np.asarray(costs, dtype=np.float64)
 
-    for item in chunk_items:
-        item_data = chunk_data_df[chunk_data_df['item_id'] == item]
 
-        # Calculate cost
-        cost = calculate_cost(item)
+def process_and_display_items(chunk_items, chunk_data_df, cutoff_date, cost_engine=None, by_quality=False):
+    """
+    Process and display profit analysis for a set of items.
 
-        if len(item_data) > 0:
-            # Calculate trade-count weighted average price
-            total_value = (item_data['avg_price'] * item_data['item_count']).sum()
-            total_count = item_data['item_count'].sum()
+    All items are aggregated in one grouped pass, so the same code handles a
+    single request unit or the whole catalog in one frame. Rows are kept per
+    sell venue (server and location); use select_best_venue to reduce them
+    to one row per item.
 
-            if total_count > 0:
-                weighted_avg_price = total_value / total_count
-                latest_update = item_data['latest_timestamp'].max()
+    Args:
+        chunk_items (list): List of item IDs to analyze (None for every item in the frame)
+        chunk_data_df (pd.DataFrame): DataFrame with market data
+        cutoff_date (datetime): Cutoff date for filtering old data
+        cost_engine (CostEngine): Optional precomputed costs (falls back to calculate_cost)
+        by_quality (bool): Keep one row per quality instead of merging all qualities
+                           into one trade-count weighted price
 
-                # Calculate profit
-                profit = (weighted_avg_price - cost) if cost is not None else None
-                profit_pct = (profit / cost * 100) if profit is not None and cost > 0 else None
+    Returns:
+        pd.DataFrame: One row per item and venue (and quality, with by_quality) with cost,
+                      weighted average price and profit
+    """
+    item_data = chunk_data_df
+    if chunk_items is not None:
+        item_data = item_data[item_data['item_id'].isin(chunk_items)]
+    if 'server' not in item_data.columns:
+        item_data = item_data.assign(server=DEFAULT_TARGET.server)
 
-                # Extract Tier and Enchant
-                parts = item.split("_", 1)
-                tier = parts[0] if len(parts) > 0 else ""
+    # Calculate trade-count weighted average price for all items and venues at once
+    keys = ['item_id', 'quality', 'server', 'location'] if by_quality else ['item_id', 'server', 'location']
+    item_data = item_data.assign(trade_value=item_data['avg_price'] * item_data['item_count'])
+    item_averages = item_data.groupby(keys, sort=False, observed=True).agg(
+        total_value=('trade_value', 'sum'),
+        total_trade_count=('item_count', 'sum'),
+        latest_update=('latest_timestamp', 'max')
+    )
+    item_averages = item_averages[item_averages['total_trade_count'] > 0].reset_index()
+    item_averages['weighted_avg_price'] = item_averages['total_value'] / item_averages['total_trade_count']
 
-                if len(parts) > 1 and "@" in parts[1]:
-                    enchant = "@" + parts[1].split("@", 1)[1]
-                else:
-                    enchant = ""
-
-                item_averages.append({
-                    'item_id': item,
-                    'cost': cost,
-                    'tier': tier,
-                    'enchant': enchant,
-                    'weighted_avg_price': weighted_avg_price,
-                    'profit': profit,
-                    'profit_pct': profit_pct,
-                    'total_trade_count': total_count,
-                    'latest_update': latest_update
-                })
+    # Tier and Enchant from the catalog (once per distinct item)
+    catalog = load_catalog()
+    item_ids = item_averages['item_id'].astype(str)
+    labels = {item: catalog.labels(item) for item in item_ids.unique()}
+    item_averages['tier'] = item_ids.map({item: tier for item, (tier, _) in labels.items()})
+    item_averages['enchant'] = item_ids.map({item: enchant for item, (_, enchant) in labels.items()})
+
+    # Calculate cost and profit
+    cost = lookup_costs(item_averages['item_id'], cost_engine)
+    item_averages['cost'] = cost
+    item_averages['profit'] = item_averages['weighted_avg_price'] - cost
+    item_averages['profit_pct'] = np.where(cost > 0, item_averages['profit'] / cost * 100, np.nan)
 
     # Return results without displaying
-    return item_averages
+    return item_averages[keys + ['cost', 'tier', 'enchant', 'weighted_avg_price', 'profit', 'profit_pct',
+                                 'total_trade_count', 'latest_update']]
+
+
+def build_ranking(item_averages, by_quality=False):
+    """
+    Turn per-venue results into the published ranking table.
+
+    Args:
+        item_averages (pd.DataFrame): Per-venue results from process_and_display_items
+        by_quality (bool): Results are per quality (one ranking row per item and quality)
+
+    Returns:
+        pd.DataFrame: One row per item (best venue), output columns, sorted by profit_pct
+    """
+    result_df = select_best_venue(item_averages, by_quality)
+
+    # Select and order columns
+    output_columns = ['item_id', 'tier', 'enchant', 'server', 'location', 'cost', 'weighted_avg_price', 'profit', 'profit_pct', 'total_trade_count', 'latest_update']
+    if by_quality:
+        output_columns.insert(3, 'quality')
+    result_df = result_df[output_columns]
+
+    # Rename columns for output
+    result_df = result_df.rename(columns={
+        'weighted_avg_price': 'avg_price',
+        'total_trade_count': 'trade_count'
+    })
+
+    # Sort by profit percentage (highest first)
+    return result_df.sort_values('profit_pct', ascending=False)
 
 
-async def main():
+def select_best_venue(item_averages, by_quality=False):
+    """
+    Keep the venue with the highest weighted average price for each item.
+
+    Args:
+        item_averages (pd.DataFrame): Per-venue results from process_and_display_items
+        by_quality (bool): Keep the best venue of each item and quality
+
+    Returns:
+        pd.DataFrame: One row per item (and quality), profit computed against its best venue
+    """
+    best = item_averages.sort_values('weighted_avg_price', ascending=False, kind='stable')
+    return best.drop_duplicates(['item_id', 'quality'] if by_quality else 'item_id', keep='first')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Albion Online crafting profit analyzer")
+    parser.add_argument('--resume', action='store_true',
+                        help=f"Skip items already completed by an interrupted run ({checkpoint_path})")
+    return parser.parse_args(argv)
+
+
+async def main(argv=None):
     """
     Main execution function.
     Fetches market data, calculates costs and profits, and exports to CSV.
+
+    Args:
+        argv (list): Optional command line arguments (defaults to sys.argv)
     """
+    args = parse_args(argv)
+    run_metrics = metrics.reset()
 
     # Generate target items from configuration
-    target_items = generate_all_items(ALL_ITEM_NAMES, DEFAULT_TIERS, DEFAULT_ENCHANTS)
+    target_items = select_target_items()
+
+    # Build the recipe matrix once; costs for all items are one matrix-vector product
+    cost_engine = CostEngine(target_items, chain=CraftingChain() if crafting_chain_enabled else None)
 
     # Prepare cutoff date for filtering
     cutoff_date = datetime.now() - pd.Timedelta(days=7)
 
     # Storage for all results
     all_item_averages = []
+    all_quality_averages = []
+
+    # Results are streamed as each request unit completes (per quality if enabled)
+    stream = open_result_stream()
 
     # Callback function to process each chunk
-    async def process_chunk(chunk_items, chunk_data):
-        if not chunk_data:
-            return
+    async def process_chunk(chunk_items, chunk_df):
+        with metrics.stage('aggregate'):
+            # Filter to last 7 days (chunk_df is a view of the record buffer)
+            chunk_df = chunk_df[chunk_df['latest_timestamp'] >= cutoff_date]
+            if len(chunk_df) == 0:
+                return
+
+            # Process and display chunk results
+            chunk_results = process_and_display_items(chunk_items, chunk_df, cutoff_date, cost_engine)
+            if len(chunk_results) > 0:
+                all_item_averages.append(chunk_results)
+                if priority:
+                    priority.observe(chunk_results)
+            if quality_pricing_enabled:
+                quality_results = process_and_display_items(chunk_items, chunk_df, cutoff_date, cost_engine,
+                                                            by_quality=True)
+                all_quality_averages.append(quality_results)
+        if stream:
+            with metrics.stage('export'):
+                stream.write(quality_results if quality_pricing_enabled else chunk_results)
 
-        # Convert to DataFrame
-        chunk_df = pd.DataFrame(chunk_data)
-        chunk_df['latest_timestamp'] = pd.to_datetime(chunk_df['latest_timestamp'])
+    # Items completed by an interrupted run are taken from the checkpoint journal
+    journal = CheckpointJournal(checkpoint_path)
+    completed = journal.load() if args.resume else {}
+    journal.open(resume=args.resume)
 
-        # Filter to last 7 days
-        chunk_df = chunk_df[chunk_df['latest_timestamp'] >= cutoff_date]
+    # Each API host gets its own rate limiter; the session's connector pools connections per host
+    targets = market_targets()
+    schedulers = {target.server: create_scheduler() for target in targets}
 
-        if len(chunk_df) > 0:
-            # Process and display chunk results
-            chunk_results = process_and_display_items(chunk_items, chunk_df, cutoff_date)
-            all_item_averages.extend(chunk_results)
+    # Most valuable items first, judged by the previous run's ranking
+    priority = None
+    top_ready = None
+    if priority_fetch_enabled:
+        priority = FetchPriority(target_items, load_priors(priority_history_path), [t.server for t in targets],
+                                 top_n=priority_top_n, costs=cost_engine.costs())
+        if priority.informed():
+            top_ready = asyncio.create_task(report_top_ready(priority, all_item_averages))
+        else:
+            print(f"ℹ️ 前回のランキング（{priority_history_path}）がないため、原価の高い順に取得します"
+                  "（上位候補の先行出力なし）", flush=True)
+    # Latest records of every server, stored column by column
+    buffer = RecordBuffer()
+    async with create_session() as session:
+        # Refresh material prices before any item cost is needed (from the first server)
+        if live_material_prices:
+            await refresh_material_prices(session, cost_engine, schedulers[targets[0].server], targets[0])
+            if priority:
+                priority.set_costs(cost_engine.costs())
 
-    # Fetch data with chunk processing
-    raw_data = await get_latest_timeseries_data(target_items, time_scale=6, process_chunk_callback=process_chunk)
+        remaining = {}
+        for target in targets:
+            done = completed.get(target.server, {})
+            remaining[target.server] = [item for item in target_items if item not in done]
+            server_resumed = [record for item in target_items for record in done.get(item, [])]
+            if done:
+                print(f"⏯️ [{target.server}] 再開: 完了済み {len(target_items) - len(remaining[target.server])}件をスキップ",
+                      flush=True)
+            if server_resumed:
+                rows = buffer.extend(server_resumed)
+                await process_chunk(sorted({row['item_id'] for row in server_resumed}), buffer.frame(*rows))
+            if priority and done:
+                priority.complete(target.server, list(done))
 
-    if not raw_data:
+        # Fetch data from every server concurrently
+        with metrics.stage('fetch'):
+            await asyncio.gather(*(
+                get_latest_timeseries_data(remaining[target.server], time_scale=6, process_chunk_callback=process_chunk,
+                                           scheduler=schedulers[target.server], session=session, target=target,
+                                           journal=journal, buffer=buffer, priority=priority)
+                for target in targets
+            ))
+    payload_parser.close()
+    if top_ready and priority.ready.is_set():
+        await top_ready
+    elif top_ready:
+        top_ready.cancel()
+
+    if stream:
+        stream.close()
+        print(f"📝 {stream.rows}行を {stream.path} に逐次出力しました", flush=True)
+
+    if not len(buffer):
         print("❌ データが取得できませんでした", flush=True)
+        journal.close()
+        export_metrics(run_metrics)
         return
 
     # Create final summary
     print(f"\n📊 最終集計結果:", flush=True)
-    print(f"   取得データ総数: {len(raw_data)}件", flush=True)
+    print(f"   取得データ総数: {len(buffer)}件", flush=True)
+    for server, scheduler in schedulers.items():
+        stats = scheduler.summary()
+        print(f"   [{server}] 同時リクエスト上限: {stats['concurrency']} / リクエスト速度: {stats['request_rate']:.2f}/s", flush=True)
+        print(f"   [{server}] 429制限: {stats['throttled']}回 / タイムアウト: {stats['timeouts']}回", flush=True)
+        if 'peak_concurrency' in stats:
+            print(f"   [{server}] AIMD: 最大上限 {stats['peak_concurrency']} / 増加 {stats['increases']}回 / 減少 {stats['decreases']}回", flush=True)
 
     # Display final sorted results
     if all_item_averages:
-        result_df = pd.DataFrame(all_item_averages)
-
-        # Select and order columns
-        output_columns = ['item_id', 'tier', 'enchant', 'cost', 'weighted_avg_price', 'profit', 'profit_pct', 'total_trade_count', 'latest_update']
-        result_df = result_df[output_columns]
-
-        # Rename columns for output
-        result_df = result_df.rename(columns={
-            'weighted_avg_price': 'avg_price',
-            'total_trade_count': 'trade_count'
-        })
-
-        # Sort by profit percentage (highest first)
-        result_df = result_df.sort_values('profit_pct', ascending=False)
+        with metrics.stage('aggregate'):
+            result_df = build_ranking(pd.concat(all_item_averages, ignore_index=True))
 
         # Export to CSV
         output_file = "item_profit_analysis_7days.csv"
-        result_df.to_csv(output_file, index=False)
+        with metrics.stage('export'):
+            result_df.to_csv(output_file, index=False)
 
         print(f"\n📈 全アイテム利益ランキング (上位10件):", flush=True)
         print(result_df.head(10).to_string(index=False), flush=True)
         print(f"\n✅ 完全な結果を {output_file} に出力しました", flush=True)
 
+        # Best venue of every item and quality
+        if all_quality_averages:
+            with metrics.stage('aggregate'):
+                quality_df = build_ranking(pd.concat(all_quality_averages, ignore_index=True), by_quality=True)
+            with metrics.stage('export'):
+                quality_df.to_csv(quality_ranking_path, index=False)
+            print(f"✅ 品質別の結果を {quality_ranking_path} に出力しました", flush=True)
+
+        # Craft quantities within the budget, material stock and market volume
+        if portfolio_enabled:
+            with metrics.stage('optimize'):
+                plan, summary = optimize_portfolio(result_df, cost_engine)
+            plan.to_csv(portfolio_path, index=False)
+            print(f"\n🧺 製作計画（{summary['solver']}、{summary['seconds'] * 1000:.0f}ms）: "
+                  f"{summary['items']}種類 {summary['crafts']}個 / 原価 {summary['total_cost']:,.0f} / "
+                  f"予想利益 {summary['total_profit']:,.0f}", flush=True)
+            if len(plan) > 0:
+                print(plan.head(10).to_string(index=False), flush=True)
+            print(f"✅ 製作計画を {portfolio_path} に出力しました", flush=True)
+
     else:
         print("❌ 有効な重み付け平均を計算できませんでした", flush=True)
 
+    # The run finished, so the next run starts from scratch
+    journal.close(finished=True)
+    export_metrics(run_metrics)
+
+
+async def report_top_ready(priority, all_item_averages):
+    """
+    Publish a provisional ranking as soon as the top candidates are fresh.
+
+    Args:
+        priority (FetchPriority): Fetch priority of the run
+        all_item_averages (list): Per-venue results collected so far
+    """
+    started = time.monotonic()
+    await priority.ready.wait()
+    if not all_item_averages:
+        return
+    ranking = build_ranking(pd.concat(all_item_averages, ignore_index=True))
+    ranking = ranking[ranking['item_id'].isin(priority.ready_items)].head(priority.top_n)
+    ranking.to_csv(priority_partial_path, index=False)
+    print(f"\n⚡ 上位{priority.top_n}件の候補が揃いました（{time.monotonic() - started:.1f}秒、"
+          f"取得済み {len(priority.fresh)}/{len(priority.items)}件）→ {priority_partial_path}", flush=True)
+    print(ranking.head(10).to_string(index=False), flush=True)
+
+
+def export_metrics(run_metrics):
+    """
+    Print the run summary table and write the configured metrics files.
+
+    Args:
+        run_metrics (metrics.RunMetrics): Collector of the finished run
+    """
+    if not metrics_enabled:
+        return
+    print("\n⏱️ 計測結果:", flush=True)
+    print(run_metrics.summary_table(), flush=True)
+    if metrics_jsonl_path:
+        run_metrics.export_jsonl(metrics_jsonl_path)
+        print(f"📝 リクエストログを {metrics_jsonl_path} に出力しました", flush=True)
+    if metrics_prometheus_path:
+        run_metrics.export_prometheus(metrics_prometheus_path)
+        print(f"📝 Prometheus形式のメトリクスを {metrics_prometheus_path} に出力しました", flush=True)
+
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,368 @@
+"""
+Query service for Albion Cost Calculator
+Serves the latest profit ranking over HTTP/JSON from an indexed in-memory
+table that is swapped atomically on every refresh
+"""
+
+import argparse
+import asyncio
+import csv
+import math
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+from aiohttp import web
+
+from config import service_host, service_port, service_csv_path, service_poll_seconds, service_max_limit
+from catalog import load_catalog, parse_item_id
+
+NUMERIC_COLUMNS = ['cost', 'avg_price', 'profit', 'profit_pct', 'trade_count']
+
+
+class ProfitTable:
+    """
+    Immutable ranking snapshot with lookup indexes.
+
+    Rows are stored in profit rank order (profit_pct descending, as in the
+    ranking CSV), so a row's position is its rank. Item IDs map to ranks, and
+    tier, enchantment and material type map to ascending rank arrays; a query
+    intersects the rank arrays of its filters, applies the numeric thresholds on
+    column arrays and returns the first matches, already in rank order.
+    """
+
+    def __init__(self, rows, generated_at=None):
+        """
+        Args:
+            rows (list): Ranking rows as dictionaries (ranking CSV columns)
+            generated_at (str): When the ranking was produced (defaults to now)
+        """
+        rows = [_clean_row(row) for row in rows]
+        rows.sort(key=lambda row: -math.inf if row['profit_pct'] is None else row['profit_pct'], reverse=True)
+        for rank, row in enumerate(rows, 1):
+            row['rank'] = rank
+        self.rows = rows
+        self.generated_at = generated_at or datetime.now().isoformat(timespec='seconds')
+
+        self.columns = {column: np.array([np.nan if row[column] is None else row[column] for row in rows],
+                                         dtype=np.float64)
+                        for column in NUMERIC_COLUMNS}
+        self.by_item = {row['item_id']: position for position, row in enumerate(rows)}
+
+        tiers, enchants, materials = {}, {}, {}
+        catalog = load_catalog()
+        for position, row in enumerate(rows):
+            entry = catalog.get(row['item_id'])
+            if entry is not None:
+                tier, enchant, item_materials = entry.tier, entry.enchant, entry.materials
+            else:
+                tier, enchant, item_materials = _parse_levels(row['item_id']) + ((),)
+            row['materials'] = list(item_materials)
+            tiers.setdefault(tier, []).append(position)
+            enchants.setdefault(enchant, []).append(position)
+            for material in item_materials:
+                materials.setdefault(material, []).append(position)
+        self.by_tier = {key: np.asarray(positions, dtype=np.intp) for key, positions in tiers.items()}
+        self.by_enchant = {key: np.asarray(positions, dtype=np.intp) for key, positions in enchants.items()}
+        self.by_material = {key: np.asarray(positions, dtype=np.intp) for key, positions in materials.items()}
+
+    @classmethod
+    def from_frame(cls, ranking):
+        """
+        Args:
+            ranking (pd.DataFrame): Output of profit_analyzer.build_ranking
+
+        Returns:
+            ProfitTable: Snapshot of the ranking
+        """
+        return cls(ranking.astype({'latest_update': str}).to_dict('records'))
+
+    @classmethod
+    def from_csv(cls, path):
+        """
+        Args:
+            path (str): Ranking CSV (item_profit_analysis_7days.csv format)
+
+        Returns:
+            ProfitTable: Snapshot of the file
+        """
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        generated_at = datetime.fromtimestamp(os.path.getmtime(path)).isoformat(timespec='seconds')
+        return cls(rows, generated_at)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def get(self, item_id):
+        """
+        Args:
+            item_id (str): Item ID
+
+        Returns:
+            dict: The item's row, or None if it is not ranked
+        """
+        position = self.by_item.get(item_id)
+        return None if position is None else self.rows[position]
+
+    def query(self, tiers=None, min_tier=None, max_tier=None, enchants=None, materials=None,
+              min_trade_count=None, min_profit=None, min_profit_pct=None, sort='profit_pct', limit=20):
+        """
+        Select ranked rows.
+
+        Example: query(min_tier=6, min_trade_count=50, limit=20) is "top 20 T6+ by
+        profit with more than 50 trades".
+
+        Args:
+            tiers (list): Tiers (integers)
+            min_tier (int): Lowest tier
+            max_tier (int): Highest tier
+            enchants (list): Enchantment levels (0 for none)
+            materials (list): Material types every row must use (e.g. "LEATHER")
+            min_trade_count (float): Trade count must be greater than this
+            min_profit (float): Lowest profit in silver
+            min_profit_pct (float): Lowest profit percentage
+            sort (str): "profit_pct" (rank order) or "profit"
+            limit (int): Maximum number of rows
+
+        Returns:
+            list: Matching rows
+        """
+        candidates = None
+
+        def restrict(positions):
+            nonlocal candidates
+            candidates = positions if candidates is None else np.intersect1d(candidates, positions,
+                                                                             assume_unique=True)
+
+        empty = np.empty(0, dtype=np.intp)
+        if tiers is not None or min_tier is not None or max_tier is not None:
+            selected = [positions for tier, positions in self.by_tier.items()
+                        if tier is not None and (tiers is None or tier in tiers)
+                        and (min_tier is None or tier >= min_tier)
+                        and (max_tier is None or tier <= max_tier)]
+            restrict(np.sort(np.concatenate(selected)) if selected else empty)
+        if enchants is not None:
+            selected = [self.by_enchant[enchant] for enchant in enchants if enchant in self.by_enchant]
+            restrict(np.sort(np.concatenate(selected)) if selected else empty)
+        for material in materials or ():
+            restrict(self.by_material.get(material, empty))
+        if candidates is None:
+            candidates = np.arange(len(self.rows), dtype=np.intp)
+
+        # NaN never passes a threshold
+        mask = np.ones(len(candidates), dtype=bool)
+        if min_trade_count is not None:
+            mask &= self.columns['trade_count'][candidates] > min_trade_count
+        if min_profit is not None:
+            mask &= self.columns['profit'][candidates] >= min_profit
+        if min_profit_pct is not None:
+            mask &= self.columns['profit_pct'][candidates] >= min_profit_pct
+        candidates = candidates[mask]
+
+        if sort == 'profit':
+            profit = np.nan_to_num(self.columns['profit'][candidates], nan=-np.inf)
+            candidates = candidates[np.argsort(-profit, kind='stable')]
+        return [self.rows[position] for position in candidates[:limit]]
+
+
+def _parse_levels(item_id):
+    parsed = parse_item_id(item_id)
+    if parsed is None:
+        return None, 0
+    tier, _, enchant = parsed
+    try:
+        return int(tier[1:]), int(enchant[1:]) if enchant else 0
+    except ValueError:
+        return None, 0
+
+
+def _clean_row(row):
+    # JSON-ready copy: numbers as floats (None for missing / NaN), everything else as text
+    clean = {}
+    for key, value in row.items():
+        if key in NUMERIC_COLUMNS:
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                value = None
+            if value is not None and math.isnan(value):
+                value = None
+            elif key == 'trade_count' and value is not None and value.is_integer():
+                value = int(value)
+        elif value is None or (isinstance(value, float) and math.isnan(value)):
+            value = ""
+        else:
+            value = str(value)
+        clean[key] = value
+    return clean
+
+
+class QueryService:
+    """
+    HTTP/JSON front end for the current ProfitTable.
+
+    Handlers read self.table once per request; swap() replaces the reference
+    with a fully built table, so readers are never blocked and always see one
+    complete snapshot.
+
+    Routes:
+        GET /items            query (tier, min_tier, max_tier, enchant, material,
+                              min_trade_count, min_profit, min_profit_pct, sort, limit)
+        GET /items/{item_id}  one item's row
+        GET /status           snapshot info
+    """
+
+    def __init__(self, table=None):
+        """
+        Args:
+            table (ProfitTable): Initial table (an empty one if omitted)
+        """
+        self.table = table if table is not None else ProfitTable([])
+        self.swaps = 0
+        self.app = web.Application()
+        self.app.router.add_get('/items', self.handle_query)
+        self.app.router.add_get('/items/{item_id}', self.handle_item)
+        self.app.router.add_get('/status', self.handle_status)
+        self.runner = None
+
+    def swap(self, table):
+        """
+        Publish a new table.
+
+        Args:
+            table (ProfitTable): Fully built replacement
+        """
+        self.table = table
+        self.swaps += 1
+
+    async def start(self, host=service_host, port=service_port):
+        """
+        Start listening.
+
+        Args:
+            host (str): Bind address
+            port (int): Port
+        """
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+        print(f"🌐 クエリサービス起動: http://{host}:{port}/items", flush=True)
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def handle_query(self, request):
+        table = self.table
+        try:
+            conditions = parse_query(request.query)
+        except ValueError as e:
+            return web.json_response({'error': str(e)}, status=400)
+        started = time.perf_counter()
+        rows = table.query(**conditions)
+        took = time.perf_counter() - started
+        return web.json_response({'generated_at': table.generated_at, 'count': len(rows),
+                                  'took_ms': round(took * 1000, 3), 'items': rows})
+
+    async def handle_item(self, request):
+        table = self.table
+        row = table.get(request.match_info['item_id'])
+        if row is None:
+            return web.json_response({'error': "item not ranked"}, status=404)
+        return web.json_response({'generated_at': table.generated_at, 'item': row})
+
+    async def handle_status(self, request):
+        table = self.table
+        return web.json_response({'generated_at': table.generated_at, 'items': len(table), 'swaps': self.swaps})
+
+
+def parse_query(params):
+    """
+    Convert query string parameters into ProfitTable.query arguments.
+
+    Args:
+        params (Mapping): Query string parameters (lists are comma-separated)
+
+    Returns:
+        dict: Keyword arguments for ProfitTable.query
+
+    Raises:
+        ValueError: If a parameter is malformed
+    """
+    def ints(text):
+        return [int(value.strip().lstrip("T@")) for value in text.split(",") if value.strip()]
+
+    conditions = {}
+    if 'tier' in params:
+        conditions['tiers'] = ints(params['tier'])
+    if 'enchant' in params:
+        conditions['enchants'] = ints(params['enchant'])
+    if 'material' in params:
+        conditions['materials'] = [value.strip().upper() for value in params['material'].split(",") if value.strip()]
+    for name in ('min_tier', 'max_tier'):
+        if name in params:
+            conditions[name] = int(params[name].lstrip("T"))
+    for name in ('min_trade_count', 'min_profit', 'min_profit_pct'):
+        if name in params:
+            conditions[name] = float(params[name])
+    sort = params.get('sort', 'profit_pct')
+    if sort not in ('profit_pct', 'profit'):
+        raise ValueError("sort must be profit_pct or profit")
+    conditions['sort'] = sort
+    conditions['limit'] = max(0, min(int(params.get('limit', 20)), service_max_limit))
+    return conditions
+
+
+async def serve_csv(path=service_csv_path, host=service_host, port=service_port, poll_seconds=service_poll_seconds):
+    """
+    Serve a ranking CSV, reloading it whenever the file changes.
+
+    Args:
+        path (str): Ranking CSV (e.g. the profit_analyzer or daemon output)
+        host (str): Bind address
+        port (int): Port
+        poll_seconds (float): Interval between modification checks
+    """
+    service = QueryService()
+    await service.start(host, port)
+    loaded = None
+    try:
+        while True:
+            try:
+                modified = os.stat(path).st_mtime_ns
+            except OSError:
+                modified = None
+            if modified is not None and modified != loaded:
+                # Built in a worker thread; requests keep using the previous table meanwhile
+                table = await asyncio.to_thread(ProfitTable.from_csv, path)
+                service.swap(table)
+                loaded = modified
+                print(f"🔃 {path} を読み込みました: {len(table)}件", flush=True)
+            await asyncio.sleep(poll_seconds)
+    finally:
+        await service.stop()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP/JSON query service for the profit ranking")
+    parser.add_argument('--csv', default=service_csv_path, help="Ranking CSV to serve (reloaded when it changes)")
+    parser.add_argument('--host', default=service_host)
+    parser.add_argument('--port', type=int, default=service_port)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        asyncio.run(serve_csv(args.csv, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
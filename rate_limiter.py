@@ -0,0 +1,310 @@
+"""
+Rate limiter module for Albion Cost Calculator
+Contains the token bucket scheduler shared by all API requests
+and the adaptive (AIMD) concurrency controller
+"""
+
+import asyncio
+import time
+from collections import deque
+
+
+class TokenBucket:
+    """
+    Token bucket that paces requests to a steady rate with a limited burst.
+
+    A 429 from any request triggers a shared backoff, pausing every caller
+    until it expires instead of each request sleeping on its own.
+    """
+
+    def __init__(self, rate, burst):
+        """
+        Args:
+            rate (float): Tokens added per second (sustained requests per second)
+            burst (int): Maximum number of tokens the bucket can hold
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """
+        Wait until a token is available and no backoff is active, then take it.
+        """
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def backoff(self, seconds):
+        """
+        Pause all requests for the given number of seconds.
+
+        Args:
+            seconds (float): Backoff duration, measured from now
+        """
+        now = time.monotonic()
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        # Do not let tokens accumulate during the pause into a burst afterwards
+        self.tokens = min(self.tokens, 1.0)
+        self.updated = max(self.updated, self.blocked_until)
+
+    def set_rate(self, rate):
+        """
+        Change the refill rate, keeping the tokens earned at the old rate.
+
+        Args:
+            rate (float): New tokens per second
+        """
+        now = time.monotonic()
+        if now >= self.updated:
+            self._refill(now)
+        self.rate = rate
+
+    @property
+    def backoff_remaining(self):
+        """float: Seconds left on the current shared backoff."""
+        return max(0.0, self.blocked_until - time.monotonic())
+
+
+class ConcurrencyLimit:
+    """
+    Semaphore-like limit on requests in flight whose size can change at runtime.
+    """
+
+    def __init__(self, limit):
+        """
+        Args:
+            limit (int): Initial number of requests allowed in flight
+        """
+        self.limit = limit
+        self.in_flight = 0
+        self._waiters = deque()
+
+    def _wake(self):
+        while self._waiters and self.in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    async def acquire(self):
+        """
+        Wait for a free slot and take it.
+        """
+        if not self._waiters and self.in_flight < self.limit:
+            self.in_flight += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # The slot may have been handed over just before cancellation
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        """
+        Give a slot back and wake waiters that now fit under the limit.
+        """
+        self.in_flight -= 1
+        self._wake()
+
+    def set_limit(self, limit):
+        """
+        Args:
+            limit (int): New number of requests allowed in flight
+        """
+        self.limit = limit
+        self._wake()
+
+
+class AimdController:
+    """
+    Additive-increase / multiplicative-decrease control of concurrency and request rate.
+
+    Fast successful responses grow the limit by a fixed step per window of
+    `limit` responses; 429s and timeouts cut it by a constant factor, at most
+    once per cooldown so a burst of failures from requests already in flight
+    counts as a single congestion signal.
+    """
+
+    def __init__(self, concurrency, rate, min_concurrency, max_concurrency,
+                 min_rate, max_rate, increase, rate_increase, decrease,
+                 slow_seconds, cooldown):
+        """
+        Args:
+            concurrency (int): Initial in-flight limit
+            rate (float): Initial requests per second
+            min_concurrency (int): Lower bound for the in-flight limit
+            max_concurrency (int): Upper bound for the in-flight limit
+            min_rate (float): Lower bound for requests per second
+            max_rate (float): Upper bound for requests per second
+            increase (float): In-flight limit added per window of fast successes
+            rate_increase (float): Requests per second added per window of fast successes
+            decrease (float): Multiplier applied on 429 or timeout
+            slow_seconds (float): Responses slower than this do not grow the limits
+            cooldown (float): Minimum seconds between two decreases
+        """
+        self.concurrency = float(concurrency)
+        self.rate = float(rate)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.rate_increase = rate_increase
+        self.decrease = decrease
+        self.slow_seconds = slow_seconds
+        self.cooldown = cooldown
+        self.last_decrease = float("-inf")
+        self.increases = 0
+        self.decreases = 0
+        self.peak_concurrency = self.concurrency
+
+    def on_success(self, latency):
+        """
+        Args:
+            latency (float): Response time in seconds
+
+        Returns:
+            bool: True if the limits changed
+        """
+        if latency > self.slow_seconds:
+            return False
+        old = (int(self.concurrency), self.rate)
+        window = max(self.concurrency, 1.0)
+        self.concurrency = min(self.max_concurrency, self.concurrency + self.increase / window)
+        self.rate = min(self.max_rate, self.rate + self.rate_increase / window)
+        self.peak_concurrency = max(self.peak_concurrency, self.concurrency)
+        if int(self.concurrency) > old[0]:
+            self.increases += 1
+        return (int(self.concurrency), self.rate) != old
+
+    def on_congestion(self):
+        """
+        Returns:
+            bool: True if the limits were cut
+        """
+        now = time.monotonic()
+        if now - self.last_decrease < self.cooldown:
+            return False
+        self.last_decrease = now
+        self.concurrency = max(self.min_concurrency, self.concurrency * self.decrease)
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        self.decreases += 1
+        return True
+
+
+class RequestScheduler:
+    """
+    Combines a token bucket (request rate) with a limit on requests in flight.
+
+    When an AimdController is given, request outcomes reported through
+    record_success / record_throttle / record_timeout adjust both limits.
+    """
+
+    def __init__(self, rate, burst, max_in_flight, controller=None):
+        """
+        Args:
+            rate (float): Sustained requests per second
+            burst (int): Maximum burst size
+            max_in_flight (int): Maximum number of concurrent requests
+            controller (AimdController): Optional adaptive controller
+        """
+        self.bucket = TokenBucket(rate, burst)
+        self.limit = ConcurrencyLimit(max_in_flight)
+        self.controller = controller
+        self.throttled = 0
+        self.timeouts = 0
+
+    async def __aenter__(self):
+        await self.limit.acquire()
+        try:
+            await self.bucket.acquire()
+        except BaseException:
+            self.limit.release()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.limit.release()
+        return False
+
+    def backoff(self, seconds):
+        """
+        Pause all requests sharing this scheduler.
+
+        Args:
+            seconds (float): Backoff duration
+        """
+        self.bucket.backoff(seconds)
+
+    def _apply_controller(self):
+        self.limit.set_limit(int(self.controller.concurrency))
+        self.bucket.set_rate(self.controller.rate)
+
+    def record_success(self, latency):
+        """
+        Args:
+            latency (float): Response time of a successful request in seconds
+        """
+        if self.controller and self.controller.on_success(latency):
+            self._apply_controller()
+
+    def record_throttle(self, wait_time):
+        """
+        Report a 429: start the shared backoff and cut the limits.
+
+        Args:
+            wait_time (float): Shared backoff duration in seconds
+        """
+        self.throttled += 1
+        self.backoff(wait_time)
+        if self.controller and self.controller.on_congestion():
+            self._apply_controller()
+
+    def record_timeout(self):
+        """
+        Report a request timeout and cut the limits.
+        """
+        self.timeouts += 1
+        if self.controller and self.controller.on_congestion():
+            self._apply_controller()
+
+    def summary(self):
+        """
+        Returns:
+            dict: Current limits and counters for the run summary
+        """
+        summary = {
+            'concurrency': self.limit.limit,
+            'request_rate': self.bucket.rate,
+            'throttled': self.throttled,
+            'timeouts': self.timeouts,
+        }
+        if self.controller:
+            summary.update({
+                'peak_concurrency': int(self.controller.peak_concurrency),
+                'increases': self.controller.increases,
+                'decreases': self.controller.decreases,
+            })
+        return summary
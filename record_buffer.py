@@ -0,0 +1,185 @@
+"""
+Record buffer module for Albion Cost Calculator
+Append-only columnar storage of latest market records with zero-copy DataFrame views
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+NUMERIC_COLUMNS = ('avg_price', 'item_count', 'latest_timestamp')
+CODE_COLUMNS = ('item_id', 'quality', 'location', 'server')
+
+
+class Categories:
+    """
+    Growing mapping between labels and integer codes.
+    """
+
+    def __init__(self):
+        self.labels = []
+        self.codes = {}
+
+    def encode(self, values):
+        """
+        Args:
+            values (list): Labels (new labels are assigned the next free code)
+
+        Returns:
+            np.ndarray: int32 codes
+        """
+        codes = self.codes
+        result = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            code = codes.get(value)
+            if code is None:
+                code = codes[value] = len(self.labels)
+                self.labels.append(value)
+            result[i] = code
+        return result
+
+
+class RecordBuffer:
+    """
+    Latest records (one per item, quality and venue) stored column by column.
+
+    Prices, trade counts and timestamps live in typed numpy arrays; item ID,
+    quality, location and server are stored as integer codes. Arrays grow by
+    doubling, and frames handed out earlier keep pointing at the data they
+    were built from, which is never modified.
+    """
+
+    def __init__(self, capacity=1024):
+        """
+        Args:
+            capacity (int): Initial number of rows allocated
+        """
+        self.size = 0
+        self.avg_price = np.empty(capacity, dtype=np.float64)
+        self.item_count = np.empty(capacity, dtype=np.int64)
+        self.latest_timestamp = np.empty(capacity, dtype='datetime64[ms]')
+        self.codes = {name: np.empty(capacity, dtype=np.int32) for name in CODE_COLUMNS}
+        self.categories = {name: Categories() for name in self.codes}
+
+    def __len__(self):
+        return self.size
+
+    def _reserve(self, rows):
+        capacity = len(self.avg_price)
+        if self.size + rows <= capacity:
+            return
+        capacity = max(capacity * 2, self.size + rows)
+        # Copies go to new arrays; the old ones stay valid for frames already handed out
+        self.avg_price = _grow(self.avg_price, self.size, capacity)
+        self.item_count = _grow(self.item_count, self.size, capacity)
+        self.latest_timestamp = _grow(self.latest_timestamp, self.size, capacity)
+        self.codes = {name: _grow(codes, self.size, capacity) for name, codes in self.codes.items()}
+
+    def extend(self, records):
+        """
+        Append records.
+
+        Args:
+            records (list): Dictionaries in the format of history_parser.extract_latest_records
+
+        Returns:
+            tuple: (start, stop) row range of the appended records
+        """
+        start = self.size
+        rows = len(records)
+        if not rows:
+            return start, start
+        self._reserve(rows)
+        stop = start + rows
+
+        self.avg_price[start:stop] = [record['avg_price'] for record in records]
+        self.item_count[start:stop] = [record['item_count'] for record in records]
+        self.latest_timestamp[start:stop] = np.array([record['latest_timestamp'] for record in records],
+                                                     dtype='datetime64[ms]')
+        for name, codes in self.codes.items():
+            codes[start:stop] = self.categories[name].encode([record.get(name) for record in records])
+        self.size = stop
+        return start, stop
+
+    def frame(self, start=0, stop=None):
+        """
+        Build a DataFrame over a row range without copying the numeric columns.
+
+        Args:
+            start (int): First row
+            stop (int): End of the range (defaults to the current size)
+
+        Returns:
+            pd.DataFrame: Columns item_id, quality, location, server (categorical),
+                          latest_timestamp, avg_price, item_count
+        """
+        rows = slice(start, self.size if stop is None else stop)
+        columns = {
+            name: pd.Categorical.from_codes(self.codes[name][rows], self.categories[name].labels)
+            for name in CODE_COLUMNS
+        }
+        columns['latest_timestamp'] = self.latest_timestamp[rows]
+        columns['avg_price'] = self.avg_price[rows]
+        columns['item_count'] = self.item_count[rows]
+        return pd.DataFrame(columns, copy=False)
+
+    def records(self, start=0, stop=None):
+        """
+        Args:
+            start (int): First row
+            stop (int): End of the range (defaults to the current size)
+
+        Returns:
+            list: Rows as dictionaries
+        """
+        return self.frame(start, stop).to_dict('records')
+
+    def save(self, directory):
+        """
+        Write the records as one .npy file per column, for read-only sharing.
+
+        Args:
+            directory (str): Destination directory (created if missing)
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name in NUMERIC_COLUMNS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name)[:self.size])
+        for name in CODE_COLUMNS:
+            np.save(os.path.join(directory, f"{name}.npy"), self.codes[name][:self.size])
+        with open(os.path.join(directory, "labels.json"), "w", encoding="utf-8") as f:
+            json.dump({name: self.categories[name].labels for name in CODE_COLUMNS}, f)
+
+    @classmethod
+    def open_mapped(cls, directory):
+        """
+        Open records written by save() as read-only memory maps.
+
+        The operating system shares the mapped pages between every process
+        that opens the same directory, so the data is not copied per process.
+
+        Args:
+            directory (str): Directory written by save()
+
+        Returns:
+            RecordBuffer: Buffer over the mapped columns (must not be extended)
+        """
+        buffer = cls(capacity=0)
+        for name in NUMERIC_COLUMNS:
+            setattr(buffer, name, np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r'))
+        buffer.codes = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r')
+                        for name in CODE_COLUMNS}
+        with open(os.path.join(directory, "labels.json"), encoding="utf-8") as f:
+            labels = json.load(f)
+        for name in CODE_COLUMNS:
+            buffer.categories[name].labels = labels[name]
+        buffer.size = len(buffer.avg_price)
+        return buffer
+
+
+def _grow(array, used, capacity):
+    grown = np.empty(capacity, dtype=array.dtype)
+    grown[:used] = array[:used]
+    return grown
+
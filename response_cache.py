@@ -0,0 +1,188 @@
+"""
+Response cache module for Albion Cost Calculator
+Stores history API responses on disk (SQLite + zlib) with TTL, validators and LRU eviction
+"""
+
+import json
+import os
+import sqlite3
+import time
+import zlib
+from collections import namedtuple
+
+# start_date is the first day of the cached window (None for the full history)
+CacheEntry = namedtuple('CacheEntry', ['payload', 'etag', 'last_modified', 'fresh', 'start_date'])
+
+FULL_HISTORY = ""
+
+# Cache key of the material prices response (time scale 0, one entry per server and city)
+MATERIAL_PRICES_KEY = "@material_prices"
+
+KEY_CLAUSE = "server = ? AND item_id = ? AND location = ? AND time_scale = ? AND start_date = ?"
+
+
+class ResponseCache:
+    """
+    Persistent per-item cache of history responses.
+
+    Entries are keyed by (server, item_id, location, time_scale, start_date),
+    so a delta response (history from start_date on) is never served as the
+    full history. A lookup returns an entry whose window covers the requested
+    one (a full-history entry covers every delta). Each entry expires after
+    the TTL; expired entries are kept so that their ETag / Last-Modified
+    validators can be used for a conditional request. When the total payload
+    size exceeds max_bytes, least recently used entries are evicted.
+    """
+
+    def __init__(self, path, ttl, max_bytes):
+        """
+        Args:
+            path (str): SQLite database file
+            ttl (float): Seconds an entry is served without asking the server
+            max_bytes (int): Maximum total size of compressed payloads
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.conn = sqlite3.connect(path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(responses)")]
+        if columns and 'start_date' not in columns:
+            # Entries of the old layout cannot tell full and delta responses apart
+            self.conn.execute("DROP TABLE responses")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                server TEXT NOT NULL,
+                item_id TEXT NOT NULL,
+                location TEXT NOT NULL,
+                time_scale INTEGER NOT NULL,
+                start_date TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL,
+                PRIMARY KEY (server, item_id, location, time_scale, start_date)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)")
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, server, item_id, location, time_scale, start_date=None):
+        """
+        Look up a cached response and mark it as recently used.
+
+        Args:
+            server (str): API base URL
+            item_id (str): Item ID
+            location (str): Market location
+            time_scale (int): Time scale parameter
+            start_date (str): First day the caller needs ("YYYY-MM-DD", None for the full history)
+
+        Returns:
+            CacheEntry: Cached payload covering the window, its validators and whether it is
+                        still within TTL
+            None: If no cached response covers the window
+        """
+        now = time.time()
+        # Fresh entries first, then the narrowest window (latest start) among them
+        row = self.conn.execute(
+            "SELECT start_date, payload, etag, last_modified, expires_at FROM responses "
+            "WHERE server = ? AND item_id = ? AND location = ? AND time_scale = ? "
+            "AND (start_date = ? OR start_date <= ?) ORDER BY expires_at > ? DESC, start_date DESC LIMIT 1",
+            (server, item_id, location, time_scale, FULL_HISTORY, start_date or FULL_HISTORY, now)
+        ).fetchone()
+        if row is None:
+            return None
+
+        cached_start, payload, etag, last_modified, expires_at = row
+        self.conn.execute(f"UPDATE responses SET accessed_at = ? WHERE {KEY_CLAUSE}",
+                          (now, server, item_id, location, time_scale, cached_start))
+        return CacheEntry(json.loads(zlib.decompress(payload)), etag, last_modified, now < expires_at,
+                          cached_start or None)
+
+    def put(self, server, item_id, location, time_scale, payload, etag=None, last_modified=None, start_date=None):
+        """
+        Store a response and evict old entries if the cache is over its size budget.
+
+        Args:
+            server (str): API base URL
+            item_id (str): Item ID
+            location (str): Market location
+            time_scale (int): Time scale parameter
+            payload (list): Decoded JSON records for the item, or their encode_payload blob
+            etag (str): ETag header of the response, if any
+            last_modified (str): Last-Modified header of the response, if any
+            start_date (str): First day of the response's window (None for the full history)
+        """
+        key = (server, item_id, location, time_scale, start_date or FULL_HISTORY)
+        blob = payload if isinstance(payload, bytes) else encode_payload(payload)
+        now = time.time()
+
+        old = self.conn.execute(f"SELECT size FROM responses WHERE {KEY_CLAUSE}", key).fetchone()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses "
+            "(server, item_id, location, time_scale, start_date, payload, etag, last_modified, expires_at, "
+            "accessed_at, size) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            key + (blob, etag, last_modified, now + self.ttl, now, len(blob))
+        )
+        self.total_bytes += len(blob) - (old[0] if old else 0)
+        self._evict()
+
+    def refresh(self, server, item_id, location, time_scale, start_date=None):
+        """
+        Extend an entry's TTL after the server confirmed it is unchanged (304).
+
+        Args:
+            server (str): API base URL
+            item_id (str): Item ID
+            location (str): Market location
+            time_scale (int): Time scale parameter
+            start_date (str): First day of the entry's window (None for the full history)
+        """
+        now = time.time()
+        self.conn.execute(
+            f"UPDATE responses SET expires_at = ?, accessed_at = ? WHERE {KEY_CLAUSE}",
+            (now + self.ttl, now, server, item_id, location, time_scale, start_date or FULL_HISTORY)
+        )
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes:
+            rows = self.conn.execute(
+                "SELECT server, item_id, location, time_scale, start_date, size FROM responses "
+                "ORDER BY accessed_at LIMIT 64"
+            ).fetchall()
+            if not rows:
+                self.total_bytes = 0
+                return
+            self.conn.execute("BEGIN")
+            for server, item_id, location, time_scale, start_date, size in rows:
+                self.conn.execute(f"DELETE FROM responses WHERE {KEY_CLAUSE}",
+                                  (server, item_id, location, time_scale, start_date))
+                self.total_bytes -= size
+                if self.total_bytes <= self.max_bytes:
+                    break
+            self.conn.execute("COMMIT")
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        self.conn.close()
+
+
+def encode_payload(payload):
+    """
+    Encode a payload the way the cache stores it (so it can be done off the event loop).
+
+    Args:
+        payload (list): Decoded JSON records
+
+    Returns:
+        bytes: zlib-compressed compact JSON
+    """
+    return zlib.compress(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
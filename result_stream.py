@@ -0,0 +1,182 @@
+"""
+Result stream module for Albion Cost Calculator
+Appends profit results as they are computed, as NDJSON lines or Parquet part
+files with compact typed columns, so consumers can read them during the run
+"""
+
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.parquet as parquet
+except ImportError:  # optional dependency
+    pyarrow = None
+
+from config import stream_output_format, stream_ndjson_path, stream_parquet_dir, stream_parquet_rows
+
+# Stream columns in output order (quality is only present for per-quality results)
+STREAM_COLUMNS = ['item_id', 'tier', 'enchant', 'quality', 'server', 'location', 'cost', 'avg_price', 'profit',
+                  'profit_pct', 'trade_count', 'latest_update']
+
+
+def compact_frame(item_averages):
+    """
+    Convert per-venue results to the stream's typed columns.
+
+    Tier and enchantment labels become small integers (T5 -> 5, @1 -> 1,
+    no enchantment -> 0), text columns become categoricals and the trade
+    count an int32.
+
+    Args:
+        item_averages (pd.DataFrame): Results from process_and_display_items
+
+    Returns:
+        pd.DataFrame: STREAM_COLUMNS (without quality if the results have none)
+    """
+    frame = item_averages.rename(columns={'weighted_avg_price': 'avg_price', 'total_trade_count': 'trade_count'})
+    columns = [column for column in STREAM_COLUMNS if column in frame.columns]
+    frame = frame[columns].reset_index(drop=True)
+
+    tier = frame['tier'].astype(str).str[1:]
+    enchant = frame['enchant'].fillna("").astype(str).str[1:].replace("", "0")
+    compact = {
+        'item_id': frame['item_id'].astype(str).astype('category'),
+        'tier': pd.to_numeric(tier, errors='coerce').astype('Int8'),
+        'enchant': pd.to_numeric(enchant, errors='coerce').astype('Int8'),
+    }
+    if 'quality' in frame.columns:
+        compact['quality'] = pd.to_numeric(frame['quality'].astype(str), errors='coerce').astype('Int8')
+    compact['server'] = frame['server'].astype(str).astype('category')
+    compact['location'] = frame['location'].astype(str).astype('category')
+    for column in ('cost', 'avg_price', 'profit'):
+        compact[column] = frame[column].astype(np.float64)
+    compact['profit_pct'] = frame['profit_pct'].astype(np.float32)
+    compact['trade_count'] = frame['trade_count'].astype(np.int32)
+    compact['latest_update'] = pd.to_datetime(frame['latest_update']).astype('datetime64[ms]')
+    return pd.DataFrame(compact)
+
+
+class NdjsonResultStream:
+    """
+    One JSON object per result row, appended and flushed after every write.
+
+    A reader can tail the file while the run is in progress; every line is
+    complete once it is visible.
+    """
+
+    def __init__(self, path=stream_ndjson_path):
+        """
+        Args:
+            path (str): Output file (truncated at the start of the run)
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.rows = 0
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def write(self, item_averages):
+        """
+        Args:
+            item_averages (pd.DataFrame): Results from process_and_display_items
+        """
+        if len(item_averages) == 0:
+            return
+        text = compact_frame(item_averages).to_json(orient='records', lines=True, date_format='iso',
+                                                    date_unit='s', double_precision=6, force_ascii=False)
+        self.file.write(text if text.endswith("\n") else text + "\n")
+        self.file.flush()
+        self.rows += len(item_averages)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetResultStream:
+    """
+    Parquet dataset directory written as numbered part files.
+
+    Rows are buffered until stream_parquet_rows are pending, then written as
+    one part file; each part is written under a temporary name and renamed,
+    so readers (pd.read_parquet(directory), pyarrow.dataset) only ever see
+    complete files. _SUCCESS is created when the run closes the stream.
+    """
+
+    def __init__(self, directory=stream_parquet_dir, flush_rows=stream_parquet_rows):
+        """
+        Args:
+            directory (str): Dataset directory (parts of an earlier run are removed)
+            flush_rows (int): Rows buffered per part file
+        """
+        os.makedirs(directory, exist_ok=True)
+        for path in glob.glob(os.path.join(directory, "part-*.parquet")) + [os.path.join(directory, "_SUCCESS")]:
+            if os.path.exists(path):
+                os.remove(path)
+        self.path = directory
+        self.flush_rows = flush_rows
+        self.pending = []
+        self.pending_rows = 0
+        self.parts = 0
+        self.rows = 0
+
+    def write(self, item_averages):
+        """
+        Args:
+            item_averages (pd.DataFrame): Results from process_and_display_items
+        """
+        if len(item_averages) == 0:
+            return
+        self.pending.append(compact_frame(item_averages))
+        self.pending_rows += len(item_averages)
+        self.rows += len(item_averages)
+        if self.pending_rows >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered rows as the next part file.
+        """
+        if not self.pending:
+            return
+        # Categories differ between chunks, so they are recomputed over the combined rows
+        frame = pd.concat(self.pending, ignore_index=True)
+        for column in ('item_id', 'server', 'location'):
+            frame[column] = frame[column].astype(str).astype('category')
+        table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+        path = os.path.join(self.path, f"part-{self.parts:05d}.parquet")
+        parquet.write_table(table, path + ".tmp", compression='zstd')
+        os.replace(path + ".tmp", path)
+        self.parts += 1
+        self.pending = []
+        self.pending_rows = 0
+
+    def close(self):
+        self.flush()
+        open(os.path.join(self.path, "_SUCCESS"), 'w').close()
+
+
+def open_result_stream(output_format=stream_output_format):
+    """
+    Open the configured result stream.
+
+    Args:
+        output_format (str): "ndjson", "parquet" or None
+
+    Returns:
+        NdjsonResultStream / ParquetResultStream: Open stream (None if disabled);
+        "parquet" falls back to NDJSON when pyarrow is not installed
+    """
+    if not output_format:
+        return None
+    if output_format == "parquet":
+        if pyarrow is not None:
+            return ParquetResultStream()
+        print("⚠️ pyarrow がインストールされていないため、NDJSON形式で出力します", flush=True)
+    elif output_format != "ndjson":
+        raise ValueError(f"Unknown stream output format: {output_format}")
+    return NdjsonResultStream()
@@ -0,0 +1,194 @@
+"""
+Scenario sweep for Albion Cost Calculator
+Computes profit for every item under a grid of return rates, market taxes,
+station fees and material price multipliers, from the local history store
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    crafting_chain_enabled, latest_window_days,
+    sweep_return_rates, sweep_tax_rates, sweep_station_fees, sweep_price_multipliers,
+    sweep_summary_path, sweep_results_path
+)
+from calculator import current_material_prices
+from catalog import select_target_items
+from cost_engine import CostEngine
+from crafting_chain import CraftingChain
+from profit_analyzer import market_targets, open_history_store, process_and_display_items, select_best_venue
+from record_buffer import RecordBuffer
+
+
+def scenario_grid(return_rates, tax_rates, station_fees, price_multipliers):
+    """
+    Build every combination of the parameter grids.
+
+    Args:
+        return_rates (list): Crafting return rates
+        tax_rates (list): Market tax plus setup fee, as a fraction of the sale price
+        station_fees (list): Crafting station fee per item, in silver
+        price_multipliers (list): Factors applied to every material price
+
+    Returns:
+        dict: One array per parameter, all of length (number of scenarios)
+    """
+    grids = np.meshgrid(np.asarray(return_rates, dtype=np.float64), np.asarray(tax_rates, dtype=np.float64),
+                        np.asarray(station_fees, dtype=np.float64), np.asarray(price_multipliers, dtype=np.float64),
+                        indexing='ij')
+    names = ['return_rate', 'tax_rate', 'station_fee', 'price_multiplier']
+    return {name: grid.ravel() for name, grid in zip(names, grids)}
+
+
+def sweep(material_costs, sale_prices, scenarios):
+    """
+    Compute profit for every item × scenario in one broadcasted operation.
+
+    Scaling every material price by a factor scales each material's cheapest
+    cost (bought or refined) by the same factor, so material costs before the
+    return rate are computed once and only multiplied here.
+
+    Args:
+        material_costs (np.ndarray): Material cost per item before the return rate
+        sale_prices (np.ndarray): Sale price per item
+        scenarios (dict): Parameter arrays from scenario_grid
+
+    Returns:
+        tuple: (profit, profit_pct), each an items × scenarios array
+    """
+    costs = (material_costs[:, None]
+             * (scenarios['price_multiplier'] * (1 - scenarios['return_rate']))[None, :]
+             + scenarios['station_fee'][None, :])
+    profit = sale_prices[:, None] * (1 - scenarios['tax_rate'])[None, :] - costs
+    with np.errstate(divide='ignore', invalid='ignore'):
+        profit_pct = np.where(costs > 0, profit / costs * 100, np.nan)
+    return profit, profit_pct
+
+
+def summarize(item_ids, scenarios, profit, profit_pct):
+    """
+    Args:
+        item_ids (list): Item IDs (rows of the result arrays)
+        scenarios (dict): Parameter arrays from scenario_grid
+        profit (np.ndarray): Items × scenarios profit
+        profit_pct (np.ndarray): Items × scenarios profit percentage
+
+    Returns:
+        pd.DataFrame: One row per scenario with its parameters, number of profitable
+                      items, median profit_pct and the best item
+    """
+    summary = pd.DataFrame(scenarios)
+    summary['profitable_items'] = (profit > 0).sum(axis=0)
+    summary['median_profit_pct'] = np.nanmedian(profit_pct, axis=0) if len(item_ids) else np.nan
+    valid = ~np.isnan(profit_pct).all(axis=0)
+    best = np.nanargmax(np.where(np.isnan(profit_pct), -np.inf, profit_pct), axis=0)
+    summary['best_item'] = np.where(valid, np.asarray(item_ids, dtype=object)[best], None)
+    summary['best_profit_pct'] = np.where(valid, profit_pct[best, np.arange(profit_pct.shape[1])], np.nan)
+    return summary
+
+
+def load_market(items, cost_engine):
+    """
+    Read the latest stored prices and pick each item's best venue.
+
+    Args:
+        items (list): Item IDs
+        cost_engine (CostEngine): Costs used for the per-venue profit
+
+    Returns:
+        pd.DataFrame: One row per item with stored market data (see select_best_venue)
+    """
+    store = open_history_store()
+    if not store:
+        return None
+    since = None
+    if latest_window_days:
+        since = (datetime.now() - timedelta(days=latest_window_days)).strftime("%Y-%m-%dT%H:%M:%S")
+    buffer = RecordBuffer()
+    try:
+        for target in market_targets():
+            buffer.extend(store.latest_records(target.base_url, items, target.locations, target.server, since))
+    finally:
+        store.close()
+    if not len(buffer):
+        return None
+
+    cutoff_date = datetime.now() - pd.Timedelta(days=7)
+    market_df = buffer.frame()
+    market_df = market_df[market_df['latest_timestamp'] >= cutoff_date]
+    return select_best_venue(process_and_display_items(None, market_df, cutoff_date, cost_engine))
+
+
+def parse_grid(text):
+    """
+    Parse a grid argument: comma-separated values or start:stop:step (stop included).
+
+    Args:
+        text (str): Grid description (e.g. "0.152,0.248" or "0.8:1.2:0.05")
+
+    Returns:
+        list: Grid values
+    """
+    if ":" in text:
+        start, stop, step = (float(part) for part in text.split(":"))
+        return list(np.arange(start, stop + step / 2, step))
+    return [float(value) for value in text.split(",")]
+
+
+def parse_args(argv=None):
+    def grid(values):
+        return ",".join(str(value) for value in values)
+
+    parser = argparse.ArgumentParser(description="Profit sweep over return rate, tax, fees and material prices")
+    parser.add_argument('--return-rates', default=grid(sweep_return_rates))
+    parser.add_argument('--tax-rates', default=grid(sweep_tax_rates))
+    parser.add_argument('--station-fees', default=grid(sweep_station_fees))
+    parser.add_argument('--price-multipliers', default=grid(sweep_price_multipliers))
+    parser.add_argument('--summary', default=sweep_summary_path, help="Per-scenario summary CSV")
+    parser.add_argument('--results', default=sweep_results_path, help="Full item × scenario arrays (.npz)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    target_items = select_target_items()
+    # Same material prices as the run that produced the ranking, so the baseline scenario reproduces it
+    prices = current_material_prices()
+    cost_engine = CostEngine(target_items, prices=prices,
+                             chain=CraftingChain(prices) if crafting_chain_enabled else None)
+
+    market = load_market(target_items, cost_engine)
+    if market is None or len(market) == 0:
+        print("❌ 保存済みの市場データがありません。先に profit_analyzer.py を実行してください", flush=True)
+        return 1
+
+    # Material cost before the return rate, for the items with market data
+    item_ids = [str(item) for item in market['item_id']]
+    rows = [cost_engine.item_index[item] for item in item_ids]
+    material_costs = cost_engine.item_costs[rows] / (1 - cost_engine.return_rate)
+    sale_prices = market['weighted_avg_price'].to_numpy(dtype=np.float64)
+
+    scenarios = scenario_grid(parse_grid(args.return_rates), parse_grid(args.tax_rates),
+                              parse_grid(args.station_fees), parse_grid(args.price_multipliers))
+    started = time.perf_counter()
+    profit, profit_pct = sweep(material_costs, sale_prices, scenarios)
+    summary = summarize(item_ids, scenarios, profit, profit_pct)
+    elapsed = time.perf_counter() - started
+    print(f"🧮 {len(item_ids)}件 × {len(summary)}シナリオを {elapsed * 1000:.1f}ms で計算しました", flush=True)
+
+    summary.to_csv(args.summary, index=False)
+    np.savez_compressed(args.results, item_ids=np.asarray(item_ids), sale_prices=sale_prices,
+                        material_costs=material_costs, profit=profit.astype(np.float32),
+                        profit_pct=profit_pct.astype(np.float32), **scenarios)
+    print(summary.sort_values('median_profit_pct', ascending=False).head(10).to_string(index=False), flush=True)
+    print(f"\n✅ シナリオ別の集計を {args.summary}、全結果を {args.results} に出力しました", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
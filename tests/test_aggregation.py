@@ -0,0 +1,64 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from calculator import calculate_cost
+from profit_analyzer import build_ranking, process_and_display_items
+
+CUTOFF = datetime(2026, 10, 1)
+
+
+def market_frame(rows):
+    return pd.DataFrame(rows, columns=['item_id', 'quality', 'location', 'server', 'avg_price', 'item_count',
+                                       'latest_timestamp'])
+
+
+MARKET = market_frame([
+    ("T5_OFF_TORCH", 1, "Black Market", "west", 10000, 3, datetime(2026, 10, 5)),
+    ("T5_OFF_TORCH", 2, "Black Market", "west", 20000, 1, datetime(2026, 10, 6)),
+    ("T5_OFF_TORCH", 1, "Caerleon", "west", 12000, 2, datetime(2026, 10, 4)),
+    ("T6_OFF_TORCH", 1, "Black Market", "west", 30000, 0, datetime(2026, 10, 5)),
+    ("T5_OFF_BOOK", 1, "Black Market", "east", 15000, 4, datetime(2026, 10, 3)),
+])
+
+
+def test_weighted_average_per_venue():
+    result = process_and_display_items(None, MARKET, CUTOFF)
+    rows = {(row.item_id, row.location): row for row in result.itertuples()}
+
+    torch = rows[("T5_OFF_TORCH", "Black Market")]
+    assert torch.weighted_avg_price == pytest.approx((10000 * 3 + 20000) / 4)
+    assert torch.total_trade_count == 4
+    assert torch.latest_update == datetime(2026, 10, 6)
+    assert torch.cost == pytest.approx(calculate_cost("T5_OFF_TORCH"))
+    assert torch.profit == pytest.approx(torch.weighted_avg_price - torch.cost)
+    assert torch.profit_pct == pytest.approx(torch.profit / torch.cost * 100)
+    assert (torch.tier, torch.enchant) == ("T5", "")
+    assert rows[("T5_OFF_TORCH", "Caerleon")].weighted_avg_price == 12000
+
+
+def test_items_without_trades_are_dropped():
+    result = process_and_display_items(None, MARKET, CUTOFF)
+    assert "T6_OFF_TORCH" not in set(result['item_id'])
+
+
+def test_chunk_items_restrict_the_frame():
+    result = process_and_display_items(["T5_OFF_BOOK"], MARKET, CUTOFF)
+    assert list(result['item_id']) == ["T5_OFF_BOOK"]
+    assert list(result['server']) == ["east"]
+
+
+def test_by_quality_keeps_one_row_per_quality():
+    result = process_and_display_items(["T5_OFF_TORCH"], MARKET, CUTOFF, by_quality=True)
+    black_market = result[result['location'] == "Black Market"].set_index('quality')
+    assert black_market.loc[1, 'weighted_avg_price'] == 10000
+    assert black_market.loc[2, 'weighted_avg_price'] == 20000
+
+
+def test_ranking_keeps_the_best_venue_per_item():
+    ranking = build_ranking(process_and_display_items(None, MARKET, CUTOFF))
+    assert list(ranking['item_id']).count("T5_OFF_TORCH") == 1
+    torch = ranking[ranking['item_id'] == "T5_OFF_TORCH"].iloc[0]
+    assert torch['location'] == "Black Market"
+    assert list(ranking['profit_pct']) == sorted(ranking['profit_pct'], reverse=True)
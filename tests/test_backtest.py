@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import daily_panel, forward_fill, margin_statistics, rolling_sum
+
+
+def naive_rolling_sum(array, window):
+    return np.array([[row[max(0, t - window + 1):t + 1].sum() for t in range(len(row))] for row in array])
+
+
+@pytest.mark.parametrize('window', [1, 3, 7, 50])
+def test_rolling_sum_matches_a_loop(window):
+    array = np.random.default_rng(window).integers(0, 100, size=(4, 30)).astype(np.float64)
+    np.testing.assert_allclose(rolling_sum(array, window), naive_rolling_sum(array, window))
+
+
+def test_rolling_sum_of_empty_days():
+    np.testing.assert_array_equal(rolling_sum(np.zeros((2, 5)), 3), np.zeros((2, 5)))
+
+
+def test_forward_fill():
+    nan = np.nan
+    array = np.array([
+        [nan, 1.0, nan, nan, 4.0, nan],
+        [2.0, nan, 3.0, nan, nan, nan],
+        [nan, nan, nan, nan, nan, nan],
+    ])
+    expected = np.array([
+        [nan, 1.0, 1.0, 1.0, 4.0, 4.0],
+        [2.0, 2.0, 3.0, 3.0, 3.0, 3.0],
+        [nan, nan, nan, nan, nan, nan],
+    ])
+    filled = forward_fill(array)
+    np.testing.assert_array_equal(filled, expected)
+    # The input is left untouched
+    assert np.isnan(array[0, 2])
+
+
+def test_daily_panel_combines_qualities_and_drops_outside_days():
+    history = pd.DataFrame({
+        'server': ["west"] * 4,
+        'item_id': ["T5_A", "T5_A", "T5_A", "T5_B"],
+        'quality': [1, 2, 1, 1],
+        'location': ["Black Market"] * 4,
+        'day': pd.to_datetime(["2026-10-01", "2026-10-01", "2026-09-01", "2026-10-03"]),
+        'avg_price': [100.0, 200.0, 999.0, 50.0],
+        'item_count': [1, 3, 5, 2],
+    })
+    days = np.arange(np.datetime64("2026-10-01"), np.datetime64("2026-10-04"))
+    series, value, count = daily_panel(history, ['server', 'item_id', 'location'], days)
+
+    assert list(series['item_id']) == ["T5_A", "T5_B"]
+    np.testing.assert_array_equal(count, [[4, 0, 0], [0, 0, 2]])
+    np.testing.assert_array_equal(value, [[700, 0, 0], [0, 0, 100]])
+
+
+def test_margin_statistics():
+    count = np.array([[1.0, 0.0, 1.0, 1.0]])
+    value = count * np.array([[120.0, 0.0, 150.0, 90.0]])
+    costs = np.full((1, 4), 100.0)
+    stats = margin_statistics(value, count, costs, window=1, threshold_pct=10)
+
+    # Day 2 had no trades inside its window
+    assert stats['days'][0] == 3
+    assert stats['mean_margin_pct'][0] == pytest.approx((20 + 50 - 10) / 3)
+    assert stats['min_margin_pct'][0] == pytest.approx(-10)
+    assert stats['last_margin_pct'][0] == pytest.approx(-10)
+    assert stats['hit_rate'][0] == pytest.approx(2 / 3)
+    assert stats['daily_volume'][0] == pytest.approx(3 / 4)
+
+
+def test_margin_statistics_without_trades():
+    stats = margin_statistics(np.zeros((1, 3)), np.zeros((1, 3)), np.full((1, 3), 100.0), window=2)
+    assert stats['days'][0] == 0
+    assert np.isnan(stats['mean_margin_pct'][0])
+    assert np.isnan(stats['hit_rate'][0])
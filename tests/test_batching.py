@@ -0,0 +1,158 @@
+import asyncio
+from urllib.parse import urlencode
+
+import pytest
+
+import profit_analyzer
+from profit_analyzer import (
+    DEFAULT_TARGET, HistoryResponse, RequestThrottled, build_item_batches, fetch_items_history_batch,
+    history_params, request_json, split_history_by_item
+)
+from rate_limiter import RequestScheduler
+
+ITEMS = [f"T{tier}_OFF_TORCH{enchant}" for tier in (5, 6, 7) for enchant in ("", "@1", "@2")]
+POINT = {'timestamp': "2026-10-01T00:00:00", 'avg_price': 1000, 'item_count': 3}
+
+
+def url_length(batch):
+    params = urlencode(history_params(6, None, DEFAULT_TARGET))
+    return len(f"{DEFAULT_TARGET.base_url}/api/v2/stats/history/{','.join(batch)}?{params}")
+
+
+def test_build_item_batches_keeps_every_item_in_order():
+    batches = build_item_batches(ITEMS, max_length=url_length(ITEMS[:3]))
+    assert [item for batch in batches for item in batch] == ITEMS
+    assert len(batches) > 1
+
+
+def test_build_item_batches_respects_the_url_budget():
+    limit = url_length(ITEMS[:4])
+    for batch in build_item_batches(ITEMS, max_length=limit):
+        assert url_length(batch) <= limit
+
+
+def test_build_item_batches_fits_everything_in_one_request():
+    assert build_item_batches(ITEMS) == [ITEMS]
+
+
+def test_build_item_batches_gives_oversized_items_their_own_request():
+    assert build_item_batches(ITEMS[:3], max_length=1) == [[item] for item in ITEMS[:3]]
+
+
+def test_split_history_by_item():
+    data = [
+        {'item_id': ITEMS[0], 'quality': 1, 'data': []},
+        {'item_id': ITEMS[1], 'quality': 1, 'data': []},
+        {'item_id': ITEMS[0], 'quality': 2, 'data': []},
+        {'item_id': "T4_UNREQUESTED", 'quality': 1, 'data': []},
+    ]
+    by_item = split_history_by_item(ITEMS[:3], data)
+    assert [record['quality'] for record in by_item[ITEMS[0]]] == [1, 2]
+    assert len(by_item[ITEMS[1]]) == 1
+    assert by_item[ITEMS[2]] == []
+    assert "T4_UNREQUESTED" not in by_item
+
+
+def test_failed_batch_is_split_down_to_the_bad_item(monkeypatch):
+    bad = ITEMS[5]
+    requests = []
+
+    async def fake_request_history(session, item_path, scheduler, time_scale=6, max_retries=0, headers=None,
+                                   start_date=None, target=DEFAULT_TARGET, max_errors=None, reduce=None):
+        requests.append(item_path)
+        if bad in item_path.split(","):
+            return None
+        data = [{'item_id': item, 'quality': 1, 'data': [POINT]} for item in item_path.split(",")]
+        return HistoryResponse(reduce(data), None, None, False)
+
+    monkeypatch.setattr(profit_analyzer, 'request_history', fake_request_history)
+    result = asyncio.run(fetch_items_history_batch(None, ITEMS, None))
+
+    assert set(result) == set(ITEMS)
+    assert result[bad] is None
+    for item in ITEMS:
+        if item != bad:
+            assert [record['item_id'] for record in result[item].latest] == [item]
+    # Only the halves containing the bad item are split again
+    assert requests[0] == ",".join(ITEMS)
+    assert requests.count(bad) == 1
+    assert len(requests) <= 2 * len(ITEMS).bit_length() + 1
+
+
+def test_throttled_batch_is_not_split(monkeypatch):
+    requests = []
+
+    async def fake_request_history(session, item_path, scheduler, time_scale=6, max_retries=0, headers=None,
+                                   start_date=None, target=DEFAULT_TARGET, max_errors=None, reduce=None):
+        requests.append(item_path)
+        raise RequestThrottled(item_path)
+
+    monkeypatch.setattr(profit_analyzer, 'request_history', fake_request_history)
+    result = asyncio.run(fetch_items_history_batch(None, ITEMS, None))
+
+    assert result == {item: None for item in ITEMS}
+    assert requests == [",".join(ITEMS)]
+
+
+class FakeResponse:
+    def __init__(self, status, body=b"[]"):
+        self.status = status
+        self.body = body
+        self.headers = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def read(self):
+        return self.body
+
+
+class FakeSession:
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.requests = 0
+
+    def get(self, url, **kwargs):
+        self.requests += 1
+        status = self.statuses.pop(0)
+        if status == 'garbage':
+            return FakeResponse(200, b"not json")
+        return FakeResponse(status)
+
+
+@pytest.fixture
+def no_waits(monkeypatch):
+    for name in ('throttle_wait_base', 'throttle_wait_max', 'normal_wait_min', 'normal_wait_max'):
+        monkeypatch.setattr(profit_analyzer, name, 0)
+
+
+def fetch(session, **kwargs):
+    scheduler = RequestScheduler(rate=1000, burst=100, max_in_flight=4)
+    return asyncio.run(request_json(session, "http://mock/api", {}, scheduler, "test", **kwargs))
+
+
+def test_throttling_keeps_retrying_past_the_error_budget(no_waits):
+    session = FakeSession([429, 429, 429, 429, 200])
+    assert fetch(session, max_retries=5, max_errors=1).data == []
+    assert session.requests == 5
+
+
+def test_errors_give_up_after_the_error_budget(no_waits):
+    session = FakeSession([500, 429, 'garbage', 200])
+    assert fetch(session, max_retries=5, max_errors=1) is None
+    assert session.requests == 3
+
+
+def test_throttled_out_is_reported(no_waits):
+    session = FakeSession([429, 500, 429])
+    with pytest.raises(RequestThrottled):
+        fetch(session, max_retries=2, max_errors=1)
+
+
+def test_without_an_error_budget_every_failure_counts(no_waits):
+    session = FakeSession([500, 429, 500])
+    assert fetch(session, max_retries=2) is None
+    assert session.requests == 3
@@ -0,0 +1,51 @@
+import pytest
+
+from calculator import calculate_cost, get_recipe_for_item, material_api_id
+
+
+@pytest.mark.parametrize('material_id, api_id', [
+    ("T4_PLANK", "T4_PLANKS"),
+    ("T5_PLANK@1", "T5_PLANKS_LEVEL1@1"),
+    ("T6_BAR", "T6_METALBAR"),
+    ("T7_BAR@2", "T7_METALBAR_LEVEL2@2"),
+    ("T5_LEATHER@1", "T5_LEATHER_LEVEL1@1"),
+    ("T6_CLOTH", "T6_CLOTH"),
+    ("T8_CLOTH@4", "T8_CLOTH_LEVEL4@4"),
+    ("T4_WOOD", "T4_WOOD"),
+    ("T5_WOOD@1", "T5_WOOD_LEVEL1@1"),
+    ("T6_ORE@2", "T6_ORE_LEVEL2@2"),
+    ("T7_HIDE", "T7_HIDE"),
+    ("T5_FIBER@3", "T5_FIBER_LEVEL3@3"),
+])
+def test_material_api_id(material_id, api_id):
+    assert material_api_id(material_id) == api_id
+
+
+def test_every_recipe_material_has_a_market_name():
+    recipe = get_recipe_for_item("T5_OFF_SHIELD@1")
+    assert sorted(material_api_id(material) for material in recipe) == ["T5_METALBAR_LEVEL1@1",
+                                                                       "T5_PLANKS_LEVEL1@1"]
+
+
+def test_calculate_cost_needs_every_material_price():
+    assert calculate_cost("T5_OFF_TORCH") > 0
+    assert calculate_cost("T5_UNKNOWN") is None
+
+
+def test_current_material_prices_prefer_the_cached_live_prices(tmp_path, monkeypatch):
+    import calculator
+    from config import SERVERS, TARGET_SERVERS, material_price_city, material_prices
+    from response_cache import MATERIAL_PRICES_KEY, ResponseCache
+
+    path = str(tmp_path / "responses.sqlite3")
+    monkeypatch.setattr(calculator, 'response_cache_path', path)
+    assert calculator.current_material_prices()["T5_PLANK"] == material_prices["T5_PLANK"]
+
+    # Entries past their TTL still hold the prices of the latest run
+    cache = ResponseCache(path, 0, 1 << 20)
+    cache.put(SERVERS[TARGET_SERVERS[0]], MATERIAL_PRICES_KEY, material_price_city, 0,
+              {'materials': ["T5_PLANK", "T5_ORE"], 'prices': {"T5_PLANK": 1.5, "T5_ORE": 2.5}})
+    cache.close()
+    prices = calculator.current_material_prices()
+    assert (prices["T5_PLANK"], prices["T5_ORE"]) == (1.5, 2.5)
+    assert prices["T5_CLOTH"] == material_prices["T5_CLOTH"]
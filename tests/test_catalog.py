@@ -0,0 +1,86 @@
+import os
+
+import pytest
+
+import catalog
+from catalog import Catalog, build_entries, load_catalog
+
+RECIPES = {
+    "HEAD_PLATE_SET1": {"BAR": 8},
+    "MAIN_SWORD": {"BAR": 16, "LEATHER": 8},
+    "OFF_SHIELD": {"PLANK": 4, "BAR": 4},
+    "CAPE": {"CLOTH": 4, "LEATHER": 4},
+}
+
+
+@pytest.fixture
+def recipes(monkeypatch, tmp_path):
+    monkeypatch.setattr(catalog, 'base_recipes', dict(RECIPES))
+    monkeypatch.setattr(catalog, 'CACHE_DIR', str(tmp_path / "catalog"))
+    monkeypatch.setattr(catalog, '_catalog', None)
+    return catalog.base_recipes
+
+
+@pytest.fixture
+def items(recipes):
+    return Catalog(build_entries(["T4", "T5", "T6"], ["", "@1"]))
+
+
+def test_entries_carry_the_parsed_fields(items):
+    entry = items.get("T5_MAIN_SWORD@1")
+    assert entry.base_item == "MAIN_SWORD"
+    assert (entry.tier, entry.enchant, entry.slot, entry.category) == (5, 1, "MAIN", "SWORD")
+    assert entry.recipe == {"T5_BAR@1": 16, "T5_LEATHER@1": 8}
+    assert items.get("T8_MAIN_SWORD") is None
+
+
+def test_filter_combines_every_condition(items):
+    plate = items.item_ids(categories=["PLATE"], min_tier=5, enchants=[1])
+    assert plate == ["T5_HEAD_PLATE_SET1@1", "T6_HEAD_PLATE_SET1@1"]
+    assert items.item_ids(names=["CAPE"], tiers=["T4", 6], enchants=[""]) == ["T4_CAPE", "T6_CAPE"]
+    assert items.item_ids(slots=["OFF"], max_tier=4) == ["T4_OFF_SHIELD", "T4_OFF_SHIELD@1"]
+
+
+def test_filter_by_materials_needs_all_of_them(items):
+    assert {entry.base_item for entry in items.filter(materials=["LEATHER"])} == {"MAIN_SWORD", "CAPE"}
+    assert {entry.base_item for entry in items.filter(materials=["LEATHER", "BAR"])} == {"MAIN_SWORD"}
+    assert items.filter(materials=["FIBER"]) == []
+
+
+def test_load_catalog_reuses_the_cache_file(recipes, monkeypatch):
+    built = load_catalog()
+    (cache_file,) = os.listdir(catalog.CACHE_DIR)
+    assert cache_file == f"catalog-{catalog.config_hash()}.json"
+
+    def fail():
+        raise AssertionError("the catalog was rebuilt")
+
+    monkeypatch.setattr(catalog, '_catalog', None)
+    monkeypatch.setattr(catalog, 'build_entries', fail)
+    assert load_catalog().entries == built.entries
+
+
+def test_load_catalog_rebuilds_when_the_recipes_change(recipes, monkeypatch):
+    first = load_catalog()
+    recipes["BAG"] = {"LEATHER": 8}
+
+    monkeypatch.setattr(catalog, '_catalog', None)
+    second = load_catalog()
+
+    assert len(os.listdir(catalog.CACHE_DIR)) == 2
+    assert first.get("T5_BAG") is None
+    assert second.get("T5_BAG").recipe == {"T5_LEATHER": 8}
+
+
+def test_load_catalog_rebuilds_a_corrupt_cache_file(recipes, monkeypatch):
+    load_catalog()
+    path = os.path.join(catalog.CACHE_DIR, f"catalog-{catalog.config_hash()}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("{not json")
+
+    monkeypatch.setattr(catalog, '_catalog', None)
+    assert load_catalog().get("T5_CAPE") is not None
+    # The rebuilt index replaced the corrupt file
+    monkeypatch.setattr(catalog, '_catalog', None)
+    monkeypatch.setattr(catalog, 'build_entries', None)
+    assert load_catalog().get("T5_CAPE") is not None
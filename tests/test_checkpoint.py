@@ -0,0 +1,58 @@
+from checkpoint import CheckpointJournal
+
+
+def record(item_id, quality=1):
+    return {'item_id': item_id, 'quality': quality, 'avg_price': 1000, 'item_count': 3,
+            'latest_timestamp': "2026-10-05T00:00:00", 'location': "Black Market", 'server': "west"}
+
+
+def test_completed_items_round_trip(tmp_path):
+    journal = CheckpointJournal(str(tmp_path / "run" / "checkpoint.ndjson"))
+    journal.open()
+    journal.record("west", ["T5_A", "T5_B"], [record("T5_A", 1), record("T5_A", 2)])
+    journal.record("east", ["T5_A"], [record("T5_A")])
+    journal.close()
+
+    completed = journal.load()
+    assert [r['quality'] for r in completed['west']['T5_A']] == [1, 2]
+    # Items the API had no data for are complete too
+    assert completed['west']['T5_B'] == []
+    assert list(completed['east']) == ["T5_A"]
+
+
+def test_truncated_last_line_is_ignored(tmp_path):
+    path = tmp_path / "checkpoint.ndjson"
+    journal = CheckpointJournal(str(path))
+    journal.open()
+    journal.record("west", ["T5_A"], [record("T5_A")])
+    journal.close()
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"server": "west", "item_id": "T5_B", "rec')
+
+    assert list(journal.load()['west']) == ["T5_A"]
+
+
+def test_resume_appends_and_a_fresh_run_truncates(tmp_path):
+    journal = CheckpointJournal(str(tmp_path / "checkpoint.ndjson"))
+    journal.open()
+    journal.record("west", ["T5_A"], [])
+    journal.close()
+
+    journal.open(resume=True)
+    journal.record("west", ["T5_B"], [])
+    journal.close()
+    assert set(journal.load()['west']) == {"T5_A", "T5_B"}
+
+    journal.open()
+    journal.close()
+    assert journal.load() == {}
+
+
+def test_finished_run_deletes_the_journal(tmp_path):
+    path = tmp_path / "checkpoint.ndjson"
+    journal = CheckpointJournal(str(path))
+    journal.open()
+    journal.record("west", ["T5_A"], [])
+    journal.close(finished=True)
+    assert not path.exists()
+    assert journal.load() == {}
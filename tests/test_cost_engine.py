@@ -0,0 +1,45 @@
+import pytest
+
+from calculator import calculate_cost, generate_all_items
+from config import material_prices
+from cost_engine import CostEngine
+from item_lists import ALL_ITEM_NAMES
+
+# Default tiers and enchantments plus ones without material prices, and an item without a recipe
+ITEMS = generate_all_items(ALL_ITEM_NAMES, ["T4", "T5", "T6", "T7", "T8"], ["", "@1", "@2", "@3"]) + ["T5_UNKNOWN"]
+
+
+def test_costs_match_calculate_cost():
+    engine = CostEngine(ITEMS)
+    costs = engine.costs()
+    for item in ITEMS:
+        expected = calculate_cost(item)
+        if expected is None:
+            assert costs[item] is None, item
+        else:
+            assert costs[item] == pytest.approx(expected), item
+    assert any(cost is None for cost in costs.values())
+    assert engine.cost("T9_NOT_IN_ENGINE") is None
+
+
+def test_update_prices_recomputes_only_affected_items():
+    engine = CostEngine(ITEMS)
+    material = "T5_PLANK@1"
+    changed = engine.update_prices({material: material_prices[material] * 2})
+
+    assert changed
+    assert all(material in _recipe(engine, item) for item in changed)
+    fresh = CostEngine(ITEMS, prices={**material_prices, material: material_prices[material] * 2})
+    assert engine.costs() == pytest.approx(fresh.costs(), nan_ok=True)
+    assert engine.update_prices({material: material_prices[material] * 2}) == []
+
+
+def test_return_rate_is_applied_once():
+    engine = CostEngine(["T5_OFF_TORCH"], rate=0.0)
+    discounted = CostEngine(["T5_OFF_TORCH"], rate=0.5)
+    assert discounted.cost("T5_OFF_TORCH") == pytest.approx(engine.cost("T5_OFF_TORCH") * 0.5)
+
+
+def _recipe(engine, item):
+    row = engine.item_index[item]
+    return {engine.material_ids[col] for col in engine.cols[engine.rows == row]}
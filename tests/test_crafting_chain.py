@@ -0,0 +1,75 @@
+import math
+
+import pytest
+
+from crafting_chain import CraftingChain, refining_recipe
+
+PRICES = {
+    "T2_ORE": 10, "T2_BAR": 100,
+    "T3_ORE": 20, "T3_BAR": 1000,
+    "T4_ORE": 30, "T4_BAR": 60,
+    "T4_WOOD": 5, "T4_PLANK": 50, "T3_PLANK": 40,
+}
+
+
+def test_refining_recipe():
+    assert refining_recipe("T6_BAR@1") == {"T6_ORE@1": 4, "T5_BAR": 1}
+    assert refining_recipe("T2_BAR") == {"T2_ORE": 1}
+    assert refining_recipe("T6_ORE") is None
+    assert refining_recipe("T5_OFF_TORCH") is None
+
+
+def test_each_node_takes_the_cheaper_of_buying_and_refining():
+    chain = CraftingChain(PRICES, rate=0.0)
+    assert (chain.cost("T2_BAR"), chain.method("T2_BAR")) == (10, "refine")
+    assert (chain.cost("T3_BAR"), chain.method("T3_BAR")) == (2 * 20 + 10, "refine")
+    assert (chain.cost("T4_BAR"), chain.method("T4_BAR")) == (60, "buy")
+
+
+def test_refining_return_rate_discounts_the_inputs():
+    chain = CraftingChain(PRICES, rate=0.5)
+    assert chain.cost("T2_BAR") == pytest.approx(5)
+    assert chain.cost("T3_BAR") == pytest.approx((2 * 20 + 5) * 0.5)
+
+
+def test_unpriced_node_has_no_cost():
+    chain = CraftingChain({}, rate=0.0)
+    assert math.isnan(chain.cost("T4_CLOTH"))
+    assert chain.method("T4_CLOTH") is None
+
+
+def test_price_change_invalidates_only_downstream_nodes():
+    chain = CraftingChain(PRICES, rate=0.0)
+    chain.costs(["T4_BAR", "T4_PLANK"])
+    plank = chain.memo["T4_PLANK"]
+
+    changed = chain.update_prices({"T2_ORE": 1000})
+    assert changed == {"T2_ORE", "T2_BAR", "T3_BAR"}
+    assert chain.memo.get("T4_PLANK") is plank
+    assert chain.cost("T3_BAR") == 2 * 20 + 100
+    assert chain.cost("T4_BAR") == 60
+
+    fresh = CraftingChain({**PRICES, "T2_ORE": 1000}, rate=0.0)
+    for node in ("T2_BAR", "T3_BAR", "T4_BAR", "T4_PLANK"):
+        assert chain.cost(node) == fresh.cost(node)
+
+
+def test_unchanged_price_changes_nothing():
+    chain = CraftingChain(PRICES, rate=0.0)
+    chain.cost("T4_BAR")
+    assert chain.update_prices({"T2_ORE": 10}) == set()
+
+
+def test_set_prices_drops_unlisted_prices():
+    chain = CraftingChain(PRICES, rate=0.0)
+    chain.cost("T4_BAR")
+    prices = dict(PRICES)
+    del prices["T4_BAR"]
+    assert "T4_BAR" in chain.set_prices(prices)
+    assert chain.method("T4_BAR") == "refine"
+
+
+def test_upstream_lists_the_whole_refining_chain():
+    assert set(CraftingChain(PRICES).upstream(["T4_BAR"])) == {
+        "T4_BAR", "T4_ORE", "T3_BAR", "T3_ORE", "T2_BAR", "T2_ORE"
+    }
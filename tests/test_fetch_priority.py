@@ -0,0 +1,106 @@
+import random
+
+import pandas as pd
+
+from fetch_priority import FetchPriority, ItemPrior, UnitQueue, load_priors
+
+NOW = pd.Timestamp("2026-10-17").to_pydatetime()
+
+
+def prior(profit_pct, trade_count=100):
+    return ItemPrior(profit_pct, trade_count, "2026-10-16")
+
+
+def results(**profits):
+    return pd.DataFrame({'item_id': list(profits), 'profit_pct': list(profits.values())})
+
+
+def drain(queue):
+    order = []
+    while queue:
+        order.append(queue.pop()[0][0])
+    return order
+
+
+def test_load_priors(tmp_path):
+    path = tmp_path / "ranking.csv"
+    path.write_text("item_id,profit_pct,trade_count,latest_update\n"
+                    "T5_OFF_TORCH,12.5,30,2026-10-16\n"
+                    "T6_OFF_TORCH,,30,2026-10-16\n", encoding="utf-8")
+    assert load_priors(str(path)) == {'T5_OFF_TORCH': ItemPrior(12.5, 30.0, "2026-10-16")}
+    assert load_priors(str(tmp_path / "missing.csv")) == {}
+
+
+def test_items_are_ordered_by_expected_value():
+    priors = {"T5_OFF_TORCH": prior(10), "T5_OFF_BOOK": prior(50), "T5_OFF_SHIELD": prior(50, trade_count=1)}
+    priority = FetchPriority(list(priors), priors, ["west"], now=NOW)
+    assert priority.order(list(priors)) == ["T5_OFF_BOOK", "T5_OFF_TORCH", "T5_OFF_SHIELD"]
+
+
+def test_sibling_results_shift_the_estimates():
+    items = ["T5_OFF_BOOK", "T6_OFF_BOOK"]
+    priority = FetchPriority(items, {"T5_OFF_BOOK": prior(50), "T6_OFF_BOOK": prior(40)}, ["west"], now=NOW)
+    priority.observe(results(T5_OFF_BOOK=20.0))
+    assert priority.estimate("T6_OFF_BOOK") == 10.0
+
+
+def test_without_priors_costlier_items_come_first_and_nothing_is_ready():
+    items = ["T5_OFF_TORCH", "T6_OFF_TORCH", "T7_OFF_TORCH"]
+    priority = FetchPriority(items, {}, ["west"], top_n=2, now=NOW,
+                             costs={"T5_OFF_TORCH": 100.0, "T6_OFF_TORCH": 300.0, "T7_OFF_TORCH": None})
+    assert not priority.informed()
+    assert drain(UnitQueue([([item], None) for item in items], priority)) == [
+        "T6_OFF_TORCH", "T5_OFF_TORCH", "T7_OFF_TORCH"
+    ]
+    priority.complete("west", items)
+    assert not priority.ready.is_set()
+
+
+def test_ready_once_the_top_items_are_fresh_on_every_server():
+    priors = {"T5_OFF_BOOK": prior(50), "T5_OFF_TORCH": prior(30), "T5_OFF_SHIELD": prior(10)}
+    priority = FetchPriority(list(priors), priors, ["west", "east"], top_n=2, now=NOW)
+    priority.observe(results(T5_OFF_BOOK=50.0, T5_OFF_TORCH=30.0))
+    priority.complete("west", ["T5_OFF_BOOK", "T5_OFF_TORCH"])
+    assert not priority.ready.is_set()
+    priority.complete("east", ["T5_OFF_BOOK", "T5_OFF_TORCH"])
+    assert priority.ready.is_set()
+    assert priority.ready_items == ["T5_OFF_BOOK", "T5_OFF_TORCH"]
+
+
+def test_unit_queue_rescores_units_after_results():
+    priors = {"T5_OFF_BOOK": prior(50), "T6_OFF_BOOK": prior(40), "T7_OFF_BOOK": prior(45),
+              "T5_OFF_TORCH": prior(30)}
+    priority = FetchPriority(list(priors), priors, ["west"], now=NOW)
+    queue = UnitQueue([(["T5_OFF_BOOK"], None), (["T6_OFF_BOOK"], "2026-10-10"), (["T5_OFF_TORCH"], None)],
+                      priority)
+
+    assert queue.pop() == (["T5_OFF_BOOK"], None)
+    # A sibling fell far below its earlier result, so the other book drops behind the torch
+    priority.observe(results(T7_OFF_BOOK=-100.0))
+    assert queue.pop() == (["T5_OFF_TORCH"], None)
+    assert queue.pop() == (["T6_OFF_BOOK"], "2026-10-10")
+    assert len(queue) == 0
+
+
+def test_unit_queue_matches_a_full_rescan():
+    rng = random.Random(7)
+    names = ["OFF_BOOK", "OFF_TORCH", "OFF_SHIELD"]
+    items = [f"T{tier}_{name}{enchant}" for name in names for tier in (5, 6, 7) for enchant in ("", "@1", "@2")]
+    priors = {item: prior(rng.uniform(-20, 80), rng.randint(1, 500)) for item in items[::2]}
+    units = [(items[i:i + 2], None) for i in range(0, len(items), 2)]
+
+    priority = FetchPriority(items, priors, ["west"], now=NOW)
+    queue = UnitQueue(units, priority)
+    pending = list(units)
+    while queue:
+        expected = max(pending, key=lambda unit: (priority.unit_score(unit[0]), -units.index(unit)))
+        unit = queue.pop()
+        assert unit == expected
+        pending.remove(unit)
+        priority.observe(results(**{item: rng.uniform(-50, 150) for item in unit[0]}))
+        priority.complete("west", unit[0])
+
+
+def test_unit_queue_without_priority_keeps_the_order():
+    units = [(["T5_A"], None), (["T5_B"], None), (["T5_C"], None)]
+    assert drain(UnitQueue(units)) == ["T5_A", "T5_B", "T5_C"]
@@ -0,0 +1,92 @@
+import asyncio
+import json
+import zlib
+from functools import partial
+
+from history_parser import HistoryReduction, PayloadParser, latest_point, window_summary
+
+SERVER = "west"
+LOCATION = "Black Market"
+
+
+def points(*days, price=1000, count=10):
+    return [{'timestamp': f"2026-10-{day:02d}T00:00:00", 'avg_price': price, 'item_count': count} for day in days]
+
+
+def body(*records):
+    return json.dumps(list(records)).encode('utf-8')
+
+
+def test_latest_point_takes_the_greatest_timestamp_in_any_order():
+    series = points(2, price=2000) + points(5, price=5000) + points(3, price=3000)
+    assert latest_point(series)['avg_price'] == 5000
+    assert latest_point([]) is None
+
+
+def test_latest_point_keeps_the_first_of_equal_timestamps():
+    series = points(4, price=1000) + points(4, price=2000)
+    assert latest_point(series)['avg_price'] == 1000
+
+
+def test_window_summary_weights_prices_by_trade_count():
+    series = points(1, price=9000, count=50) + points(3, price=1000, count=1) + points(2, price=4000, count=3)
+    summary = window_summary(series, "2026-10-02T00:00:00")
+    assert summary == {'timestamp': "2026-10-03T00:00:00", 'avg_price': (4000 * 3 + 1000) / 4, 'item_count': 4}
+
+
+def test_window_summary_without_trades_is_the_plain_mean():
+    series = points(2, price=1000, count=0) + points(3, price=2000, count=0)
+    assert window_summary(series, "2026-10-01T00:00:00")['avg_price'] == 1500
+
+
+def test_window_summary_of_an_empty_window_is_none():
+    assert window_summary(points(1, 2), "2026-10-03T00:00:00") is None
+
+
+def test_worker_returns_only_the_reduced_history():
+    data = [
+        {'item_id': "T5_A", 'location': "Caerleon", 'quality': 1, 'data': points(1, 3, 2)},
+        {'item_id': "T5_A", 'quality': 2, 'data': points(1, price=5000)},
+        {'item_id': "T4_UNREQUESTED", 'quality': 1, 'data': points(1)},
+    ]
+    parser = PayloadParser(workers=1, offload_bytes=0)
+    try:
+        reduced = asyncio.run(parser.parse(body(*data), partial(HistoryReduction(SERVER, LOCATION, None, False),
+                                                                ["T5_A", "T5_B"], encode=True)))
+    finally:
+        parser.close()
+
+    assert set(reduced) == {"T5_A", "T5_B"}
+    latest, rows, blob = reduced["T5_A"]
+    assert [(record['quality'], record['location'], record['latest_timestamp']) for record in latest] == [
+        (1, "Caerleon", "2026-10-03T00:00:00"),
+        (2, LOCATION, "2026-10-01T00:00:00"),
+    ]
+    assert rows is None
+    assert json.loads(zlib.decompress(blob)) == data[:2]
+    assert reduced["T5_B"].latest == []
+
+
+def test_store_reduction_keeps_rows_instead_of_latest_records():
+    data = [{'item_id': "T5_A", 'quality': 1, 'data': points(1, 2) + [{'avg_price': 1}]}]
+    parser = PayloadParser(workers=0, offload_bytes=0)
+    reduced = asyncio.run(parser.parse(body(*data), partial(HistoryReduction(SERVER, LOCATION, None, True),
+                                                            ["T5_A"])))
+
+    assert reduced["T5_A"].latest is None
+    assert reduced["T5_A"].blob is None
+    assert reduced["T5_A"].rows == [
+        (1, LOCATION, "2026-10-01T00:00:00", 1000, 10),
+        (1, LOCATION, "2026-10-02T00:00:00", 1000, 10),
+    ]
+
+
+def test_window_reduction_combines_the_recent_points():
+    series = points(1, 2, price=1000, count=1) + points(3, price=4000, count=3)
+    data = [{'item_id': "T5_A", 'quality': 1, 'data': series}]
+    reduction = HistoryReduction(SERVER, LOCATION, "2026-10-02T00:00:00", False)
+    (record,) = reduction.item("T5_A", data).latest
+
+    assert record['latest_timestamp'] == "2026-10-03T00:00:00"
+    assert record['avg_price'] == (1000 * 1 + 4000 * 3) / 4
+    assert record['item_count'] == 4
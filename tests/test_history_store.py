@@ -0,0 +1,78 @@
+import pytest
+
+from history_store import HistoryStore
+
+SERVER = "https://west.albion-online-data.com"
+LOCATIONS = ["Black Market", "Caerleon"]
+
+
+def points(*days, price=1000, count=10):
+    return [{'timestamp': f"2026-10-{day:02d}T00:00:00", 'avg_price': price, 'item_count': count} for day in days]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"))
+    yield store
+    store.close()
+
+
+def test_watermark_is_the_oldest_location_newest_point(store):
+    # T5_B has no rows in Black Market, so it has no watermark and is fetched in full
+    store.ingest(SERVER, "T5_A", [
+        {'location': "Black Market", 'quality': 1, 'data': points(1, 2, 5)},
+        {'location': "Caerleon", 'quality': 1, 'data': points(1, 3)},
+    ], "Black Market")
+    store.ingest(SERVER, "T5_B", [{'quality': 1, 'data': points(4)}], "Caerleon")
+
+    assert store.last_timestamps(SERVER, ["T5_A", "T5_B", "T5_C"], LOCATIONS) == {
+        'T5_A': "2026-10-03T00:00:00",
+    }
+    assert store.last_timestamps(SERVER, ["T5_B"], ["Caerleon"]) == {'T5_B': "2026-10-04T00:00:00"}
+    assert store.last_timestamps(SERVER, ["T5_A"], ["Black Market"]) == {'T5_A': "2026-10-05T00:00:00"}
+    assert store.last_timestamps("https://east.albion-online-data.com", ["T5_A"], LOCATIONS) == {}
+
+
+def test_delta_ingest_replaces_overlapping_points(store):
+    record = {'location': "Black Market", 'quality': 1}
+    assert store.ingest(SERVER, "T5_A", [dict(record, data=points(1, 2, 3))], "Black Market") == 3
+    store.ingest(SERVER, "T5_A", [dict(record, data=points(3, 4, price=2000))], "Black Market")
+
+    rows = store.history(SERVER, ["T5_A"], ["Black Market"])
+    assert len(rows) == 4
+    assert {row[3]: row[4] for row in rows}["2026-10-03T00:00:00"] == 2000
+    assert store.last_timestamps(SERVER, ["T5_A"], ["Black Market"]) == {'T5_A': "2026-10-04T00:00:00"}
+
+
+def test_latest_records_take_the_newest_point(store):
+    store.ingest(SERVER, "T5_A", [
+        {'location': "Black Market", 'quality': 1, 'data': points(1, price=1000) + points(2, price=3000, count=5)},
+        {'location': "Black Market", 'quality': 2, 'data': points(1, price=5000)},
+    ], "Black Market")
+
+    records = store.latest_records(SERVER, ["T5_A"], LOCATIONS, server_name="west")
+    by_quality = {record['quality']: record for record in records}
+    assert by_quality[1]['avg_price'] == 3000
+    assert by_quality[1]['item_count'] == 5
+    assert by_quality[1]['latest_timestamp'] == "2026-10-02T00:00:00"
+    assert by_quality[2]['server'] == "west"
+
+
+def test_latest_records_combine_the_window_since(store):
+    store.ingest(SERVER, "T5_A", [
+        {'location': "Black Market", 'quality': 1,
+         'data': points(1, price=9000) + points(2, price=1000, count=10) + points(3, price=4000, count=30)},
+    ], "Black Market")
+
+    [record] = store.latest_records(SERVER, ["T5_A"], LOCATIONS, since="2026-10-02T00:00:00")
+    assert record['avg_price'] == pytest.approx((1000 * 10 + 4000 * 30) / 40)
+    assert record['item_count'] == 40
+    assert record['latest_timestamp'] == "2026-10-03T00:00:00"
+
+
+def test_lookups_are_chunked_below_the_parameter_limit(store):
+    items = [f"T5_ITEM{i}" for i in range(1200)]
+    for item in items[::100]:
+        store.ingest(SERVER, item, [{'location': location, 'quality': 1, 'data': points(1)} for location in LOCATIONS],
+                     "Black Market")
+    assert len(store.last_timestamps(SERVER, items, LOCATIONS)) == 12
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from config import return_rate
+from cost_engine import CostEngine
+from portfolio import PortfolioProblem, optimize_portfolio
+
+
+def ranking(rows):
+    return pd.DataFrame(rows, columns=['item_id', 'server', 'location', 'cost', 'avg_price', 'trade_count'])
+
+
+def quantities(plan):
+    return dict(zip(plan['item_id'], plan['quantity']))
+
+
+def test_budget_goes_to_the_densest_profit():
+    items = ranking([
+        ("T5_A", "west", "Black Market", 100, 150, 20),
+        ("T6_B", "west", "Caerleon", 1000, 1200, 20),
+    ])
+    plan, summary = optimize_portfolio(items, budget=1000, stock={}, volume_share=0.5, tax_rate=0.0)
+    assert quantities(plan) == {"T5_A": 10}
+    assert summary['total_cost'] == pytest.approx(1000)
+    assert summary['total_profit'] == pytest.approx(500)
+    assert list(plan['location']) == ["Black Market"]
+
+
+def test_few_large_items_can_beat_the_densest_one():
+    items = ranking([
+        ("T5_A", "west", "Black Market", 600, 1100, 2),
+        ("T5_B", "west", "Black Market", 500, 800, 4),
+    ])
+    plan, summary = optimize_portfolio(items, budget=1000, stock={}, volume_share=0.5, tax_rate=0.0)
+    assert quantities(plan) == {"T5_B": 2}
+    assert summary['total_profit'] == pytest.approx(600)
+
+
+def test_volume_caps_and_unprofitable_items():
+    items = ranking([
+        ("T5_A", "west", "Black Market", 100, 200, 7),
+        ("T5_B", "west", "Black Market", 100, 90, 100),
+        ("T5_C", "west", "Black Market", 100, 200, 1),
+    ])
+    plan, summary = optimize_portfolio(items, budget=1_000_000, stock={}, volume_share=0.5, tax_rate=0.0)
+    # 7 trades at a 50% share allow 3 crafts; losing items and items capped below one craft are skipped
+    assert quantities(plan) == {"T5_A": 3}
+    assert summary['candidates'] == 1
+
+
+def test_tax_is_taken_from_the_sale_price():
+    items = ranking([("T5_A", "west", "Black Market", 100, 200, 4)])
+    _, summary = optimize_portfolio(items, budget=1_000_000, stock={}, volume_share=1.0, tax_rate=0.1)
+    assert summary['total_profit'] == pytest.approx(4 * (200 * 0.9 - 100))
+
+
+@pytest.mark.parametrize('use_engine', [False, True])
+def test_material_stock_limits_the_plan(use_engine):
+    items = ranking([
+        ("T5_OFF_TORCH", "west", "Black Market", 100, 1000, 100),
+        ("T6_OFF_TORCH", "west", "Black Market", 100, 500, 100),
+    ])
+    engine = CostEngine(list(items['item_id'])) if use_engine else None
+    stock = {"T5_PLANK": 10}
+    plan, summary = optimize_portfolio(items, engine, budget=1_000_000, stock=stock, volume_share=1.0,
+                                       tax_rate=0.0)
+
+    # Each T5 torch consumes 4 planks less the return rate
+    per_craft = 4 * (1 - return_rate)
+    assert quantities(plan) == {"T5_OFF_TORCH": int(10 // per_craft), "T6_OFF_TORCH": 100}
+    assert summary['materials_used']["T5_PLANK"] == pytest.approx(int(10 // per_craft) * per_craft)
+    assert summary['materials_used']["T5_PLANK"] <= 10
+
+
+def test_plan_is_feasible():
+    items = ranking([(f"T5_ITEM{i}", "west", "Black Market", 50 + 37 * i, 120 + 53 * i, 3 + i) for i in range(30)])
+    problem = PortfolioProblem(items, budget=5000, stock={}, volume_share=0.5, tax_rate=0.065)
+    plan, summary = optimize_portfolio(items, budget=5000, stock={}, volume_share=0.5, tax_rate=0.065)
+    planned = quantities(plan)
+    assert problem.feasible(np.array([planned.get(item, 0) for item in problem.item_ids], dtype=np.float64))
+    assert 0 < summary['total_cost'] <= 5000
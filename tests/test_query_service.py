@@ -0,0 +1,87 @@
+import csv
+
+import pytest
+
+from query_service import ProfitTable, parse_query
+
+COLUMNS = ['item_id', 'tier', 'enchant', 'server', 'location', 'cost', 'avg_price', 'profit', 'profit_pct',
+           'trade_count', 'latest_update']
+
+
+def row(item_id, profit, profit_pct, trade_count):
+    return {'item_id': item_id, 'tier': item_id[:2], 'enchant': "", 'server': "west", 'location': "Black Market",
+            'cost': 1000, 'avg_price': 1000 + profit, 'profit': profit, 'profit_pct': profit_pct,
+            'trade_count': trade_count, 'latest_update': "2026-10-05"}
+
+
+ROWS = [
+    row("T5_OFF_TORCH", 500, 50.0, 10),
+    row("T6_OFF_BOOK@1", 9000, 30.0, 80),
+    row("T7_OFF_SHIELD@2", 3000, 90.0, 60),
+    row("T6_OFF_TORCH", 2000, 70.0, 100),
+    row("T8_UNKNOWN_THING", 100, "nan", 5),
+]
+
+
+@pytest.fixture
+def table():
+    return ProfitTable(ROWS, generated_at="2026-10-05T00:00:00")
+
+
+def ids(rows):
+    return [row['item_id'] for row in rows]
+
+
+def test_rows_are_ranked_by_profit_pct(table):
+    assert ids(table.query(limit=10)) == ["T7_OFF_SHIELD@2", "T6_OFF_TORCH", "T5_OFF_TORCH", "T6_OFF_BOOK@1",
+                                          "T8_UNKNOWN_THING"]
+    assert table.get("T6_OFF_TORCH")['rank'] == 2
+    assert table.get("T6_OFF_TORCH")['materials'] == ["PLANK", "CLOTH"]
+    assert table.get("T9_MISSING") is None
+
+
+def test_tier_and_enchant_filters(table):
+    assert ids(table.query(min_tier=6)) == ["T7_OFF_SHIELD@2", "T6_OFF_TORCH", "T6_OFF_BOOK@1", "T8_UNKNOWN_THING"]
+    assert ids(table.query(tiers=[5, 6], max_tier=5)) == ["T5_OFF_TORCH"]
+    assert ids(table.query(enchants=[1, 2])) == ["T7_OFF_SHIELD@2", "T6_OFF_BOOK@1"]
+    assert table.query(tiers=[4]) == []
+
+
+def test_material_filters_intersect(table):
+    assert ids(table.query(materials=["CLOTH"])) == ["T6_OFF_TORCH", "T5_OFF_TORCH", "T6_OFF_BOOK@1"]
+    assert ids(table.query(materials=["CLOTH", "PLANK"], min_tier=6)) == ["T6_OFF_TORCH"]
+    assert table.query(materials=["STONE"]) == []
+
+
+def test_thresholds_and_missing_values(table):
+    assert ids(table.query(min_trade_count=60)) == ["T6_OFF_TORCH", "T6_OFF_BOOK@1"]
+    assert ids(table.query(min_profit=2000)) == ["T7_OFF_SHIELD@2", "T6_OFF_TORCH", "T6_OFF_BOOK@1"]
+    # A missing profit_pct never passes a threshold
+    assert "T8_UNKNOWN_THING" not in ids(table.query(min_profit_pct=-1000))
+
+
+def test_sort_by_profit_and_limit(table):
+    assert ids(table.query(sort='profit', limit=2)) == ["T6_OFF_BOOK@1", "T7_OFF_SHIELD@2"]
+    assert len(table.query(limit=0)) == 0
+
+
+def test_from_csv_matches_the_rows(tmp_path):
+    path = tmp_path / "ranking.csv"
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, COLUMNS)
+        writer.writeheader()
+        writer.writerows(ROWS)
+    loaded = ProfitTable.from_csv(str(path))
+    assert len(loaded) == len(ROWS)
+    assert loaded.get("T6_OFF_BOOK@1")['trade_count'] == 80
+    assert ids(loaded.query(min_tier=7)) == ["T7_OFF_SHIELD@2", "T8_UNKNOWN_THING"]
+
+
+def test_parse_query():
+    assert parse_query({'tier': "T6,7", 'enchant': "@1", 'material': "cloth", 'min_trade_count': "50",
+                        'limit': "5"}) == {
+        'tiers': [6, 7], 'enchants': [1], 'materials': ["CLOTH"], 'min_trade_count': 50.0,
+        'sort': 'profit_pct', 'limit': 5,
+    }
+    with pytest.raises(ValueError):
+        parse_query({'sort': "name"})
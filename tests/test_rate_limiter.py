@@ -0,0 +1,172 @@
+import asyncio
+import time
+
+from rate_limiter import AimdController, ConcurrencyLimit, RequestScheduler, TokenBucket
+
+
+def test_token_bucket_allows_a_burst_then_paces():
+    async def run():
+        bucket = TokenBucket(rate=50, burst=5)
+        started = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        burst = time.monotonic() - started
+        for _ in range(5):
+            await bucket.acquire()
+        return burst, time.monotonic() - started
+
+    burst, total = asyncio.run(run())
+    assert burst < 0.05
+    # Five more tokens at 50/s take about 0.1s
+    assert 0.08 <= total < 0.5
+
+
+def test_token_bucket_backoff_pauses_every_caller():
+    async def run():
+        bucket = TokenBucket(rate=1000, burst=10)
+        bucket.backoff(0.2)
+        assert bucket.backoff_remaining > 0.1
+        started = time.monotonic()
+        await asyncio.gather(*(bucket.acquire() for _ in range(3)))
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) >= 0.18
+
+
+def test_token_bucket_backoff_does_not_build_up_a_burst():
+    bucket = TokenBucket(rate=100, burst=10)
+    bucket.backoff(0.05)
+    assert bucket.tokens <= 1.0
+
+
+def test_token_bucket_set_rate_keeps_earned_tokens():
+    bucket = TokenBucket(rate=10, burst=10)
+    bucket.tokens = 3.0
+    bucket.set_rate(20)
+    assert bucket.rate == 20
+    assert 3.0 <= bucket.tokens <= 10
+
+
+def test_concurrency_limit_bounds_requests_in_flight():
+    async def run():
+        limit = ConcurrencyLimit(2)
+        active = peak = 0
+
+        async def task():
+            nonlocal active, peak
+            await limit.acquire()
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            limit.release()
+
+        await asyncio.gather(*(task() for _ in range(6)))
+        return peak, limit.in_flight
+
+    assert asyncio.run(run()) == (2, 0)
+
+
+def test_concurrency_limit_raise_wakes_waiters():
+    async def run():
+        limit = ConcurrencyLimit(1)
+        await limit.acquire()
+        waiter = asyncio.ensure_future(limit.acquire())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        limit.set_limit(2)
+        await asyncio.wait_for(waiter, 1)
+        return limit.in_flight
+
+    assert asyncio.run(run()) == 2
+
+
+def test_concurrency_limit_cancelled_waiter_gives_up_its_slot():
+    async def run():
+        limit = ConcurrencyLimit(1)
+        await limit.acquire()
+        waiter = asyncio.ensure_future(limit.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        limit.release()
+        return limit.in_flight
+
+    assert asyncio.run(run()) == 0
+
+
+def test_scheduler_releases_its_slot_on_exit():
+    async def run():
+        scheduler = RequestScheduler(rate=1000, burst=10, max_in_flight=1)
+        for _ in range(3):
+            async with scheduler:
+                assert scheduler.limit.in_flight == 1
+        return scheduler.limit.in_flight
+
+    assert asyncio.run(run()) == 0
+
+
+def test_scheduler_throttle_starts_the_shared_backoff():
+    scheduler = RequestScheduler(rate=10, burst=1, max_in_flight=4)
+    scheduler.record_throttle(5.0)
+    summary = scheduler.summary()
+    assert summary['throttled'] == 1
+    assert scheduler.bucket.backoff_remaining > 4.0
+
+
+def make_controller(**overrides):
+    settings = dict(concurrency=4, rate=2.0, min_concurrency=1, max_concurrency=8, min_rate=0.5, max_rate=4.0,
+                    increase=1.0, rate_increase=0.1, decrease=0.5, slow_seconds=1.0, cooldown=60.0)
+    settings.update(overrides)
+    return AimdController(**settings)
+
+
+def test_aimd_grows_by_one_step_per_window_of_fast_responses():
+    controller = make_controller()
+    # The window grows with the limit: 1/4 + 1/4.25 + 1/4.49 + 1/4.71 < 1 < ... + 1/4.92
+    for _ in range(4):
+        controller.on_success(0.1)
+    assert int(controller.concurrency) == 4
+    controller.on_success(0.1)
+    assert int(controller.concurrency) == 5
+    assert controller.rate > 2.0
+    assert controller.increases == 1
+
+
+def test_aimd_ignores_slow_responses():
+    controller = make_controller()
+    assert controller.on_success(2.0) is False
+    assert controller.concurrency == 4
+
+
+def test_aimd_stays_within_its_bounds():
+    controller = make_controller(cooldown=0.0)
+    for _ in range(200):
+        controller.on_success(0.1)
+    assert controller.concurrency == 8
+    assert controller.rate == 4.0
+    for _ in range(20):
+        controller.on_congestion()
+    assert controller.concurrency == 1
+    assert controller.rate == 0.5
+
+
+def test_aimd_cuts_once_per_cooldown():
+    controller = make_controller()
+    assert controller.on_congestion() is True
+    assert controller.on_congestion() is False
+    assert controller.concurrency == 2
+    assert controller.rate == 1.0
+    assert controller.decreases == 1
+
+
+def test_scheduler_applies_controller_limits():
+    scheduler = RequestScheduler(rate=2.0, burst=1, max_in_flight=4, controller=make_controller())
+    scheduler.record_timeout()
+    assert scheduler.limit.limit == 2
+    assert scheduler.bucket.rate == 1.0
+    for _ in range(3):
+        scheduler.record_success(0.1)
+    assert scheduler.limit.limit == 3
+    assert scheduler.bucket.rate > 1.0
+    assert scheduler.summary()['decreases'] == 1
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+from record_buffer import RecordBuffer
+
+
+def record(item, price, quality=1, location="Black Market", server="west", day=1, count=10):
+    return {'item_id': item, 'quality': quality, 'location': location, 'server': server,
+            'latest_timestamp': f"2026-10-{day:02d}T00:00:00", 'avg_price': price, 'item_count': count}
+
+
+def test_extend_returns_the_appended_row_range():
+    buffer = RecordBuffer()
+    assert buffer.extend([record("T5_A", 1000), record("T5_B", 2000)]) == (0, 2)
+    assert buffer.extend([]) == (2, 2)
+    assert buffer.extend([record("T5_C", 3000)]) == (2, 3)
+    assert len(buffer) == 3
+
+
+def test_frame_decodes_the_columns():
+    buffer = RecordBuffer()
+    buffer.extend([record("T5_A", 1000), record("T5_B", 2000, quality=2, location="Caerleon", day=3, count=4)])
+    frame = buffer.frame(1)
+
+    assert len(frame) == 1
+    assert frame['item_id'].tolist() == ["T5_B"]
+    assert frame['quality'].tolist() == [2]
+    assert frame['location'].tolist() == ["Caerleon"]
+    assert frame['latest_timestamp'].iloc[0] == pd.Timestamp("2026-10-03")
+    assert frame['avg_price'].tolist() == [2000.0]
+    assert frame['item_count'].tolist() == [4]
+
+
+def test_growing_keeps_earlier_frames_valid():
+    buffer = RecordBuffer(capacity=2)
+    buffer.extend([record("T5_A", 1000), record("T5_B", 2000)])
+    early = buffer.frame()
+    buffer.extend([record(f"T6_{i}", 100 * i) for i in range(10)])
+
+    assert len(buffer) == 12
+    assert early['avg_price'].tolist() == [1000.0, 2000.0]
+    assert buffer.frame(2)['item_id'].tolist() == [f"T6_{i}" for i in range(10)]
+
+
+def test_records_round_trip():
+    buffer = RecordBuffer()
+    buffer.extend([record("T5_A", 1000, day=2)])
+    (row,) = buffer.records()
+    assert row['item_id'] == "T5_A"
+    assert row['server'] == "west"
+    assert row['avg_price'] == 1000
+    assert row['latest_timestamp'] == pd.Timestamp("2026-10-02")
+
+
+def test_saved_buffer_opens_as_read_only_memory_maps(tmp_path):
+    buffer = RecordBuffer()
+    buffer.extend([record("T5_A", 1000), record("T5_B", 2000, location="Caerleon", server="east")])
+    buffer.save(str(tmp_path / "records"))
+    mapped = RecordBuffer.open_mapped(str(tmp_path / "records"))
+
+    assert len(mapped) == 2
+    assert isinstance(mapped.avg_price, np.memmap)
+    assert not mapped.avg_price.flags.writeable
+    assert mapped.records() == buffer.records()
@@ -0,0 +1,102 @@
+import sqlite3
+import time
+
+from response_cache import ResponseCache
+
+SERVER = "https://west.albion-online-data.com"
+LOCATION = "Black Market"
+PAYLOAD = [{'item_id': "T5_OFF_TORCH", 'quality': 1, 'data': [{'timestamp': "2026-10-01T00:00:00"}]}]
+
+
+def open_cache(tmp_path, ttl=60, max_bytes=1 << 20):
+    return ResponseCache(str(tmp_path / "responses.sqlite3"), ttl, max_bytes)
+
+
+def test_round_trip_with_validators(tmp_path):
+    cache = open_cache(tmp_path)
+    cache.put(SERVER, "T5_OFF_TORCH", LOCATION, 6, PAYLOAD, etag='"v1"', last_modified="Mon")
+    entry = cache.get(SERVER, "T5_OFF_TORCH", LOCATION, 6)
+    assert entry.payload == PAYLOAD
+    assert (entry.etag, entry.last_modified, entry.fresh, entry.start_date) == ('"v1"', "Mon", True, None)
+    assert cache.get(SERVER, "T6_OFF_TORCH", LOCATION, 6) is None
+    assert cache.get(SERVER, "T5_OFF_TORCH", LOCATION, 24) is None
+
+
+def test_expired_entry_is_kept_for_revalidation(tmp_path):
+    cache = open_cache(tmp_path, ttl=0)
+    cache.put(SERVER, "T5_OFF_TORCH", LOCATION, 6, PAYLOAD, etag='"v1"')
+    entry = cache.get(SERVER, "T5_OFF_TORCH", LOCATION, 6)
+    assert entry.fresh is False
+    assert entry.etag == '"v1"'
+
+    cache.ttl = 60
+    cache.refresh(SERVER, "T5_OFF_TORCH", LOCATION, 6)
+    assert cache.get(SERVER, "T5_OFF_TORCH", LOCATION, 6).fresh is True
+
+
+def test_delta_entry_is_not_served_as_full_history(tmp_path):
+    cache = open_cache(tmp_path)
+    cache.put(SERVER, "T5_OFF_TORCH", LOCATION, 6, PAYLOAD, start_date="2026-10-10")
+    assert cache.get(SERVER, "T5_OFF_TORCH", LOCATION, 6) is None
+    # A later window is covered by the delta, an earlier one is not
+    assert cache.get(SERVER, "T5_OFF_TORCH", LOCATION, 6, "2026-10-12").start_date == "2026-10-10"
+    assert cache.get(SERVER, "T5_OFF_TORCH", LOCATION, 6, "2026-10-01") is None
+
+
+def test_full_history_covers_every_delta(tmp_path):
+    cache = open_cache(tmp_path)
+    cache.put(SERVER, "T5_OFF_TORCH", LOCATION, 6, PAYLOAD)
+    entry = cache.get(SERVER, "T5_OFF_TORCH", LOCATION, 6, "2026-10-12")
+    assert entry.payload == PAYLOAD
+    assert entry.start_date is None
+
+
+def test_fresh_entry_wins_over_a_stale_narrower_one(tmp_path):
+    cache = open_cache(tmp_path, ttl=0)
+    cache.put(SERVER, "T5_OFF_TORCH", LOCATION, 6, [], start_date="2026-10-10")
+    cache.ttl = 60
+    cache.put(SERVER, "T5_OFF_TORCH", LOCATION, 6, PAYLOAD)
+    entry = cache.get(SERVER, "T5_OFF_TORCH", LOCATION, 6, "2026-10-12")
+    assert entry.fresh is True
+    assert entry.start_date is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = open_cache(tmp_path)
+    cache.put(SERVER, "T5_A", LOCATION, 6, PAYLOAD)
+    size = cache.total_bytes
+    cache.max_bytes = 2 * size
+    time.sleep(0.01)
+    cache.put(SERVER, "T5_B", LOCATION, 6, PAYLOAD)
+    time.sleep(0.01)
+    cache.get(SERVER, "T5_A", LOCATION, 6)
+    time.sleep(0.01)
+    cache.put(SERVER, "T5_C", LOCATION, 6, PAYLOAD)
+
+    assert cache.get(SERVER, "T5_B", LOCATION, 6) is None
+    assert cache.get(SERVER, "T5_A", LOCATION, 6) is not None
+    assert cache.get(SERVER, "T5_C", LOCATION, 6) is not None
+    assert cache.total_bytes == 2 * size
+
+
+def test_size_survives_reopening(tmp_path):
+    cache = open_cache(tmp_path)
+    cache.put(SERVER, "T5_A", LOCATION, 6, PAYLOAD)
+    cache.put(SERVER, "T5_A", LOCATION, 6, PAYLOAD)
+    total = cache.total_bytes
+    cache.close()
+    assert open_cache(tmp_path).total_bytes == total
+
+
+def test_table_without_start_date_is_dropped(tmp_path):
+    path = tmp_path / "responses.sqlite3"
+    conn = sqlite3.connect(str(path))
+    conn.execute("CREATE TABLE responses (server TEXT, item_id TEXT, location TEXT, time_scale INTEGER, "
+                 "payload BLOB, etag TEXT, last_modified TEXT, expires_at REAL, accessed_at REAL, size INTEGER)")
+    conn.execute("INSERT INTO responses VALUES (?, 'T5_A', ?, 6, x'00', NULL, NULL, 0, 0, 1)", (SERVER, LOCATION))
+    conn.commit()
+    conn.close()
+
+    cache = open_cache(tmp_path)
+    assert cache.total_bytes == 0
+    assert cache.get(SERVER, "T5_A", LOCATION, 6) is None
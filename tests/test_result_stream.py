@@ -0,0 +1,84 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import result_stream
+from result_stream import NdjsonResultStream, compact_frame, open_result_stream
+
+
+def results(quality=False):
+    frame = pd.DataFrame({
+        'item_id': ["T5_MAIN_SWORD@1", "T8_CAPE"],
+        'tier': ["T5", "T8"],
+        'enchant': ["@1", ""],
+        'server': ["west", "east"],
+        'location': ["Black Market", "Caerleon"],
+        'cost': [1000.0, 2500.5],
+        'weighted_avg_price': [1500.0, 2000.0],
+        'profit': [500.0, -500.5],
+        'profit_pct': [50.0, -20.01],
+        'total_trade_count': [12, 3],
+        'latest_update': ["2026-10-01 06:00:00", "2026-10-02 00:00:00"],
+        'extra': [1, 2],
+    })
+    if quality:
+        frame.insert(3, 'quality', [1, 4])
+    return frame
+
+
+def test_compact_frame_types_the_columns():
+    frame = compact_frame(results())
+
+    assert list(frame.columns) == [column for column in result_stream.STREAM_COLUMNS if column != 'quality']
+    assert frame['tier'].tolist() == [5, 8]
+    assert frame['enchant'].tolist() == [1, 0]
+    assert str(frame['tier'].dtype) == 'Int8'
+    assert frame['item_id'].dtype == 'category'
+    assert frame['server'].dtype == 'category'
+    assert frame['profit_pct'].dtype == np.float32
+    assert frame['trade_count'].dtype == np.int32
+    assert frame['avg_price'].tolist() == [1500.0, 2000.0]
+    assert frame['latest_update'].iloc[0] == pd.Timestamp("2026-10-01 06:00:00")
+
+
+def test_compact_frame_keeps_quality_when_present():
+    frame = compact_frame(results(quality=True))
+    assert list(frame.columns) == result_stream.STREAM_COLUMNS
+    assert frame['quality'].tolist() == [1, 4]
+
+
+def test_ndjson_stream_appends_one_line_per_row(tmp_path):
+    path = tmp_path / "out" / "stream.ndjson"
+    stream = NdjsonResultStream(str(path))
+    stream.write(results())
+    stream.write(results().iloc[:0])
+    # Lines are flushed as they are written, so the file is readable mid-run
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 2
+    stream.write(results(quality=True).iloc[:1])
+    stream.close()
+
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert stream.rows == 3
+    assert len(lines) == 3
+    assert lines[0]['item_id'] == "T5_MAIN_SWORD@1"
+    assert lines[0]['tier'] == 5
+    assert lines[0]['trade_count'] == 12
+    assert lines[0]['latest_update'] == "2026-10-01T06:00:00"
+    assert 'quality' not in lines[0]
+    assert lines[2]['quality'] == 1
+
+
+def test_open_result_stream_formats(tmp_path, monkeypatch):
+    # The configured stream path is relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(result_stream, 'pyarrow', None)
+
+    assert open_result_stream(None) is None
+    stream = open_result_stream("parquet")
+    assert isinstance(stream, NdjsonResultStream)
+    stream.close()
+    assert (tmp_path / result_stream.stream_ndjson_path).exists()
+    with pytest.raises(ValueError):
+        open_result_stream("csv")